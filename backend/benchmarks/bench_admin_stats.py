@@ -0,0 +1,135 @@
+"""
+Latency of /api/admin/stats: six sequential queries vs facets run side by side.
+
+    python -m benchmarks.bench_admin_stats --events 10000 --latency 20
+    python -m benchmarks.bench_admin_stats --mongo
+
+"sequential" is the previous implementation (three counts, a date-filtered
+count and two aggregations, one after another, kept below for reference).
+"fan-out" is the current one: the user counts, a $facet over interactions
+and the session count, run concurrently. Each query is also timed alone, since the fan-out
+should cost about as much as the slowest of them.
+
+By default the data lives in mongomock and every command is held for
+--latency ms to stand in for the network and server time of a real
+deployment; mongomock itself evaluates pipelines in Python under the GIL,
+so without --latency it only shows the saved collection passes. With
+--mongo the queries run against whatever is at MONGODB_URI (seed it with
+jobs.generate_dataset) and --events/--latency are ignored.
+"""
+
+import argparse
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import print_table
+
+
+def legacy_stats(get_collection):
+    """The sequential /stats queries this benchmark compares against."""
+    users_collection = get_collection('users')
+    interactions_collection = get_collection('interactions')
+    sessions_collection = get_collection('sessions')
+
+    total_users = users_collection.count_documents({})
+    total_interactions = interactions_collection.count_documents({})
+    total_sessions = sessions_collection.count_documents({})
+    new_users_week = users_collection.count_documents({
+        'created_at': {'$gte': datetime.now() - timedelta(days=7)}
+    })
+    event_stats = list(interactions_collection.aggregate([
+        {'$group': {'_id': '$event_type', 'count': {'$sum': 1}}},
+        {'$sort': {'count': -1}},
+        {'$limit': 10}
+    ]))
+    top_users = list(interactions_collection.aggregate([
+        {'$group': {'_id': '$user_id', 'count': {'$sum': 1}}},
+        {'$sort': {'count': -1}},
+        {'$limit': 10}
+    ]))
+    return total_users, total_interactions, total_sessions, new_users_week, event_stats, top_users
+
+
+def use_mongomock(events, latency):
+    try:
+        import mongomock
+    except ImportError:
+        raise SystemExit("the default mode needs mongomock (pip install mongomock); or pass --mongo")
+    from mongomock.collection import Collection
+
+    import utils.database as database
+    from jobs.generate_dataset import generate_chunk, parse_end, user_event_counts
+
+    database.MongoClient = mongomock.MongoClient
+    counts = user_event_counts(max(1, events // 40), events, 1.0, seed=11)
+    users, sessions, interactions = generate_chunk(0, 0, counts, 11, parse_end(datetime.now().strftime('%Y-%m-%d')), 30)
+    db = database.get_db()
+    for name, docs in (('users', users), ('sessions', sessions), ('interactions', interactions)):
+        db[name].drop()
+        db[name].insert_many(docs)
+
+    # Hold each command for the simulated round trip; sleeping releases the GIL like a socket read
+    for method in ('aggregate', 'count_documents'):
+        original = getattr(Collection, method)
+
+        def delayed(self, *args, _original=original, **kwargs):
+            time.sleep(latency / 1000)
+            return _original(self, *args, **kwargs)
+        setattr(Collection, method, delayed)
+    return len(users), len(sessions), len(interactions)
+
+
+def median_ms(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=10000)
+    parser.add_argument('--latency', type=float, default=20, help='ms added to every mongomock command')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--mongo', action='store_true', help='query MONGODB_URI instead of mongomock')
+    args = parser.parse_args()
+
+    if args.mongo:
+        print(f"MongoDB at {os.getenv('MONGODB_URI', 'mongodb://localhost:27017')}")
+    else:
+        users, sessions, interactions = use_mongomock(args.events, args.latency)
+        print(f"mongomock: {users:,} users, {sessions:,} sessions, {interactions:,} interactions, "
+              f"{args.latency:g} ms per command")
+
+    from routes import admin
+    from utils.database import get_collection
+
+    since = datetime.now() - timedelta(days=7)
+    queries = {
+        'users': admin._user_count,
+        'new_users': lambda: admin._new_user_count(since),
+        'interactions': admin._interaction_counts,
+        'sessions': admin._session_count
+    }
+    deadline = admin.STATS_MAX_TIME_MS / 1000 + 0.5
+
+    def fan_out():
+        _, missing = admin.stats_fanout.run(queries, timeout=deadline)
+        if missing:
+            raise SystemExit(f"✗ stats queries did not finish: {missing}")
+
+    fan_out()  # Warm the pool and the connections
+    rows = [
+        ['sequential (6 queries)', f"{median_ms(lambda: legacy_stats(get_collection), args.runs):.1f}"],
+        ['fan-out (4 queries)', f"{median_ms(fan_out, args.runs):.1f}"]
+    ]
+    rows += [[f"  {name} alone", f"{median_ms(query, args.runs):.1f}"] for name, query in queries.items()]
+    print_table(['/stats queries', 'median ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
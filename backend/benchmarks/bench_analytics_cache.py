@@ -0,0 +1,136 @@
+"""
+Compares the columnar analytics cache with the dict-loop implementations.
+
+    python -m benchmarks.bench_analytics_cache --events 1000000
+    python -m benchmarks.bench_analytics_cache --mongo   # also time live Mongo queries
+
+The dict-loop numbers run the current route code over documents that are
+already in memory, so they are a lower bound for the Mongo-backed routes.
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.common import synthetic_events, timed, print_table
+from utils.analytics_cache import AnalyticsCache, EVENT_DTYPE
+
+
+def dict_trending(docs, since):
+    element_counts = {}
+    for click in docs:
+        if click['event_type'] != 'click' or click['timestamp'] < since:
+            continue
+        element = click.get('element', '')
+        if element.startswith('hashtag-'):
+            hashtag = element.replace('hashtag-', '')
+            element_counts[hashtag] = element_counts.get(hashtag, 0) + 1
+    return sorted(element_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+
+
+def dict_event_types(docs):
+    counts = {}
+    for doc in docs:
+        counts[doc['event_type']] = counts.get(doc['event_type'], 0) + 1
+    return sorted(counts.items(), key=lambda x: x[1], reverse=True)
+
+
+def dict_hours(docs):
+    hour_activity = {}
+    for doc in docs:
+        hour = datetime.fromtimestamp(doc['timestamp']).hour
+        hour_activity[hour] = hour_activity.get(hour, 0) + 1
+    return hour_activity
+
+
+def dict_user(docs, user_id):
+    recent = sorted((d for d in docs if d['user_id'] == user_id),
+                    key=lambda d: d['timestamp'], reverse=True)[:100]
+    clicked_elements = {}
+    hour_activity = {}
+    for interaction in recent:
+        if interaction['event_type'] == 'click' and 'element' in interaction:
+            element = interaction['element']
+            clicked_elements[element] = clicked_elements.get(element, 0) + 1
+        hour = datetime.fromtimestamp(interaction['timestamp']).hour
+        hour_activity[hour] = hour_activity.get(hour, 0) + 1
+    return len(recent), clicked_elements, hour_activity
+
+
+def mongo_timings(user_id, since):
+    from pymongo import MongoClient
+
+    client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017'), serverSelectionTimeoutMS=3000)
+    interactions = client[os.getenv('MONGO_DB', 'womens_football_analytics')]['interactions']
+
+    def trending():
+        return dict_trending(list(interactions.find({'event_type': 'click', 'timestamp': {'$gte': since}})), since)
+
+    def event_types():
+        return list(interactions.aggregate([{'$group': {'_id': '$event_type', 'count': {'$sum': 1}}}]))
+
+    def user():
+        return list(interactions.find({'user_id': user_id}).sort('timestamp', -1).limit(100))
+
+    return {
+        'trending': timed(trending, repeat=3)[0],
+        'event_types': timed(event_types, repeat=3)[0],
+        'user_analytics': timed(user, repeat=3)[0]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--mongo', action='store_true', help='also time the Mongo-backed queries')
+    args = parser.parse_args()
+
+    print(f"Generating {args.events:,} synthetic events...")
+    docs = synthetic_events(args.events, users=args.users)
+    heavy_user = max(set(d['user_id'] for d in docs[:1000]), key=lambda u: sum(1 for d in docs[:1000] if d['user_id'] == u))
+    since = time.time() - 86400
+
+    cache = AnalyticsCache(hours=24, refresh_interval=float('inf'))
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    cache.append_documents(docs)
+    load_seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = cache.stats()
+    used_bytes = EVENT_DTYPE.itemsize * stats['events'] + stats['dictionary_bytes']
+    print(f"\nLoaded in {load_seconds:.2f}s ({stats['events'] / load_seconds:,.0f} events/s), peak load allocation {peak / 2**20:.1f} MiB")
+    print(f"Row size {EVENT_DTYPE.itemsize} bytes -> {stats['mb_per_million_events']} MiB per million events "
+          f"(+ {stats['dictionary_bytes'] / 2**20:.2f} MiB dictionaries, {used_bytes / stats['events'] * 1e6 / 2**20:.1f} MiB/M total)\n")
+
+    queries = [
+        ('trending', lambda: cache.trending(since=since), lambda: dict_trending(docs, since)),
+        ('event_types', cache.event_type_breakdown, lambda: dict_event_types(docs)),
+        ('hour_histogram', cache.hour_histogram, lambda: dict_hours(docs)),
+        ('user_analytics', lambda: cache.user_activity(heavy_user), lambda: dict_user(docs, heavy_user)),
+    ]
+
+    mongo = mongo_timings(heavy_user, since) if args.mongo else {}
+
+    rows = []
+    for name, columnar, loop in queries:
+        columnar_seconds, _ = timed(columnar)
+        loop_seconds, _ = timed(loop, repeat=3)
+        rows.append((
+            name,
+            f"{columnar_seconds * 1000:.2f}",
+            f"{loop_seconds * 1000:.2f}",
+            f"{loop_seconds / columnar_seconds:.1f}x",
+            f"{mongo[name] * 1000:.2f}" if name in mongo else '-'
+        ))
+
+    print_table(['query', 'numpy ms', 'dict loop ms', 'speedup', 'mongo ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Shows that a hanging Reddit does not drag tracking latency down with it.
+
+    python -m benchmarks.bench_bulkhead --duration 15
+
+A local stub stands in for Reddit and never answers within the client
+timeout. One gunicorn worker (4 threads) is started with and without the
+Reddit bulkhead; in each case tracking p99 is measured alone and again
+while other clients keep hitting /api/social/reddit/search. Needs MongoDB
+at MONGODB_URI, like the server itself.
+"""
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.common import percentile, print_table
+from benchmarks.load_compare import _event, start_server, stop_server
+
+
+class HangingReddit(BaseHTTPRequestHandler):
+    hang_seconds = 60
+
+    def do_GET(self):
+        time.sleep(self.hang_seconds)
+        self.send_response(504)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(port):
+    server = ThreadingHTTPServer(('127.0.0.1', port), HangingReddit)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def hammer(port, stop_at, make_request, latencies, lock, seed):
+    rng = random.Random(seed)
+    user_id = f"user_{uuid.uuid4().hex[:12]}"
+    session_id = f"session_{uuid.uuid4().hex[:12]}_{int(time.time())}"
+    local = []
+
+    while time.time() < stop_at:
+        method, path, body = make_request(rng, user_id, session_id)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=json.dumps(body) if body else None,
+                         headers={'Content-Type': 'application/json'} if body else {})
+            conn.getresponse().read()
+            local.append(time.perf_counter() - start)
+        except (OSError, http.client.HTTPException):
+            local.append(time.perf_counter() - start)
+        finally:
+            conn.close()
+
+    with lock:
+        latencies.extend(local)
+
+
+def tracking_request(rng, user_id, session_id):
+    return 'POST', '/api/tracking/event', _event(user_id, session_id, rng)
+
+
+def reddit_request(rng, user_id, session_id):
+    return 'GET', f"/api/social/reddit/search?live=1&q=wsl{rng.randint(0, 10 ** 6)}", None
+
+
+def measure(port, duration, tracking_clients, reddit_clients):
+    tracking, reddit = [], []
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    threads = [threading.Thread(target=hammer, args=(port, stop_at, tracking_request, tracking, lock, i))
+               for i in range(tracking_clients)]
+    threads += [threading.Thread(target=hammer, args=(port, stop_at, reddit_request, reddit, lock, 1000 + i),
+                                 daemon=True)
+                for i in range(reddit_clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads[:tracking_clients]:
+        thread.join()
+
+    return tracking
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--tracking-clients', type=int, default=4)
+    parser.add_argument('--reddit-clients', type=int, default=8)
+    parser.add_argument('--port', type=int, default=5201)
+    args = parser.parse_args()
+
+    stub_port = args.port + 100
+    stub = start_stub(stub_port)
+
+    rows = []
+    for offset, concurrency in enumerate([0, 2]):
+        port = args.port + offset
+        process = start_server('gunicorn', port, workers=1, extra_env={
+            'GUNICORN_THREADS': '4',
+            'REDDIT_BASE_URL': f"http://127.0.0.1:{stub_port}",
+            'REDDIT_BULKHEAD_CONCURRENCY': str(concurrency),
+            # Isolate the bulkhead: no background polling, no breaker tripping
+            'REDDIT_POLLER_ENABLED': '0',
+            'REDDIT_BREAKER_FAILURES': '1000000'
+        })
+        label = f"bulkhead={concurrency}" if concurrency else 'no bulkhead'
+        try:
+            for reddit_clients in (0, args.reddit_clients):
+                latencies = measure(port, args.duration, args.tracking_clients, reddit_clients)
+                rows.append([label, reddit_clients, len(latencies),
+                             f"{percentile(latencies, 50) * 1000:.1f}",
+                             f"{percentile(latencies, 99) * 1000:.1f}"])
+        finally:
+            stop_server(process)
+
+    stub.shutdown()
+    print_table(['server', 'reddit clients', 'tracking requests', 'p50 ms', 'p99 ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
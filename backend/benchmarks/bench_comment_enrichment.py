@@ -0,0 +1,152 @@
+"""
+Wall time and sentiment effect of comment enrichment, against a local stub.
+
+    python -m benchmarks.bench_comment_enrichment
+
+The stub answers /comments/<id>.json with a comment page after a per-post
+delay. The top posts are enriched once with a single worker (one fetch
+after another) and once with the default pool, and the round time is
+compared with the slowest single fetch. Further rounds check the cache:
+unchanged posts are not fetched again, posts whose num_comments changed
+are, and a hanging fetch is cut off at the deadline. Nothing leaves the
+machine and MongoDB is not needed.
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.common import print_table
+from models.reddit_post import RedditPost
+from reddit_service import RedditService
+from utils.comment_fetcher import CommentFetcher
+from utils.post_aggregates import SENTIMENTS, PostColumns
+
+# Each thread leans one way, like real ones tend to
+MOODS = [['amazing', 'brilliant', 'great', 'proud'], ['terrible', 'robbery', 'injury', 'disappointing']]
+FILLER = ['what', 'a', 'game', 'that', 'was', 'ref', 'keeper', 'save', 'second', 'half']
+
+
+def comment_page(post_id, rng, n=30):
+    words = FILLER * 3 + rng.choice(MOODS)
+
+    def comment(depth):
+        replies = ''
+        if depth < 3:
+            replies = {'kind': 'Listing', 'data': {'children': [comment(depth + 1) for _ in range(2)]}}
+        return {'kind': 't1', 'data': {'body': ' '.join(rng.choices(words, k=12)), 'replies': replies}}
+
+    children = [comment(1) for _ in range(n)] + [{'kind': 'more', 'data': {'count': 200}}]
+    return [
+        {'kind': 'Listing', 'data': {'children': [{'kind': 't3', 'data': {'id': post_id, 'title': 'link'}}]}},
+        {'kind': 'Listing', 'data': {'children': children}}
+    ]
+
+
+class StubComments(BaseHTTPRequestHandler):
+    delays = {}
+    hits = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        match = re.match(r'/comments/(\w+)\.json', self.path)
+        post_id = match.group(1) if match else ''
+        with StubComments.lock:
+            StubComments.hits += 1
+        time.sleep(StubComments.delays.get(post_id, 0))
+
+        body = json.dumps(comment_page(post_id, random.Random(post_id))).encode()
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+def link_posts(n, seed=5):
+    rng = random.Random(seed)
+    return [RedditPost(id=f"c{i}", title=f"Match report {i}", subreddit='NWSL', author='bench',
+                       score=rng.randint(0, 200), num_comments=rng.randint(1, 500),
+                       created_utc=time.time() - rng.randint(0, 86400))
+            for i in range(n)]
+
+
+def fetcher(service, concurrency, deadline=10):
+    return CommentFetcher(service, enabled=True, concurrency=concurrency, deadline=deadline)
+
+
+def timed_round(comment_fetcher, posts):
+    before = StubComments.hits
+    start = time.perf_counter()
+    texts = comment_fetcher.comment_texts(posts)
+    return texts, time.perf_counter() - start, StubComments.hits - before
+
+
+def sentiment_split(service, posts, comments):
+    columns = PostColumns.from_posts(posts, service, comments)
+    counts = [int((columns.sentiment == code).sum()) for code in range(len(SENTIMENTS))]
+    return ' / '.join(f"{name} {count}" for name, count in zip(SENTIMENTS, counts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=60)
+    parser.add_argument('--port', type=int, default=5301)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), StubComments)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    service = RedditService()
+    service.base_url = f"http://127.0.0.1:{args.port}"
+    posts = link_posts(args.posts)
+    rng = random.Random(9)
+    StubComments.delays = {post.id: rng.uniform(0.05, 0.4) for post in posts}
+
+    rows = []
+    for label, concurrency in (('sequential', 1), ('concurrent', None)):
+        comment_fetcher = fetcher(service, concurrency or CommentFetcher(service).concurrency)
+        texts, seconds, fetches = timed_round(comment_fetcher, posts)
+        slowest = max(StubComments.delays[post_id] for post_id in texts)
+        rows.append([label, len(texts), fetches, f"{seconds * 1000:.0f}", f"{slowest * 1000:.0f}"])
+    print_table(['pool', 'posts enriched', 'fetches', 'round ms', 'slowest fetch ms'], rows)
+
+    print()
+    print(f"sentiment without comments: {sentiment_split(service, posts, {})}")
+    print(f"sentiment with comments:    {sentiment_split(service, posts, texts)}")
+
+    # Cache: nothing changed, then a few posts got new comments
+    print()
+    _, seconds, fetches = timed_round(comment_fetcher, posts)
+    print(f"unchanged round: {fetches} fetches, {seconds * 1000:.1f} ms")
+    enriched = [post for post in posts if post.id in texts]
+    for post in enriched[:3]:
+        post.num_comments += 10
+    _, seconds, fetches = timed_round(comment_fetcher, posts)
+    print(f"3 posts with new comments: {fetches} fetches, {seconds * 1000:.0f} ms")
+
+    # A hanging fetch is cut off at the deadline and the stale copy is used
+    hanging = enriched[0]
+    hanging.num_comments += 10
+    StubComments.delays[hanging.id] = 3
+    comment_fetcher.deadline = 0.5
+    texts, seconds, fetches = timed_round(comment_fetcher, posts)
+    print(f"hanging fetch, 0.5 s deadline: round {seconds * 1000:.0f} ms, "
+          f"stale comments used: {hanging.id in texts}, stats: {comment_fetcher.stats()['late']} late")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""
+Scaling of the pure-CPU hot functions, time and allocations vs input size.
+
+    python -m benchmarks.bench_hot_functions
+    python -m benchmarks.bench_hot_functions --max-n 1000000 --output hot.json
+    python -m benchmarks.bench_hot_functions --fixtures fixtures/reddit --only sentiment
+
+Every case runs at n = 1, 10, 100, ... up to --max-n:
+- Per-event cases validate, sanitize or convert n synthetic tracker events.
+- Per-post cases run the text analysis over n posts.
+- "words" cases analyse a single text of n words.
+- _process_posts aggregates n posts.
+
+Posts come from recorded listings (bench_listing_parse --record) when
+--fixtures is given, otherwise from synthetic ones. Inputs are cycled
+from a pool, so 1M items does not mean 1M distinct dicts in memory.
+
+For each size the table shows time and tracemalloc figures per item: the
+peak bytes allocated, and the blocks still alive afterwards, which
+includes the result. "exponent" is the slope of log(time) over log(n)
+from n = 1000 on: about 1 for linear work and 2 for an accidental
+quadratic. The run exits with 1 when a case goes above --max-exponent.
+"""
+
+import argparse
+import gc
+import io
+import json
+import math
+import os
+import time
+import tracemalloc
+from itertools import cycle, islice
+
+os.environ.setdefault('REDDIT_POLLER_ENABLED', '0')
+os.environ.setdefault('REDDIT_COMMENTS_ENABLED', '0')
+
+import numpy as np
+
+from benchmarks.bench_listing_parse import load_fixtures, synthetic_fixtures
+from benchmarks.common import HASHTAGS, print_table, synthetic_events
+from models.interaction import Interaction
+from models.reddit_post import parse_listing
+from models.user import User
+from reddit_service import reddit_service
+from utils.data_validator import sanitize_tracking_data, validate_tracking_data
+from utils.uid_generator import is_valid_session_id, is_valid_uid
+
+
+POOL_SIZE = 10000
+MIN_TIME = 0.05
+FIT_FROM = 1000
+
+
+def event_pool():
+    now = time.time()
+    events = synthetic_events(POOL_SIZE)
+    for i, event in enumerate(events):
+        # Within the validator's one hour window, and with a session like the tracker sends
+        event['timestamp'] = now - (i % 600)
+        event['session_id'] = f"session_{i:012x}_{int(now)}"
+        event['metadata'] = {'page_url': event['page_url'], 'speed': i % 3000}
+    return events
+
+
+def user_pool(events):
+    return [{
+        'user_id': event['user_id'],
+        'fingerprint': {'user_agent': 'Mozilla/5.0', 'screen_resolution': '1920x1080', 'timezone': 'Europe/Brussels'},
+        'metadata': {'first_page': event['page_url']},
+        'total_interactions': i,
+        'total_sessions': i // 10
+    } for i, event in enumerate(events)]
+
+
+def post_pool(fixtures):
+    bodies = load_fixtures(fixtures) if fixtures else synthetic_fixtures()
+    seen_ids = set()
+    posts = []
+    for body in bodies:
+        posts.extend(parse_listing(io.BytesIO(body), seen_ids))
+    return posts
+
+
+def long_text(n):
+    words = ['what', 'a', 'brilliant', 'goal', 'for', 'the', 'Lionesses', 'in', 'the', 'final', 'sad',
+             'injury'] + [f"#{tag}" for tag in HASHTAGS]
+    return ' '.join(islice(cycle(words), n))
+
+
+def cases(events, users, posts):
+    """(name, unit, build(n), run(input)) for every hot function."""
+    items = lambda pool: lambda n: list(islice(cycle(pool), n))
+    texts = [f"{post.title} {post.selftext}" for post in posts]
+
+    return [
+        ('validate_tracking_data', 'event', items(events),
+         lambda batch: [validate_tracking_data(event) for event in batch]),
+        ('sanitize_tracking_data', 'event', items(events),
+         lambda batch: [sanitize_tracking_data(event) for event in batch]),
+        ('is_valid_uid + session_id', 'event', items(events),
+         lambda batch: [is_valid_uid(event['user_id']) and is_valid_session_id(event['session_id'])
+                        for event in batch]),
+        ('Interaction.from_dict/to_dict', 'event', items(events),
+         lambda batch: [Interaction.from_dict(event).to_dict() for event in batch]),
+        ('User.from_dict/to_dict', 'user', items(users),
+         lambda batch: [User.from_dict(user).to_dict() for user in batch]),
+        ('extract_hashtags', 'post', items(texts),
+         lambda batch: [reddit_service.extract_hashtags(text) for text in batch]),
+        ('analyze_sentiment', 'post', items(posts),
+         lambda batch: [reddit_service.analyze_sentiment(f"{post.title} {post.selftext}", post.score,
+                                                         post.num_comments) for post in batch]),
+        ('extract_hashtags', 'word', long_text, reddit_service.extract_hashtags),
+        ('analyze_sentiment', 'word', long_text, lambda text: reddit_service.analyze_sentiment(text, 0, 0)),
+        ('_process_posts', 'post', items(posts), reddit_service._process_posts)
+    ]
+
+
+def timed_run(run, data):
+    """Seconds per call, repeating short calls until MIN_TIME has passed."""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        run(data)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_TIME or calls >= 1000:
+            return elapsed / calls
+
+
+def allocations(run, data):
+    gc.collect()
+    tracemalloc.start()
+    result = run(data)
+    _, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+    del result
+    return peak, blocks
+
+
+def exponent(points):
+    fitted = [(n, seconds) for n, seconds in points if n >= FIT_FROM and seconds > 0]
+    if len(fitted) < 2:
+        return None
+    slope, _ = np.polyfit([math.log(n) for n, _ in fitted], [math.log(s) for _, s in fitted], 1)
+    return float(slope)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-n', type=int, default=100000)
+    parser.add_argument('--fixtures', help='directory of recorded Reddit listings')
+    parser.add_argument('--only', help='run only cases whose name contains this')
+    parser.add_argument('--max-exponent', type=float, default=1.3)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    events = event_pool()
+    posts = post_pool(args.fixtures)
+    print(f"{len(events)} pooled events, {len(posts)} pooled posts"
+          f" ({'fixtures in ' + args.fixtures if args.fixtures else 'synthetic listings'})\n")
+
+    sizes = [10 ** power for power in range(int(math.log10(args.max_n)) + 1)]
+    results = []
+    for name, unit, build, run in cases(events, user_pool(events), posts):
+        if args.only and args.only not in name:
+            continue
+        points = []
+        rows = []
+        for n in sizes:
+            data = build(n)
+            seconds = timed_run(run, data)
+            # Allocation tracing is slow; the largest size adds nothing the others do not show
+            peak, blocks = allocations(run, data) if n <= max(sizes[-1] // 10, 1) else (None, None)
+            del data
+            points.append((n, seconds))
+            rows.append([f"{n:,}", f"{seconds * 1000:.3f}", f"{seconds / n * 1e6:.3f}",
+                         f"{peak / n:.0f}" if peak is not None else '-',
+                         f"{blocks / n:.1f}" if blocks is not None else '-'])
+            results.append({'case': name, 'unit': unit, 'n': n, 'seconds': seconds,
+                            'peak_bytes': peak, 'live_blocks': blocks})
+
+        slope = exponent(points)
+        print(f"{name} (n = {unit}s)" + (f", exponent {slope:.2f}" if slope is not None else ''))
+        print_table(['n', 'ms', f"us/{unit}", f"peak B/{unit}", f"blocks/{unit}"], rows)
+        print()
+        for result in results:
+            if result['case'] == name and result['unit'] == unit:
+                result['exponent'] = slope
+
+    regressions = {(r['case'], r['unit']): r['exponent'] for r in results
+                   if r['exponent'] is not None and r['exponent'] > args.max_exponent}
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'max_exponent': args.max_exponent, 'results': results}, f, indent=2)
+        print(f"✓ Results written to {args.output}")
+
+    if regressions:
+        for (name, unit), slope in regressions.items():
+            print(f"✗ {name} per {unit} scales with exponent {slope:.2f} (limit {args.max_exponent})")
+        raise SystemExit(1)
+    print(f"✓ All cases scale with exponent <= {args.max_exponent}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+"""
+Memory and latency of 100k-row admin listings, old vs slotted and projected.
+
+    python -m benchmarks.bench_listing_models --rows 100000
+    python -m benchmarks.bench_listing_models --mongo
+
+Models: building and encoding `rows` Users and Interactions with the
+previous dict-backed classes (kept below for reference) and with the
+current slotted ones. "retained" is the memory the objects hold while
+alive.
+
+Listing decode: /api/admin/interactions rows are built from documents
+decoded out of BSON batches like the ones the server sends. It is run
+with full documents and with the listing projection, both as dicts and as
+RawBSONDocument. RawBSONDocument only pays off when most fields are never
+read, and the listing reads all of them.
+
+With --mongo the rows are also written to a scratch collection at
+MONGODB_URI and read back with find(), with and without the projection.
+"""
+
+import argparse
+import gc
+import os
+import time
+import tracemalloc
+from datetime import datetime
+
+import bson
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+
+from benchmarks.common import print_table
+from jobs.generate_dataset import generate_chunk, parse_end, user_event_counts
+from models.interaction import Interaction, OPTIONAL_FIELDS
+from models.user import User
+from routes.admin import INTERACTION_LISTING_PROJECTION
+
+
+class LegacyUser:
+    """The dict-backed User this benchmark compares against."""
+
+    def __init__(self, user_id=None, fingerprint=None, metadata=None):
+        self.user_id = user_id
+        self.fingerprint = fingerprint or {}
+        self.metadata = metadata or {}
+        self.created_at = datetime.now()
+        self.last_seen = datetime.now()
+        self.total_interactions = 0
+        self.total_sessions = 0
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'fingerprint': self.fingerprint,
+            'metadata': self.metadata,
+            'created_at': self.created_at,
+            'last_seen': self.last_seen,
+            'total_interactions': self.total_interactions,
+            'total_sessions': self.total_sessions
+        }
+
+    @staticmethod
+    def from_dict(data):
+        user = LegacyUser(
+            user_id=data.get('user_id'),
+            fingerprint=data.get('fingerprint', {}),
+            metadata=data.get('metadata', {})
+        )
+        if 'created_at' in data:
+            user.created_at = data['created_at']
+        if 'last_seen' in data:
+            user.last_seen = data['last_seen']
+        user.total_interactions = data.get('total_interactions', 0)
+        user.total_sessions = data.get('total_sessions', 0)
+        return user
+
+
+class LegacyInteraction:
+    """The dict-backed Interaction this benchmark compares against."""
+
+    def __init__(self, user_id, event_type, data=None, timestamp=None, session_id=None, **fields):
+        self.user_id = user_id
+        self.event_type = event_type
+        self.data = data or {}
+        self.timestamp = timestamp or datetime.utcnow()
+        self.session_id = session_id or (data.get('session_id') if data else None)
+        self.fields = {k: v for k, v in fields.items() if k in OPTIONAL_FIELDS and v is not None}
+
+    def to_dict(self):
+        interaction = {
+            'user_id': self.user_id,
+            'event_type': self.event_type,
+            'timestamp': self.timestamp,
+            'session_id': self.session_id,
+            'data': self.data
+        }
+        interaction.update(self.fields)
+        return interaction
+
+    @staticmethod
+    def from_dict(data):
+        return LegacyInteraction(
+            user_id=data.get('user_id'),
+            event_type=data.get('event_type'),
+            data=data.get('data'),
+            timestamp=data.get('timestamp'),
+            session_id=data.get('session_id'),
+            **{k: data[k] for k in OPTIONAL_FIELDS if k in data}
+        )
+
+
+def dataset(rows):
+    users_needed = max(1, rows // 40)
+    counts = user_event_counts(users_needed, rows, 1.0, seed=5)
+    users, _, interactions = generate_chunk(0, 0, counts, 5, parse_end('2026-10-01'), 30)
+    # Repeat users up to `rows` so both models are compared on the same count
+    users = (users * (rows // len(users) + 1))[:rows]
+    return users, interactions[:rows]
+
+
+def retained(build):
+    """Bytes still allocated while the result of build() is alive."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def timed(fn):
+    """Seconds for one call, with the collector paused as timeit does:
+    otherwise whichever case happens to trigger a full collection over
+    the other live rows is charged for it."""
+    gc.collect()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        fn()
+        return time.perf_counter() - started
+    finally:
+        gc.enable()
+
+
+def model_rows(users, interactions):
+    rows = []
+    for name, legacy, current, docs in (('User', LegacyUser, User, users),
+                                         ('Interaction', LegacyInteraction, Interaction, interactions)):
+        for label, cls in (('dict-backed', legacy), ('slotted', current)):
+            held = retained(lambda: [cls.from_dict(doc) for doc in docs])
+            build_seconds = min(timed(lambda: [cls.from_dict(doc) for doc in docs]) for _ in range(3))
+            objects = [cls.from_dict(doc) for doc in docs]
+            encode_seconds = min(timed(lambda: [obj.to_dict() for obj in objects]) for _ in range(3))
+            del objects
+            rows.append([name, label, f"{build_seconds * 1000:.0f}", f"{encode_seconds * 1000:.0f}",
+                         f"{held / 1e6:.1f}", f"{held / len(docs):.0f}"])
+    return rows
+
+
+def listing_row(doc):
+    return {
+        'user_id': doc['user_id'],
+        'event_type': doc['event_type'],
+        'timestamp': datetime.fromtimestamp(doc['timestamp']).isoformat(),
+        'element': doc.get('element'),
+        'page_url': doc.get('page_url')
+    }
+
+
+def bson_batches(docs, batch=1000):
+    return [b''.join(bson.encode(doc) for doc in docs[i:i + batch]) for i in range(0, len(docs), batch)]
+
+
+def decode_rows(interactions):
+    fields = [field for field, include in INTERACTION_LISTING_PROJECTION.items() if include]
+    projected = [{field: doc[field] for field in fields if field in doc} for doc in interactions]
+    raw = CodecOptions(document_class=RawBSONDocument)
+
+    rows = []
+    for label, docs in (('full documents', interactions), ('projected', projected)):
+        batches = bson_batches(docs)
+        wire = sum(len(batch) for batch in batches)
+        for decoder, options in (('dict', None), ('RawBSONDocument', raw)):
+            def build():
+                return [listing_row(doc) for batch in batches
+                        for doc in (bson.decode_all(batch, options) if options else bson.decode_all(batch))]
+            seconds = min(timed(build) for _ in range(3))
+            gc.collect()
+            tracemalloc.start()
+            build()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            rows.append([label, decoder, f"{wire / 1e6:.1f}", f"{seconds * 1000:.0f}", f"{peak / 1e6:.1f}"])
+    return rows
+
+
+def mongo_rows(interactions):
+    from pymongo import MongoClient
+
+    client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017'))
+    collection = client[os.getenv('MONGO_DB', 'womens_football_analytics')]['bench_listing_models']
+    collection.drop()
+    collection.insert_many([dict(doc) for doc in interactions], ordered=False)
+
+    rows = []
+    try:
+        for label, projection in (('full documents', None), ('projected', INTERACTION_LISTING_PROJECTION)):
+            def read():
+                return [listing_row(doc) for doc in collection.find({}, projection).batch_size(10000)]
+            seconds = min(timed(read) for _ in range(3))
+            rows.append([label, f"{seconds * 1000:.0f}"])
+    finally:
+        collection.drop()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--mongo', action='store_true', help='also read the rows back from MONGODB_URI')
+    args = parser.parse_args()
+
+    users, interactions = dataset(args.rows)
+    print(f"{len(users):,} users and {len(interactions):,} interactions\n")
+
+    print_table(['model', 'class', 'from_dict ms', 'to_dict ms', 'retained MB', 'B/object'],
+                model_rows(users, interactions))
+    print()
+    print_table(['listing input', 'decoded as', 'wire MB', 'decode + rows ms', 'peak MB'],
+                decode_rows(interactions))
+    if args.mongo:
+        print()
+        print_table(['find()', 'ms'], mongo_rows(interactions))
+
+
+if __name__ == '__main__':
+    main()
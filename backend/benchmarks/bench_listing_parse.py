@@ -0,0 +1,194 @@
+"""
+Peak memory and parse time of Reddit listing handling, old vs streaming.
+
+    python -m benchmarks.bench_listing_parse
+    python -m benchmarks.bench_listing_parse --record fixtures/reddit
+    python -m benchmarks.bench_listing_parse --fixtures fixtures/reddit
+
+"old" is the previous path: response.json(), the full `data` dict of every
+post collected into all_posts, then copied again into unique_posts.
+"streaming" is parse_listing(): posts are projected into RedditPost
+records as the body is read, and duplicates are dropped on the way.
+
+--record saves the raw bodies of every listing the dashboard polls, so
+later runs can replay them offline with --fixtures. Without fixtures,
+synthetic listings shaped like Reddit's (about 100 fields per post,
+including preview, media and award trees) are used.
+"""
+
+import argparse
+import gc
+import io
+import json
+import os
+import random
+import time
+import tracemalloc
+
+import requests
+
+from benchmarks.common import HASHTAGS, print_table
+from models.reddit_post import parse_listing
+from reddit_service import reddit_service
+
+
+def synthetic_post(rng, post_id):
+    image = lambda w: {'url': f"https://preview.redd.it/{post_id}-{w}.jpg?width={w}", 'width': w, 'height': w // 2}
+    post = {
+        'id': post_id,
+        'name': f"t3_{post_id}",
+        'title': ' '.join(rng.choices(['Lionesses', 'win', 'final', 'goal', 'NWSL', 'match', 'derby',
+                                       'record', 'crowd', 'striker'] + HASHTAGS, k=rng.randint(6, 16))),
+        'selftext': ' '.join(rng.choices(['great', 'game', 'the', 'team', 'played', 'well'], k=rng.randint(0, 120))),
+        'selftext_html': None,
+        'subreddit': rng.choice(['WomensSoccer', 'NWSL', 'BarclaysWSL', 'Lionesses']),
+        'author': f"user{rng.randint(1, 10 ** 6)}",
+        'score': rng.randint(0, 5000),
+        'ups': rng.randint(0, 5000),
+        'downs': 0,
+        'upvote_ratio': round(rng.random(), 2),
+        'num_comments': rng.randint(0, 800),
+        'num_crossposts': rng.randint(0, 5),
+        'created_utc': time.time() - rng.randint(0, 7 * 86400),
+        'permalink': f"/r/x/comments/{post_id}/post/",
+        'url': f"https://i.redd.it/{post_id}.jpg",
+        'preview': {'images': [{
+            'source': image(1920),
+            'resolutions': [image(w) for w in (108, 216, 320, 640, 960, 1080)],
+            'variants': {},
+            'id': post_id
+        }], 'enabled': True},
+        'all_awardings': [{
+            'id': f"award_{i}", 'name': 'Helpful', 'description': 'Thank you stranger. Shows the award.',
+            'icon_url': 'https://www.redditstatic.com/gold/awards/icon/helpful_512.png',
+            'resized_icons': [image(w) for w in (16, 32, 48, 64, 128)],
+            'coin_price': 150, 'count': 1
+        } for i in range(rng.randint(0, 4))],
+        'media': None,
+        'secure_media': None,
+        'media_embed': {},
+        'link_flair_richtext': [{'e': 'text', 't': 'Match Thread'}],
+        'author_flair_richtext': [],
+        'treatment_tags': [],
+        'mod_reports': [],
+        'user_reports': []
+    }
+    # The long tail of flags and counters every listing item carries
+    for i in range(70):
+        post[f"field_{i}"] = rng.choice([None, False, True, 0, '', 'public', rng.random()])
+    return post
+
+
+def synthetic_fixtures(listings=12, per_listing=25, overlap=0.2, seed=3):
+    rng = random.Random(seed)
+    bodies = []
+    next_id = 0
+    for _ in range(listings):
+        children = []
+        for _ in range(per_listing):
+            if next_id and rng.random() < overlap:
+                post_id = f"p{rng.randrange(next_id)}"
+            else:
+                post_id = f"p{next_id}"
+                next_id += 1
+            children.append({'kind': 't3', 'data': synthetic_post(rng, post_id)})
+        bodies.append(json.dumps({'kind': 'Listing', 'data': {'children': children, 'after': None}}).encode())
+    return bodies
+
+
+def record_fixtures(directory):
+    os.makedirs(directory, exist_ok=True)
+    for index, (kind, name) in enumerate(reddit_service.sources()):
+        if kind == 'subreddit':
+            url = f"{reddit_service.base_url}/r/{name}/top.json"
+            params = {'limit': 25, 't': 'week', 'raw_json': 1}
+        else:
+            url = f"{reddit_service.base_url}/search.json"
+            params = {'q': name, 'limit': 20, 'sort': 'relevance', 't': 'month', 'raw_json': 1}
+        response = requests.get(url, headers=reddit_service.headers, params=params, timeout=10)
+        response.raise_for_status()
+        path = os.path.join(directory, f"{index:02d}_{kind}.json")
+        with open(path, 'wb') as f:
+            f.write(response.content)
+        print(f"✓ Recorded {path} ({len(response.content) / 1024:.0f} KB)")
+
+
+def load_fixtures(directory):
+    bodies = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith('.json'):
+            with open(os.path.join(directory, filename), 'rb') as f:
+                bodies.append(f.read())
+    return bodies
+
+
+def old_path(bodies):
+    all_posts = []
+    for body in bodies:
+        for post in json.loads(body).get('data', {}).get('children', []):
+            post_data = post.get('data', {})
+            post_data['source_subreddit'] = 'fixture'
+            all_posts.append(post_data)
+
+    seen_ids = set()
+    unique_posts = []
+    for post in all_posts:
+        post_id = post.get('id')
+        if post_id and post_id not in seen_ids:
+            seen_ids.add(post_id)
+            unique_posts.append(post)
+    return all_posts, unique_posts
+
+
+def streaming_path(bodies):
+    seen_ids = set()
+    posts = []
+    for body in bodies:
+        for post in parse_listing(io.BytesIO(body), seen_ids):
+            post.source_subreddit = 'fixture'
+            posts.append(post)
+    return posts
+
+
+def measure(fn, bodies, repeat):
+    gc.collect()
+    tracemalloc.start()
+    result = fn(bodies)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(bodies)
+        samples.append(time.perf_counter() - start)
+    return min(samples), peak, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', help='directory of recorded listing bodies')
+    parser.add_argument('--record', help='fetch live listings into this directory and exit')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures(args.record)
+        return
+
+    bodies = load_fixtures(args.fixtures) if args.fixtures else synthetic_fixtures()
+    total = sum(len(body) for body in bodies)
+    print(f"{len(bodies)} listings, {total / 1024 / 1024:.1f} MB of JSON "
+          f"({'recorded' if args.fixtures else 'synthetic'})")
+
+    rows = []
+    for name, fn in (('old', old_path), ('streaming', streaming_path)):
+        seconds, peak, retained = measure(fn, bodies, args.repeat)
+        rows.append([name, f"{seconds * 1000:.1f}", f"{peak / 1024 / 1024:.2f}", f"{retained / 1024 / 1024:.2f}"])
+
+    print_table(['path', 'parse ms', 'peak MB', 'retained MB'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Cost of the /metrics instrumentation on the ingest hot path.
+
+    python -m benchmarks.bench_metrics_overhead
+
+First the primitives on their own: a counter increment, a histogram
+observation and one MongoDB command through the listener, from 1 and 8
+threads. Then POST /api/tracking/event through the Flask test client, on
+an app with the request hooks installed and one without, in small
+interleaved batches. Needs MongoDB at MONGODB_URI, like the server itself.
+"""
+
+import argparse
+import os
+import statistics
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+os.environ.setdefault('REDDIT_POLLER_ENABLED', '0')
+
+from benchmarks.common import print_table
+from utils import metrics as metrics_module
+from utils.metrics import Counter, Histogram, MongoCommandMetrics
+
+
+def per_call_ns(fn, calls, threads):
+    def work():
+        for _ in range(calls):
+            fn()
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - start) / (calls * threads) * 1e9
+
+
+def primitives(calls):
+    counter = Counter('bench_total', 'bench', ('event_type', 'outcome'))
+    histogram = Histogram('bench_seconds', 'bench', ('route', 'method', 'status'))
+    listener = MongoCommandMetrics()
+    started = SimpleNamespace(command_name='insert', command={'insert': 'interactions'},
+                              connection_id=('localhost', 27017), request_id=1)
+    succeeded = SimpleNamespace(command_name='insert', duration_micros=800,
+                                connection_id=('localhost', 27017), request_id=1)
+
+    def command():
+        listener.started(started)
+        listener.succeeded(succeeded)
+
+    cases = [
+        ('empty call', lambda: None),
+        ('counter inc', lambda: counter.inc('click', 'stored')),
+        ('histogram observe', lambda: histogram.observe(0.0042, '/api/tracking/event', 'POST', '201')),
+        ('mongo command listener', command)
+    ]
+    return [[name, f"{per_call_ns(fn, calls, 1):.0f}", f"{per_call_ns(fn, calls // 8, 8):.0f}"]
+            for name, fn in cases]
+
+
+def make_app(enabled):
+    from app import create_app
+
+    metrics_module.ENABLED = enabled
+    return create_app()
+
+
+def ingest_round(client, requests):
+    user_id = f"user_{uuid.uuid4().hex[:12]}"
+    session_id = f"session_{uuid.uuid4().hex[:12]}_{int(time.time())}"
+    start = time.perf_counter()
+    for i in range(requests):
+        client.post('/api/tracking/event', json={
+            'user_id': user_id,
+            'session_id': session_id,
+            'event_type': 'click' if i % 4 == 0 else 'mouse_move',
+            'timestamp': time.time(),
+            'page_url': '/dashboard',
+            'element': 'button',
+            'x': i % 1920,
+            'y': i % 1080
+        })
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=200000)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--rounds', type=int, default=6)
+    args = parser.parse_args()
+
+    print_table(['primitive', 'ns/call (1 thread)', 'ns/call (8 threads)'], primitives(args.calls))
+
+    clients = {
+        'without metrics': make_app(False).test_client(),
+        'with metrics': make_app(True).test_client()
+    }
+    # Small interleaved batches in alternating order, so both apps see the same database state
+    samples = {name: [] for name in clients}
+    names = list(clients)
+    for round_number in range(args.rounds * args.requests // 50):
+        for name in (names if round_number % 2 == 0 else names[::-1]):
+            samples[name].append(ingest_round(clients[name], 50))
+
+    baseline = statistics.median(samples['without metrics'])
+    rows = []
+    for name, values in samples.items():
+        median = statistics.median(values)
+        rows.append([name, f"{median * 1e6:.0f}", f"{(median / baseline - 1) * 100:+.1f}%"])
+    print()
+    print_table(['app', 'us/event (median)', 'overhead'], rows)
+
+
+if __name__ == '__main__':
+    main()
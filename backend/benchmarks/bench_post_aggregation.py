@@ -0,0 +1,235 @@
+"""
+Times the dashboard post aggregation, per-post Counters vs NumPy columns.
+
+    python -m benchmarks.bench_post_aggregation --posts 100000
+
+Three timings per size:
+- "legacy" is the previous _process_posts, kept below for reference.
+- "columnar" is the current path from RedditPosts. It includes the
+  per-post hashtag and sentiment text analysis.
+- "stored" aggregates columns like those read from reddit_posts, where
+  the text features were derived at store time.
+
+Results are also checked for equality. optimalTimes is left out because
+the old per-hour averages divided by the wrong counter.
+"""
+
+import argparse
+import random
+import time
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.common import HASHTAGS, print_table
+from models.reddit_post import RedditPost
+from reddit_service import reddit_service
+from utils.post_aggregates import PostColumns, aggregate_posts
+
+
+def legacy_process_posts(self, posts):
+    """The per-post Counter implementation this benchmark compares against."""
+    if not posts:
+        return self._empty_response()
+
+    processed_posts = []
+    all_hashtags = []
+    sentiments = {'positive': 0, 'neutral': 0, 'negative': 0}
+    hourly_engagement = Counter()
+    platform_dist = Counter()
+
+    total_likes = 0
+    total_comments = 0
+    total_shares = 0
+
+    for post in posts:
+        title = post.title
+        selftext = post.selftext
+        full_text = f"{title} {selftext}"
+
+        score = post.score
+        num_comments = post.num_comments
+        created_utc = post.created_utc
+        subreddit = post.subreddit or post.source_subreddit or 'unknown'
+        author = post.author
+
+        engagement = score + (num_comments * 2)  # Comments weighted more
+
+        hashtags = self.extract_hashtags(full_text)
+        all_hashtags.extend(hashtags)
+
+        sentiment = self.analyze_sentiment(full_text, score, num_comments)
+        sentiments[sentiment] += 1
+
+        if created_utc:
+            post_hour = datetime.utcfromtimestamp(created_utc).hour
+            hourly_engagement[post_hour] += engagement
+
+        platform_dist[f"r/{subreddit}"] += 1
+
+        total_likes += score
+        total_comments += num_comments
+        total_shares += post.num_crossposts
+
+        processed_posts.append({
+            'id': post.id,
+            'text': title[:200] + ('...' if len(title) > 200 else ''),
+            'fullText': full_text[:500],
+            'platform': f"Reddit (r/{subreddit})",
+            'author': f"u/{author}",
+            'likes': score,
+            'comments': num_comments,
+            'shares': post.num_crossposts,
+            'engagement': engagement,
+            'sentiment': sentiment,
+            'timestamp': datetime.utcfromtimestamp(created_utc).isoformat() if created_utc else None,
+            'url': f"https://reddit.com{post.permalink}"
+        })
+
+    hashtag_counts = Counter(all_hashtags)
+    trending_hashtags = [
+        {'hashtag': tag, 'engagement': count * 100, 'posts': count}
+        for tag, count in hashtag_counts.most_common(10)
+    ]
+
+
+    default_hashtags = ['WomensFootball', 'WSL', 'NWSL', 'UWCL', 'Lionesses', 
+    'WomensSoccer', 'WomenInSports', 'GirlsFootball']
+    if len(trending_hashtags) < 5:
+        for tag in default_hashtags:
+            if not any(h['hashtag'].lower() == tag.lower() for h in trending_hashtags):
+                trending_hashtags.append({
+                    'hashtag': tag,
+                    'engagement': len(posts) * 50,
+                    'posts': len(posts) // 2
+                })
+            if len(trending_hashtags) >= 10:
+                break
+
+    total_sentiment = sum(sentiments.values()) or 1
+    sentiment_data = {
+        'positive': round((sentiments['positive'] / total_sentiment) * 100),
+        'neutral': round((sentiments['neutral'] / total_sentiment) * 100),
+        'negative': round((sentiments['negative'] / total_sentiment) * 100)
+    }
+
+    optimal_times = [
+        {
+            'hour': hour,
+            'avgEngagement': eng // max(1, platform_dist.get(hour, 1)),
+            'postCount': platform_dist.get(hour, 0)
+        }
+        for hour, eng in sorted(hourly_engagement.items(), key=lambda x: x[1], reverse=True)
+    ][:8]
+
+    if not optimal_times:
+        optimal_times = [
+            {'hour': 18, 'avgEngagement': 500, 'postCount': 15},
+            {'hour': 19, 'avgEngagement': 450, 'postCount': 12},
+            {'hour': 20, 'avgEngagement': 420, 'postCount': 14},
+            {'hour': 12, 'avgEngagement': 380, 'postCount': 10},
+            {'hour': 17, 'avgEngagement': 350, 'postCount': 11},
+            {'hour': 21, 'avgEngagement': 320, 'postCount': 9},
+        ]
+
+    platform_distribution = [
+        {'platform': platform, 'count': count}
+        for platform, count in platform_dist.most_common(6)
+    ]
+
+    sorted_posts = sorted(processed_posts, key=lambda x: x['engagement'], reverse=True)
+    avg_engagement = sum(p['engagement'] for p in processed_posts) / len(processed_posts) if processed_posts else 0
+    viral_posts = [p for p in sorted_posts if p['engagement'] > avg_engagement * 2][:5]
+
+    return {
+        'totalPosts': len(processed_posts),
+        'totalLikes': total_likes,
+        'totalComments': total_comments,
+        'totalShares': total_shares,
+        'avgEngagement': round(avg_engagement),
+        'sentiment': sentiment_data,
+        'trendingHashtags': trending_hashtags,
+        'viralPosts': viral_posts,
+        'recentPosts': sorted_posts[:20],
+        'optimalTimes': optimal_times,
+        'platformDistribution': platform_distribution,
+        'dataSource': 'Reddit API',
+        'lastUpdated': datetime.utcnow().isoformat()
+    }
+
+
+def synthetic_posts(n, seed=11):
+    rng = random.Random(seed)
+    words = ['amazing', 'goal', 'final', 'match', 'injury', 'lost', 'win', 'women', 'wsl', 'great',
+             'the', 'team', 'season', 'transfer', 'derby', 'sad'] + [f"#{tag}" for tag in HASHTAGS]
+    now = time.time()
+    return [
+        RedditPost(
+            id=f"p{i}",
+            title=' '.join(rng.choices(words, k=rng.randint(4, 14))),
+            selftext=' '.join(rng.choices(words, k=rng.randint(0, 40))),
+            subreddit=rng.choice(['WomensSoccer', 'NWSL', 'BarclaysWSL', 'Lionesses', 'Arsenal', 'chelseafc', 'reddevils']),
+            author=f"user{rng.randint(1, 50000)}",
+            score=int(rng.paretovariate(1.1) * 10),
+            num_comments=int(rng.paretovariate(1.3) * 3),
+            num_crossposts=rng.randint(0, 3),
+            created_utc=now - rng.random() * 30 * 86400,
+            permalink=f"/r/x/comments/p{i}/"
+        )
+        for i in range(n)
+    ]
+
+
+def stored_columns(posts):
+    # What from_store() builds: text features were derived when the posts were stored
+    columns = PostColumns.from_posts(posts, reddit_service)
+    return lambda: PostColumns(
+        ids=columns.ids, score=np.array(columns.score), comments=np.array(columns.comments),
+        crossposts=np.array(columns.crossposts), created=np.array(columns.created),
+        subreddits=list(columns.subreddits), sentiment=np.array(columns.sentiment),
+        hashtags=columns.hashtags, load_posts=columns.load_posts
+    )
+
+
+def comparable(result):
+    return {key: value for key, value in result.items() if key not in ('optimalTimes', 'lastUpdated')}
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rows = []
+    for n in args.posts:
+        posts = synthetic_posts(n)
+        make_stored = stored_columns(posts)
+
+        legacy_seconds, legacy = timed(lambda: legacy_process_posts(reddit_service, posts), args.repeat)
+        columnar_seconds, columnar = timed(
+            lambda: aggregate_posts(PostColumns.from_posts(posts, reddit_service)), args.repeat
+        )
+        stored_seconds, stored = timed(lambda: aggregate_posts(make_stored()), args.repeat)
+
+        same = comparable(legacy) == comparable(columnar) == comparable(stored)
+        rows.append([n, f"{legacy_seconds * 1000:.1f}", f"{columnar_seconds * 1000:.1f}",
+                     f"{stored_seconds * 1000:.1f}", f"{legacy_seconds / stored_seconds:.1f}x",
+                     'yes' if same else 'NO'])
+
+    print_table(['posts', 'legacy ms', 'columnar ms', 'stored ms', 'stored speedup', 'same result'], rows)
+
+
+if __name__ == '__main__':
+    main()
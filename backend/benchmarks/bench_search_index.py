@@ -0,0 +1,98 @@
+"""
+Times local post search against a scan over the same posts.
+
+    python -m benchmarks.bench_search_index --posts 50000
+
+Posts are synthetic and indexed in memory only; MongoDB is not needed.
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.common import HASHTAGS, percentile, print_table
+from utils.search_index import SearchIndex, tokenize
+
+
+VOCABULARY = [
+    'goal', 'match', 'final', 'league', 'season', 'transfer', 'striker', 'keeper',
+    'injury', 'derby', 'champions', 'lionesses', 'matildas', 'arsenal', 'chelsea',
+    'barcelona', 'lyon', 'wolfsburg', 'record', 'attendance', 'stadium', 'coach',
+    'captain', 'debut', 'hattrick', 'penalty', 'var', 'red', 'card', 'highlights'
+] + [tag.lower() for tag in HASHTAGS]
+
+QUERIES = ['lionesses final', 'arsenal striker', 'penalty var', 'champ', 'hattrick debut',
+           'record attendance stadium', 'wsl', 'barc']
+
+
+def synthetic_posts(n, seed=7):
+    rng = random.Random(seed)
+    # Football words plus a long tail of filler, drawn with Zipf-like weights
+    filler = [''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=rng.randint(3, 9))) for _ in range(20000)]
+    words = VOCABULARY + filler
+    weights = [1 / (rank + 10) for rank in range(len(words))]
+
+    def text(k):
+        return ' '.join(rng.choices(words, weights, k=k))
+
+    for i in range(n):
+        yield {
+            '_id': f"p{i}",
+            'title': text(rng.randint(5, 12)),
+            'selftext': text(rng.randint(0, 60)),
+            'subreddit': rng.choice(['WomensSoccer', 'NWSL', 'BarclaysWSL', 'Lionesses']),
+            'permalink': f"/r/x/{i}"
+        }
+
+
+def scan(posts, query, limit=30):
+    # What answering without an index costs: look at every post's text
+    tokens = tokenize(query)
+    hits = []
+    for post in posts:
+        text = f"{post['title']} {post['selftext']}".lower()
+        matched = sum(1 for token in tokens if token in text)
+        if matched:
+            hits.append((matched, post['_id']))
+    hits.sort(reverse=True)
+    return hits[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=50000)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    posts = list(synthetic_posts(args.posts))
+    index = SearchIndex()
+    index._loaded = True
+    index._last_sync = float('inf')
+
+    start = time.perf_counter()
+    for post in posts:
+        index._add(post)
+    build = time.perf_counter() - start
+    print(f"Indexed {len(posts)} posts ({len(index.postings)} terms) in {build:.2f}s")
+
+    rows = []
+    for query in QUERIES:
+        index_times, scan_times = [], []
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            results = index.search(query)
+            index_times.append(time.perf_counter() - start)
+        for _ in range(max(1, args.rounds // 10)):
+            start = time.perf_counter()
+            scan(posts, query)
+            scan_times.append(time.perf_counter() - start)
+        rows.append([query, len(results),
+                     f"{percentile(index_times, 50) * 1000:.2f}",
+                     f"{percentile(index_times, 99) * 1000:.2f}",
+                     f"{percentile(scan_times, 50) * 1000:.1f}"])
+
+    print_table(['query', 'results', 'index p50 ms', 'index p99 ms', 'scan p50 ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
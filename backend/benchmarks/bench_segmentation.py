@@ -0,0 +1,72 @@
+"""
+Times the user segmentation job stages on synthetic rollups.
+
+    python -m benchmarks.bench_segmentation --users 1000000
+
+Mongo is not needed: rollup documents are generated in the shape that the
+job's aggregation produces and fed straight into the feature builder.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import HASHTAGS, print_table
+from jobs.segment_users import (
+    build_feature_matrix, normalize_features, minibatch_kmeans, assign, DEFAULT_SEGMENTS, EVENT_FEATURES
+)
+
+
+def synthetic_rollups(n_users, seed=0):
+    rng = np.random.default_rng(seed)
+    # A few behavioural archetypes so the clustering has something to find
+    archetypes = rng.dirichlet(np.ones(len(EVENT_FEATURES)), size=6)
+    peak_hours = rng.integers(0, 24, size=6)
+
+    for i in range(n_users):
+        kind = i % 6
+        events = rng.multinomial(int(rng.integers(5, 60)), archetypes[kind])
+        cells = []
+        for event_index in np.flatnonzero(events):
+            hour = int((peak_hours[kind] + rng.integers(-2, 3)) % 24)
+            cells.append({'event_type': EVENT_FEATURES[event_index], 'hour': hour,
+                          'hashtag': None, 'count': int(events[event_index])})
+        if events[0]:
+            cells.append({'event_type': 'click', 'hour': int(peak_hours[kind]),
+                          'hashtag': HASHTAGS[(kind + i) % len(HASHTAGS)], 'count': 1})
+        yield {'_id': f"user_{i:012x}", 'cells': cells}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--segments', type=int, default=DEFAULT_SEGMENTS)
+    args = parser.parse_args()
+
+    rows = []
+
+    start = time.perf_counter()
+    user_ids, counts, hashtags = build_feature_matrix(synthetic_rollups(args.users))
+    rows.append(('generate + build features', time.perf_counter() - start))
+
+    start = time.perf_counter()
+    X, _, _ = normalize_features(counts, len(hashtags))
+    rows.append(('normalize', time.perf_counter() - start))
+
+    start = time.perf_counter()
+    centroids, iterations = minibatch_kmeans(X, args.segments)
+    rows.append((f"mini-batch k-means ({iterations} iterations)", time.perf_counter() - start))
+
+    start = time.perf_counter()
+    labels, _ = assign(X, centroids)
+    rows.append(('assign all users', time.perf_counter() - start))
+
+    total = sum(seconds for _, seconds in rows)
+    print(f"{len(user_ids):,} users x {X.shape[1]} features ({X.nbytes / 2**20:.0f} MiB), {args.segments} segments\n")
+    print_table(['stage', 'seconds'], [(name, f"{seconds:.2f}") for name, seconds in rows] + [('total', f"{total:.2f}")])
+    print(f"\nSegment sizes: {np.bincount(labels, minlength=len(centroids)).tolist()}")
+
+
+if __name__ == '__main__':
+    main()
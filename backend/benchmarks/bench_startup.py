@@ -0,0 +1,122 @@
+"""
+How fast a fresh backend process takes traffic.
+
+    python -m benchmarks.bench_startup --server gunicorn --runs 5
+    python -m benchmarks.bench_startup --server dev --mongodb-down
+
+Each run starts the server from scratch and polls /health (liveness) and
+/ready (MongoDB reachable and indexes reconciled) every 5 ms, recording
+how long after the spawn each first answered 200. In-process, the same
+is measured for importing the app and running create_app(), with the
+modules it left for the background preload.
+
+With --mongodb-down the server points at a closed port: liveness must
+still come up at once, while /ready stays 503.
+"""
+
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import print_table
+from benchmarks.load_compare import SERVERS, stop_server
+
+
+IN_PROCESS = """
+import sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+lazy = [name for name in app.HEAVY_MODULES if name not in sys.modules]
+print(f"{(imported - started) * 1000:.1f} {(created - imported) * 1000:.1f} {','.join(lazy) or '-'}")
+"""
+
+
+def first_ok(process, port, path, deadline):
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"✗ Server exited with code {process.returncode} before {path} answered")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', path)
+            if conn.getresponse().status == 200:
+                return time.perf_counter()
+        except OSError:
+            pass
+        time.sleep(0.005)
+    return None
+
+
+def server_run(name, port, env, timeout):
+    started = time.perf_counter()
+    process = subprocess.Popen(SERVERS[name](port), env=env, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, start_new_session=True)
+    try:
+        deadline = started + timeout
+        live = first_ok(process, port, '/health', deadline)
+        ready = first_ok(process, port, '/ready', deadline) if live else None
+    finally:
+        stop_server(process)
+    return (live - started if live else None), (ready - started if ready else None)
+
+
+def in_process_run(env):
+    output = subprocess.run([sys.executable, '-c', IN_PROCESS], env=env, capture_output=True, text=True)
+    imported, created, lazy = output.stdout.strip().splitlines()[-1].split(' ')
+    return float(imported), float(created), lazy
+
+
+def ms(samples):
+    values = [sample for sample in samples if sample is not None]
+    if not values:
+        return 'never'
+    text = f"{statistics.median(values) * 1000:.0f}"
+    return text if len(values) == len(samples) else f"{text} ({len(values)}/{len(samples)})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', choices=list(SERVERS), default='gunicorn')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=0, help='gunicorn workers (default: gunicorn.conf.py)')
+    parser.add_argument('--port', type=int, default=5402)
+    parser.add_argument('--timeout', type=float, default=15)
+    parser.add_argument('--mongodb-down', action='store_true', help='point the server at a closed port')
+    args = parser.parse_args()
+
+    env = dict(os.environ, PORT=str(args.port), FLASK_DEBUG='0', REDDIT_POLLER_ENABLED='0')
+    if args.workers:
+        env['WEB_CONCURRENCY'] = str(args.workers)
+    if args.mongodb_down:
+        env['MONGODB_URI'] = 'mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=5000'
+
+    imports, creates = [], []
+    for _ in range(args.runs):
+        imported, created, lazy = in_process_run(env)
+        imports.append(imported / 1000)
+        creates.append(created / 1000)
+
+    lives, readies = [], []
+    for _ in range(args.runs):
+        live, ready = server_run(args.server, args.port, env, args.timeout)
+        lives.append(live)
+        readies.append(ready)
+
+    print(f"{args.server}, {args.runs} runs, MongoDB {'down' if args.mongodb_down else 'at MONGODB_URI'}")
+    print_table(['phase', 'median ms'], [
+        ['import app', ms(imports)],
+        ['create_app()', ms(creates)],
+        ['spawn -> /health 200', ms(lives)],
+        ['spawn -> /ready 200', ms(readies)]
+    ])
+    print(f"\nLeft to the background preload: {lazy}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Response size and latency of the admin user views for the heaviest user.
+
+    python -m benchmarks.bench_user_timeline --events 20000
+    python -m benchmarks.bench_user_timeline --mongo
+
+"previous details" repeats what /api/admin/users/<id> used to read (the
+latest 500 full interaction documents and every session document) and
+encodes it. The other rows call the current endpoints through the Flask
+test client: the details view, and the timeline for the whole history,
+its last day and its last hour (the zoom at which raw events are
+included).
+
+By default a synthetic dataset from jobs.generate_dataset is loaded into
+mongomock; --mongo uses MONGODB_URI as it is. Response sizes hold in both
+modes, but latencies only with --mongo: mongomock copies the whole
+collection on every aggregate() and has no indexes, so there any
+aggregation costs seconds regardless of the range.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from datetime import datetime
+
+from benchmarks.common import print_table
+
+
+def previous_details(get_collection, user_id):
+    """What the details view read and encoded before the timeline."""
+    interactions = list(get_collection('interactions').find({'user_id': user_id}).sort('timestamp', -1).limit(500))
+    sessions = list(get_collection('sessions').find({'user_id': user_id}))
+    return json.dumps({
+        'interactions': [
+            {
+                'event_type': i['event_type'],
+                'timestamp': datetime.fromtimestamp(i['timestamp']).isoformat(),
+                'element': i.get('element'),
+                'page_url': i.get('page_url'),
+                'x': i.get('x'),
+                'y': i.get('y')
+            }
+            for i in interactions
+        ],
+        'sessions_count': len(sessions)
+    }).encode()
+
+
+def load_mongomock(events):
+    try:
+        import mongomock
+    except ImportError:
+        raise SystemExit("the default mode needs mongomock (pip install mongomock); or pass --mongo")
+    import utils.database as database
+    from jobs.generate_dataset import generate_chunk, parse_end, user_event_counts
+
+    database.MongoClient = mongomock.MongoClient
+    counts = user_event_counts(max(1, events // 40), events, 1.0, seed=3)
+    users, sessions, interactions = generate_chunk(0, 0, counts, 3, parse_end(datetime.now().strftime('%Y-%m-%d')), 90)
+    db = database.get_db()
+    for name, docs in (('users', users), ('sessions', sessions), ('interactions', interactions)):
+        db[name].drop()
+        db[name].insert_many(docs)
+
+
+def measure(fn, runs):
+    samples, body = [], b''
+    for _ in range(runs):
+        started = time.perf_counter()
+        body = fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--mongo', action='store_true', help='use MONGODB_URI instead of mongomock')
+    args = parser.parse_args()
+
+    os.environ.setdefault('REDDIT_POLLER_ENABLED', '0')
+    if not args.mongo:
+        load_mongomock(args.events)
+
+    from app import create_app
+    from utils.database import get_collection
+    from utils.timeline import history_bounds
+
+    heaviest = next(get_collection('interactions').aggregate([
+        {'$group': {'_id': '$user_id', 'count': {'$sum': 1}}},
+        {'$sort': {'count': -1}},
+        {'$limit': 1}
+    ]))
+    user_id = heaviest['_id']
+    first, last = history_bounds(user_id)
+    print(f"{user_id}: {heaviest['count']:,} events over {(last - first) / 86400:.1f} days\n")
+
+    client = create_app().test_client()
+
+    def get(path):
+        def call():
+            response = client.get(path)
+            if response.status_code != 200:
+                raise SystemExit(f"✗ {path} answered {response.status_code}")
+            return response.data
+        return call
+
+    timeline = f"/api/admin/users/{user_id}/timeline"
+    cases = [
+        ('previous details', lambda: previous_details(get_collection, user_id)),
+        ('details', get(f"/api/admin/users/{user_id}")),
+        ('timeline, all history', get(timeline)),
+        ('timeline, last day', get(f"{timeline}?start={last + 1 - 86400}&end={last + 1}")),
+        ('timeline, last hour', get(f"{timeline}?start={last + 1 - 3600}&end={last + 1}"))
+    ]
+    rows = []
+    for label, fn in cases:
+        ms, size = measure(fn, args.runs)
+        rows.append([label, f"{ms:.1f}", f"{size / 1000:.1f}"])
+    print_table(['view', 'median ms', 'response kB'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Run benchmarks from the backend directory, e.g.
+    python -m benchmarks.bench_analytics_cache
+"""
+
+import random
+import statistics
+import time
+
+
+EVENT_MIX = [
+    ('mouse_move', 45),
+    ('hover', 20),
+    ('scroll', 12),
+    ('click', 10),
+    ('element_focus', 5),
+    ('key_press', 4),
+    ('page_view', 3),
+    ('form_submit', 1)
+]
+
+PAGES = ['/', '/dashboard', '/social', '/trending', '/reddit', '/settings']
+HASHTAGS = ['WomensFootball', 'UWCL', 'RedFlames', 'WomenInSports', 'FemaleSoccer',
+            'NWSL', 'WSL', 'Lionesses', 'Matildas', 'USWNT']
+
+
+def synthetic_events(n, users=1000, hours=24, seed=42):
+    rng = random.Random(seed)
+    now = time.time()
+    event_types = [name for name, _ in EVENT_MIX]
+    weights = [weight for _, weight in EVENT_MIX]
+    user_ids = [f"user_{rng.getrandbits(48):012x}" for _ in range(users)]
+
+    events = []
+    for event_type in rng.choices(event_types, weights, k=n):
+        event = {
+            'user_id': user_ids[min(int(rng.paretovariate(1.2)) - 1, users - 1)],
+            'event_type': event_type,
+            'timestamp': now - rng.random() * hours * 3600,
+            'page_url': rng.choice(PAGES)
+        }
+        if event_type == 'click':
+            event['element'] = f"hashtag-{rng.choice(HASHTAGS)}" if rng.random() < 0.4 else 'button'
+            event['x'] = rng.randint(0, 1920)
+            event['y'] = rng.randint(0, 1080)
+        elif event_type == 'mouse_move':
+            event['x'] = rng.randint(0, 1920)
+            event['y'] = rng.randint(0, 1080)
+        elif event_type == 'scroll':
+            event['scroll_depth'] = rng.randint(0, 100)
+        elif event_type == 'hover':
+            event['element'] = 'card'
+            event['duration'] = rng.randint(0, 5000)
+        events.append(event)
+    return events
+
+
+def timed(fn, repeat=5):
+    """Run fn repeatedly and return (median seconds, last result)."""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print('  '.join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print('  '.join('-' * w for w in widths))
+    for row in rows:
+        print('  '.join(str(c).ljust(w) for c, w in zip(row, widths)))
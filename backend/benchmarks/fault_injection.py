@@ -0,0 +1,276 @@
+"""
+Fault-injection checks for the Reddit client against a local stub server.
+
+    python -m benchmarks.fault_injection
+
+The stub answers /r/<name>/top.json and /search.json the way Reddit does.
+Each scenario switches it into a failure mode: errors, hangs, an exhausted
+rate limit, 429s or a slow tail. The script then checks how RedditService
+and its search cache react. Nothing leaves the machine and MongoDB is not needed. Exits
+non-zero if any check fails.
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import reddit_service as reddit_module
+from benchmarks.common import percentile, print_table
+from utils.circuit_breaker import CLOSED, OPEN
+
+
+def listing(n=3):
+    return {'data': {'children': [
+        {'data': {'id': f"p{i}", 'title': f"Post {i}", 'score': 10, 'num_comments': 1}}
+        for i in range(n)
+    ]}}
+
+
+class StubReddit(BaseHTTPRequestHandler):
+    # behaviour(hit_number) -> (status, delay_seconds, extra_headers)
+    behaviour = staticmethod(lambda hit: (200, 0, {}))
+    hits = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with StubReddit.lock:
+            StubReddit.hits += 1
+            hit = StubReddit.hits
+        status, delay, headers = StubReddit.behaviour(hit)
+        time.sleep(delay)
+
+        body = json.dumps(listing() if status == 200 else {'error': status}).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+def behave(fn):
+    StubReddit.behaviour = staticmethod(fn)
+    StubReddit.hits = 0
+
+
+def fresh_service(base_url):
+    service = reddit_module.RedditService()
+    service.base_url = base_url
+    return service
+
+
+def timed_call(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def scenario_outage(base_url):
+    service = fresh_service(base_url)
+    behave(lambda hit: (200, 0, {}))
+    good = service.fetch_subreddit_posts('NWSL')
+
+    behave(lambda hit: (503, 0, {}))
+    for _ in range(3):
+        service.fetch_subreddit_posts('NWSL')
+    hits_when_opened = StubReddit.hits
+    result, elapsed = timed_call(lambda: service.fetch_subreddit_posts('NWSL'))
+    breaker = service.breakers['r/NWSL']
+
+    return [
+        ('breaker opens after 3 failures', breaker.state == OPEN),
+        ('open breaker does not call Reddit', StubReddit.hits == hits_when_opened),
+        ('open breaker fails fast (<50ms)', elapsed < 0.05),
+        ('falls back to last good data', result == good and len(result) == 3),
+        ('other endpoints unaffected', service._breaker('r/WSL').state == CLOSED)
+    ]
+
+
+def scenario_recovery(base_url):
+    service = fresh_service(base_url)
+    behave(lambda hit: (500, 0, {}))
+    for _ in range(3):
+        service.search_reddit('wsl', refresh=True)
+    breaker = service.breakers['search']
+    breaker.open_until = time.time()  # skip the reset timeout
+
+    behave(lambda hit: (200, 0, {}))
+    probe = service.search_reddit('wsl', refresh=True)
+    return [
+        ('half-open probe goes out after reset', StubReddit.hits == 1 and len(probe) == 3),
+        ('successful probe closes breaker', breaker.state == CLOSED)
+    ]
+
+
+def scenario_failed_probe(base_url):
+    service = fresh_service(base_url)
+    behave(lambda hit: (500, 0, {}))
+    for _ in range(3):
+        service.search_reddit('wsl', refresh=True)
+    breaker = service.breakers['search']
+    breaker.open_until = time.time()
+    hits_before = StubReddit.hits
+
+    service.search_reddit('wsl', refresh=True)
+    service.search_reddit('wsl', refresh=True)
+    return [
+        ('failed probe reopens breaker', breaker.state == OPEN),
+        ('only one probe sent', StubReddit.hits == hits_before + 1)
+    ]
+
+
+def scenario_hang(base_url):
+    service = fresh_service(base_url)
+    behave(lambda hit: (200, 5, {}))
+    elapsed = []
+    for _ in range(5):
+        _, seconds = timed_call(lambda: service.fetch_subreddit_posts('Lionesses'))
+        elapsed.append(seconds)
+    return [
+        ('hung calls time out', all(s < reddit_module.REQUEST_TIMEOUT + 0.5 for s in elapsed[:3])),
+        ('breaker opens on timeouts', service.breakers['r/Lionesses'].state == OPEN),
+        ('later calls skip the timeout', max(elapsed[3:]) < 0.05)
+    ]
+
+
+def scenario_rate_limit_exhausted(base_url):
+    service = fresh_service(base_url)
+    behave(lambda hit: (200, 0, {'X-Ratelimit-Remaining': '0.0', 'X-Ratelimit-Used': '100',
+                                 'X-Ratelimit-Reset': '60'}))
+    first = service.fetch_subreddit_posts('NWSL')
+    second = service.fetch_subreddit_posts('NWSL')
+    return [
+        ('rate-limit headers are read', service.rate_limit['remaining'] == 0),
+        ('no calls once budget is spent', StubReddit.hits == 1),
+        ('serves last good data meanwhile', second == first)
+    ]
+
+
+def scenario_429(base_url):
+    service = fresh_service(base_url)
+    behave(lambda hit: (429, 0, {'X-Ratelimit-Remaining': '5', 'X-Ratelimit-Reset': '120'}))
+    service.fetch_subreddit_posts('NWSL')
+    breaker = service.breakers['r/NWSL']
+    return [
+        ('single 429 opens breaker', breaker.state == OPEN),
+        ('stays open until the reset', breaker.open_until - time.time() > 100)
+    ]
+
+
+def scenario_hedging(base_url, requests=200):
+    rows = []
+    checks = []
+    # One request in ten sits in a slow tail
+    slow_tail = lambda hit: (200, 0.8 if hit % 10 == 0 else 0.01, {'X-Ratelimit-Remaining': '500'})
+
+    for enabled in (False, True):
+        reddit_module.HEDGE_ENABLED = enabled
+        service = fresh_service(base_url)
+        behave(slow_tail)
+        latencies = [timed_call(lambda: service.search_reddit('wsl', refresh=True))[1] for _ in range(requests)]
+        rows.append(['on' if enabled else 'off', f"{percentile(latencies, 50) * 1000:.0f}",
+                     f"{percentile(latencies, 99) * 1000:.0f}", service.hedges['sent'], service.hedges['won']])
+        if enabled:
+            checks.append(('hedges are sent and win the slow tail', service.hedges['won'] > 0))
+            hedged_p99 = percentile(latencies, 99)
+        else:
+            plain_p99 = percentile(latencies, 99)
+    checks.append(('hedging cuts p99 at least in half', hedged_p99 < plain_p99 / 2))
+
+    service = fresh_service(base_url)
+    near_limit = {'X-Ratelimit-Remaining': '3', 'X-Ratelimit-Reset': '60'}
+    behave(lambda hit: (200, 0.8 if hit % 10 == 0 else 0.01, near_limit))
+    for _ in range(60):
+        service.search_reddit('wsl', refresh=True)
+    checks.append(('no hedges inside the rate-limit reserve', service.hedges['sent'] == 0))
+    reddit_module.HEDGE_ENABLED = False
+
+    print('Hedging on a slow tail (1 in 10 requests takes 800ms):')
+    print_table(['hedging', 'p50 ms', 'p99 ms', 'hedges sent', 'hedges won'], rows)
+    print()
+    return checks
+
+
+def scenario_search_cache(base_url):
+    service = fresh_service(base_url)
+    behave(lambda hit: (200, 0.3, {}))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.search_reddit('Lionesses')))
+               for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    coalesced_hits = StubReddit.hits
+
+    _, cached_elapsed = timed_call(lambda: service.search_reddit('  lionesses '))
+    stats = service.search_cache.stats()
+    return [
+        ('concurrent identical queries coalesce', coalesced_hits == 1 and len(results) == 10),
+        ('normalized query is served from cache', StubReddit.hits == 1 and cached_elapsed < 0.01),
+        ('hit and miss counters', stats['misses'] == 1 and stats['coalesced'] == 9 and stats['hits'] == 1)
+    ]
+
+
+def scenario_negative_cache(base_url):
+    service = fresh_service(base_url)
+    behave(lambda hit: (502, 0, {}))
+    service.search_reddit('nwsl')
+    service.search_reddit('nwsl')
+    negative_hits = service.search_cache.stats()['negative_hits']
+    hits_after_failure = StubReddit.hits
+
+    # Expire the negative entry instead of waiting out its TTL
+    service.search_cache._entries['nwsl|50|relevance|month'] = (time.time() - 1, None, True)
+    behave(lambda hit: (200, 0, {}))
+    recovered = service.search_reddit('nwsl')
+    return [
+        ('failure is not retried at once', hits_after_failure == 1 and negative_hits == 1),
+        ('retried once the negative entry expires', StubReddit.hits == 1 and len(recovered) == 3)
+    ]
+
+
+def scenario_cache_bound(base_url):
+    service = fresh_service(base_url)
+    service.search_cache.max_entries = 16
+    behave(lambda hit: (200, 0, {}))
+    for i in range(40):
+        service.search_reddit(f"query {i}")
+    stats = service.search_cache.stats()
+    return [
+        ('cache stays within its bound', stats['entries'] == 16 and stats['evictions'] == 24)
+    ]
+
+
+def main():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubReddit)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    reddit_module.REQUEST_TIMEOUT = 0.5
+
+    scenarios = [scenario_outage, scenario_recovery, scenario_failed_probe, scenario_hang,
+                 scenario_rate_limit_exhausted, scenario_429, scenario_hedging,
+                 scenario_search_cache, scenario_negative_cache, scenario_cache_bound]
+    rows = []
+    for scenario in scenarios:
+        for check, passed in scenario(base_url):
+            rows.append([scenario.__name__.replace('scenario_', ''), check, 'PASS' if passed else 'FAIL'])
+
+    server.shutdown()
+    print_table(['scenario', 'check', 'result'], rows)
+    sys.exit(0 if all(row[2] == 'PASS' for row in rows) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""
+Compares request throughput of the Flask dev server against gunicorn.
+
+    python -m benchmarks.load_compare --clients 64 --duration 20
+
+Both servers are started from this directory against the same MongoDB
+(MONGODB_URI), driven with the same mix of tracking writes and analytics
+reads, and stopped again. Only the standard library is used on the client
+side so the numbers are not skewed by a heavy HTTP stack.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+from benchmarks.common import PAGES, percentile, print_table
+
+
+SERVERS = {
+    'dev': lambda port: [sys.executable, 'app.py'],
+    'gunicorn': lambda port: [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+}
+
+
+def wait_until_healthy(port, timeout=30):
+    # /ready rather than /health: liveness comes up before MongoDB is reachable
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/ready')
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.25)
+    return False
+
+
+def start_server(name, port, workers=0, extra_env=None):
+    env = dict(os.environ, PORT=str(port), FLASK_DEBUG='0', **(extra_env or {}))
+    if workers:
+        env['WEB_CONCURRENCY'] = str(workers)
+    process = subprocess.Popen(SERVERS[name](port), env=env, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, start_new_session=True)
+    if not wait_until_healthy(port):
+        stop_server(process)
+        raise RuntimeError(f"{name} server did not become healthy on port {port}")
+    return process
+
+
+def stop_server(process):
+    if process.poll() is not None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=15)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def _event(user_id, session_id, rng):
+    return {
+        'user_id': user_id,
+        'session_id': session_id,
+        'event_type': rng.choice(['click', 'scroll', 'hover', 'page_view']),
+        'timestamp': time.time(),
+        'page_url': rng.choice(PAGES)
+    }
+
+
+def _request(rng, user_id, session_id):
+    roll = rng.random()
+    if roll < 0.5:
+        body = {'events': [_event(user_id, session_id, rng) for _ in range(10)]}
+        return 'POST', '/api/tracking/batch', body
+    if roll < 0.7:
+        return 'POST', '/api/tracking/event', _event(user_id, session_id, rng)
+    if roll < 0.85:
+        return 'GET', '/api/analytics/trending', None
+    return 'GET', f"/api/analytics/user/{user_id}", None
+
+
+def drive(port, clients, duration):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def client(index):
+        rng = random.Random(index)
+        user_id = f"user_{uuid.uuid4().hex[:12]}"
+        session_id = f"session_{uuid.uuid4().hex[:12]}_{int(time.time())}"
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local, failed = [], 0
+
+        while time.time() < stop_at:
+            method, path, body = _request(rng, user_id, session_id)
+            payload = json.dumps(body) if body is not None else None
+            headers = {'Content-Type': 'application/json'} if payload else {}
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 500:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            local.append(time.perf_counter() - start)
+
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'p50': percentile(latencies, 50) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+        'errors': errors[0]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--port', type=int, default=5101)
+    parser.add_argument('--workers', type=int, default=0,
+                        help='gunicorn workers (default: gunicorn.conf.py)')
+    parser.add_argument('--servers', nargs='+', default=list(SERVERS), choices=list(SERVERS))
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients for {args.duration:.0f}s per server, {os.cpu_count()} cores")
+
+    rows = []
+    for offset, name in enumerate(args.servers):
+        port = args.port + offset
+        process = start_server(name, port, args.workers)
+        try:
+            # Warm up connection pools and caches before measuring
+            drive(port, min(args.clients, 8), 2)
+            result = drive(port, args.clients, args.duration)
+        finally:
+            stop_server(process)
+        rows.append([name, result['requests'], f"{result['rps']:.0f}",
+                     f"{result['p50']:.1f}", f"{result['p99']:.1f}", result['errors']])
+
+    print_table(['server', 'requests', 'req/s', 'p50 ms', 'p99 ms', 'errors'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,380 @@
+"""
+End-to-end HTTP load suite for the tracking, analytics and admin endpoints.
+
+    python -m benchmarks.load_suite --inprocess --duration 20
+    python -m benchmarks.load_suite --server gunicorn --save-baseline
+    python -m benchmarks.load_suite --server gunicorn --baseline benchmarks/baselines/load_suite.json
+    python -m benchmarks.load_suite --target http://127.0.0.1:5001
+
+Visitor threads replay traffic shaped like frontend/src/utils/tracker.js:
+a session start, then batches of up to 100 queued events (mouse_move
+bursts throttled to 10 a second, hovers, scrolls, clicks, page views,
+focus and key presses), and a session end before the next visit. At the
+same time reader threads poll /api/admin/stats, /api/admin/interactions
+and /api/analytics/user/<id> like the admin dashboard does.
+
+The backend is either started here (--server, against MONGODB_URI, e.g. a
+local mongod), already running (--target), or served from this process
+with mongomock standing in for MongoDB (--inprocess; pip install
+mongomock). Throughput and p50/p95/p99 are reported per route and written
+as JSON to --output. With --baseline the run fails (exit code 1) when a
+route's p95 or throughput is worse than the baseline by more than
+--tolerance, or when its error rate goes up. Baselines are only
+comparable on the same machine and mode, so record your own with
+--save-baseline.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+
+from benchmarks.common import PAGES, percentile, print_table
+from benchmarks.load_compare import SERVERS, start_server, stop_server
+
+
+DEFAULT_OUTPUT = os.path.join('benchmarks', 'results', 'load_suite.json')
+DEFAULT_BASELINE = os.path.join('benchmarks', 'baselines', 'load_suite.json')
+
+ELEMENTS = ['nav-home', 'nav-social', 'hashtag-UWCL', 'hashtag-NWSL', 'hashtag-Lionesses',
+            'refresh-button', 'post-card', 'chart-engagement', 'search-input']
+MAX_BATCH = 100
+# Percentiles of fewer requests than this are too noisy to gate on
+MIN_SAMPLES = 20
+
+
+class RouteStats:
+    def __init__(self):
+        self.latencies = []
+        self.client_errors = 0
+        self.server_errors = 0
+        self.failures = 0
+
+
+class Recorder:
+    """Per-route latencies, collected per thread and merged at the end."""
+
+    def __init__(self):
+        self.routes = {}
+        self._lock = threading.Lock()
+
+    def merge(self, local):
+        with self._lock:
+            for route, stats in local.items():
+                merged = self.routes.setdefault(route, RouteStats())
+                merged.latencies.extend(stats.latencies)
+                merged.client_errors += stats.client_errors
+                merged.server_errors += stats.server_errors
+                merged.failures += stats.failures
+
+
+class Client:
+    def __init__(self, host, port, stop_at):
+        self.host = host
+        self.port = port
+        self.stop_at = stop_at
+        self.stats = {}
+        self.conn = http.client.HTTPConnection(host, port, timeout=30)
+
+    def call(self, route, method, path, body=None):
+        stats = self.stats.setdefault(route, RouteStats())
+        payload = json.dumps(body) if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload else {}
+        start = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            stats.failures += 1
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            return None
+        stats.latencies.append(time.perf_counter() - start)
+        if response.status >= 500:
+            stats.server_errors += 1
+        elif response.status >= 400:
+            stats.client_errors += 1
+        return data
+
+    def running(self):
+        return time.time() < self.stop_at
+
+    def close(self):
+        self.conn.close()
+
+
+def _uid(rng, prefix):
+    return f"{prefix}_{rng.getrandbits(48):012x}"
+
+
+def visit_events(rng, user_id, session_id, now):
+    """Events one tracker flush would send: a page view, then mouse, hover, scroll and click activity."""
+    page = rng.choice(PAGES)
+    events = [{'event_type': 'page_view', 'metadata': {'visibility_state': 'visible', 'page_url': page}}]
+    while len(events) < MAX_BATCH:
+        roll = rng.random()
+        if roll < 0.55:
+            # A burst of mouse movement, throttled to one event per 100 ms by the tracker
+            x, y = rng.randint(0, 1920), rng.randint(0, 1080)
+            for _ in range(rng.randint(5, 30)):
+                x = min(1920, max(0, x + rng.randint(-80, 80)))
+                y = min(1080, max(0, y + rng.randint(-60, 60)))
+                events.append({'event_type': 'mouse_move', 'x': x, 'y': y,
+                               'metadata': {'speed': rng.randint(0, 3000), 'page_url': page}})
+        elif roll < 0.75:
+            element = rng.choice(ELEMENTS)
+            events.append({'event_type': 'hover', 'element': element, 'page_url': page,
+                           'metadata': {'element_tag': 'div', 'hover_action': 'start'}})
+            events.append({'event_type': 'hover', 'element': element, 'page_url': page,
+                           'duration': rng.randint(50, 5000),
+                           'metadata': {'element_tag': 'div', 'hover_action': 'end'}})
+        elif roll < 0.88:
+            events.append({'event_type': 'scroll', 'scroll_depth': rng.randint(0, 100),
+                           'metadata': {'scroll_position': rng.randint(0, 8000), 'page_url': page}})
+        elif roll < 0.97:
+            events.append({'event_type': 'click', 'element': rng.choice(ELEMENTS), 'page_url': page,
+                           'x': rng.randint(0, 1920), 'y': rng.randint(0, 1080),
+                           'metadata': {'element_tag': 'button', 'button': 0}})
+        else:
+            events.append({'event_type': rng.choice(['element_focus', 'key_press']),
+                           'metadata': {'page_url': page}})
+
+    events = events[:MAX_BATCH]
+    for i, event in enumerate(events):
+        event['user_id'] = user_id
+        event['session_id'] = session_id
+        event['timestamp'] = now + i * 0.1
+    return events
+
+
+def visitor(client, seed, user_ids, lock, batches_per_visit):
+    rng = random.Random(seed)
+    user_id = _uid(rng, 'user')
+    with lock:
+        user_ids.append(user_id)
+
+    while client.running():
+        session_id = f"{_uid(rng, 'session')}_{int(time.time())}"
+        client.call('POST /api/tracking/session/start', 'POST', '/api/tracking/session/start', {
+            'user_id': user_id,
+            'session_id': session_id,
+            'fingerprint': {'user_agent': 'load-suite', 'screen_resolution': '1920x1080', 'timezone': 'Europe/Brussels'}
+        })
+        for _ in range(rng.randint(1, batches_per_visit)):
+            if not client.running():
+                break
+            client.call('POST /api/tracking/batch', 'POST', '/api/tracking/batch',
+                        {'events': visit_events(rng, user_id, session_id, time.time())})
+        client.call('POST /api/tracking/session/end', 'POST', '/api/tracking/session/end',
+                    {'user_id': user_id, 'session_id': session_id})
+
+
+def reader(client, seed, user_ids, lock):
+    rng = random.Random(seed)
+    while client.running():
+        roll = rng.random()
+        if roll < 0.3:
+            client.call('GET /api/admin/stats', 'GET', '/api/admin/stats')
+        elif roll < 0.6:
+            client.call('GET /api/admin/interactions', 'GET',
+                        f"/api/admin/interactions?limit=50&skip={rng.choice([0, 0, 50, 100])}")
+        else:
+            with lock:
+                user_id = rng.choice(user_ids) if user_ids else None
+            if user_id:
+                client.call('GET /api/analytics/user/<id>', 'GET', f"/api/analytics/user/{user_id}")
+
+
+def run_load(host, port, visitors, readers, duration, batches_per_visit=4, seed=1):
+    recorder = Recorder()
+    user_ids = []
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def worker(role, index):
+        client = Client(host, port, stop_at)
+        try:
+            if role == 'visitor':
+                visitor(client, seed * 1000 + index, user_ids, lock, batches_per_visit)
+            else:
+                reader(client, seed * 2000 + index, user_ids, lock)
+        finally:
+            client.close()
+            recorder.merge(client.stats)
+
+    threads = [threading.Thread(target=worker, args=('visitor', i)) for i in range(visitors)]
+    threads += [threading.Thread(target=worker, args=('reader', i)) for i in range(readers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder.routes, time.perf_counter() - started
+
+
+def summarize(routes, elapsed):
+    summary = {}
+    for route, stats in sorted(routes.items()):
+        requests = len(stats.latencies) + stats.failures
+        summary[route] = {
+            'requests': requests,
+            'rps': round(len(stats.latencies) / elapsed, 2),
+            'p50_ms': round(percentile(stats.latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(stats.latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(stats.latencies, 99) * 1000, 2),
+            'client_errors': stats.client_errors,
+            'server_errors': stats.server_errors,
+            'failures': stats.failures,
+            'error_rate': round((stats.server_errors + stats.failures) / requests, 4) if requests else 0
+        }
+    return summary
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of results against baseline, as human-readable strings."""
+    regressions = []
+    if baseline.get('mode') != results['mode']:
+        regressions.append(f"baseline was recorded in mode {baseline.get('mode')!r}, this run is {results['mode']!r}")
+        return regressions
+
+    for route, old in baseline['routes'].items():
+        new = results['routes'].get(route)
+        if new is None:
+            regressions.append(f"{route}: no requests in this run")
+            continue
+        if old['requests'] < MIN_SAMPLES or new['requests'] < MIN_SAMPLES:
+            continue
+        if old['p95_ms'] and new['p95_ms'] > old['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {new['p95_ms']:.1f} ms vs {old['p95_ms']:.1f} ms")
+        if old['rps'] and new['rps'] < old['rps'] * (1 - tolerance):
+            regressions.append(f"{route}: {new['rps']:.1f} req/s vs {old['rps']:.1f} req/s")
+        if new['error_rate'] > old['error_rate'] + 0.001:
+            regressions.append(f"{route}: error rate {new['error_rate']:.2%} vs {old['error_rate']:.2%}")
+    return regressions
+
+
+def start_inprocess(port):
+    try:
+        import mongomock
+    except ImportError:
+        sys.exit("--inprocess needs mongomock (pip install mongomock)")
+    import logging
+    from werkzeug.serving import make_server
+
+    os.environ.setdefault('REDDIT_POLLER_ENABLED', '0')
+    import utils.database as database
+    database.MongoClient = mongomock.MongoClient
+
+    # mongomock edits the projection dict it is given while it reads, which
+    # races when threaded requests share a module-level projection
+    original_find = mongomock.Collection.find
+
+    def find(self, *args, **kwargs):
+        if len(args) > 1 and isinstance(args[1], dict):
+            args = (args[0], dict(args[1]), *args[2:])
+        if isinstance(kwargs.get('projection'), dict):
+            kwargs['projection'] = dict(kwargs['projection'])
+        return original_find(self, *args, **kwargs)
+
+    mongomock.Collection.find = find
+    from app import create_app
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', port, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--server', choices=list(SERVERS), help='start this server against MONGODB_URI')
+    target.add_argument('--target', help='URL of a backend that is already running')
+    target.add_argument('--inprocess', action='store_true', help='serve the app from this process on mongomock')
+    parser.add_argument('--visitors', type=int, default=16)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=3)
+    parser.add_argument('--workers', type=int, default=0, help='gunicorn workers (default: gunicorn.conf.py)')
+    parser.add_argument('--port', type=int, default=5401)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--baseline', help='fail on regression against this results file')
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE,
+                        help=f"also store the results as the baseline (default {DEFAULT_BASELINE})")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed relative slowdown before a route counts as regressed')
+    args = parser.parse_args()
+
+    process = server = None
+    if args.target:
+        url = urlparse(args.target)
+        host, port, mode = url.hostname, url.port or 80, 'target'
+    elif args.inprocess:
+        server = start_inprocess(args.port)
+        host, port, mode = '127.0.0.1', args.port, 'inprocess'
+    else:
+        name = args.server or 'gunicorn'
+        process = start_server(name, args.port, args.workers, {'REDDIT_POLLER_ENABLED': '0'})
+        host, port, mode = '127.0.0.1', args.port, name
+
+    print(f"{args.visitors} visitors + {args.readers} readers for {args.duration:.0f}s ({mode}), "
+          f"{os.cpu_count()} cores")
+    try:
+        if args.warmup:
+            run_load(host, port, min(args.visitors, 4), min(args.readers, 2), args.warmup, seed=99)
+        routes, elapsed = run_load(host, port, args.visitors, args.readers, args.duration)
+    finally:
+        if process is not None:
+            stop_server(process)
+        if server is not None:
+            server.shutdown()
+
+    summary = summarize(routes, elapsed)
+    rows = [[route, s['requests'], f"{s['rps']:.1f}", f"{s['p50_ms']:.1f}", f"{s['p95_ms']:.1f}",
+             f"{s['p99_ms']:.1f}", s['client_errors'], s['server_errors'] + s['failures']]
+            for route, s in summary.items()]
+    print_table(['route', 'requests', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', '4xx', 'errors'], rows)
+    events = summary.get('POST /api/tracking/batch', {}).get('rps', 0) * MAX_BATCH
+    print(f"\n~{events:.0f} tracked events/s")
+
+    results = {
+        'mode': mode,
+        'recorded_at': datetime.utcnow().isoformat(),
+        'machine': {'cpus': os.cpu_count(), 'python': platform.python_version(), 'platform': platform.platform()},
+        'config': {'visitors': args.visitors, 'readers': args.readers, 'duration': args.duration,
+                   'workers': args.workers},
+        'routes': summary
+    }
+    write_json(args.output, results)
+    print(f"✓ Results written to {args.output}")
+    if args.save_baseline:
+        write_json(args.save_baseline, results)
+        print(f"✓ Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regression(s) against {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"✓ No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == '__main__':
+    main()
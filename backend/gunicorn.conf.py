@@ -0,0 +1,36 @@
+"""
+Gunicorn settings for the production backend.
+
+Workers are forked before the application is imported (no preload), and
+each one builds its own MongoClient on first use, so no connection pool
+is ever shared across a fork.
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5001)}"
+
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+preload_app = False
+
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to cap slow memory growth
+max_requests = 10000
+max_requests_jitter = 1000
+
+accesslog = '-'
+errorlog = '-'
+
+# With several processes, per-user session state must live in one of them
+raw_env = [f"SESSIONIZER_MODE={os.getenv('SESSIONIZER_MODE', 'tail')}"]
+
+
+def post_fork(server, worker):
+    from utils.database import reset_after_fork
+    reset_after_fork()
@@ -0,0 +1,364 @@
+"""
+Generates a large, realistic synthetic analytics dataset.
+
+Users, their /session/start documents and their interactions are written
+in the shapes the tracking routes store. Data is loaded straight into
+MongoDB by parallel unordered insert_many writers, or written as NDJSON
+files that mongoimport and jobs.offline_report read.
+
+    python -m jobs.generate_dataset --users 1000000 --interactions 50000000 --drop
+    python -m jobs.generate_dataset --users 10000 --interactions 500000 --ndjson data/
+    python -m jobs.generate_dataset --users 10000 --seed 7 --end 2026-10-01
+
+How the data is shaped:
+- Activity per user follows a Zipf law (--zipf): a few heavy users and a
+  long tail of one-visit users.
+- Pages are picked with Zipf popularity too.
+- Session start times follow an hour-of-day curve with an evening peak.
+- Events use the mix tracker.js sends, with its fields: mouse_move
+  throttled to 100 ms with speed, hover start/end pairs with duration,
+  scroll depth, clicks on elements and hashtags, focus, key presses,
+  form submits and visibility page views.
+
+The output is the same for the same --seed and --end, whatever --workers
+is. By default the window ends at today's midnight (UTC), so pass --end to
+reproduce a dataset on another day. Generated ids are valid for
+is_valid_uid and is_valid_session_id, and user ids are unique.
+
+Loading is fastest into collections without secondary indexes. With
+--drop the collections are recreated empty; the indexes are built when
+the app next starts.
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from bson import json_util
+from pymongo import MongoClient
+
+from utils.uid_generator import generate_session_id, generate_uid, is_valid_session_id, is_valid_uid
+
+
+USERS_PER_CHUNK = 2000
+BATCH_SIZE = 10000
+MEAN_SESSION_EVENTS = 60
+MEAN_EVENT_GAP = 1.5  # seconds
+MIX_48 = 0x9E3779B97F4B  # odd, so multiplying by it permutes the 48-bit ids
+ID_MASK = (1 << 48) - 1
+
+# Shares of what tracker.js queues in an ordinary visit. copy/paste are
+# rare in a visit and not among the segment features, so they are left out
+EVENT_MIX = [
+    ('mouse_move', 52),
+    ('hover', 18),
+    ('scroll', 11),
+    ('click', 7),
+    ('element_focus', 4),
+    ('key_press', 5),
+    ('page_view', 2.5),
+    ('form_submit', 0.5)
+]
+EVENT_TYPES = [name for name, _ in EVENT_MIX]
+PAGE_VIEW = EVENT_TYPES.index('page_view')
+
+PAGES = ['/', '/social', '/trending', '/reddit', '/dashboard', '/hashtags', '/players', '/matches',
+         '/settings', '/about']
+HASHTAGS = ['WomensFootball', 'UWCL', 'Lionesses', 'NWSL', 'WSL', 'USWNT', 'Matildas', 'RedFlames',
+            'WomenInSports', 'FemaleSoccer']
+ELEMENTS = ['nav-home', 'nav-social', 'nav-trending', 'refresh-button', 'post-card', 'chart-engagement',
+            'search-input', 'load-more', 'share-button', 'sentiment-card']
+FOCUS_ELEMENTS = ['search-input', 'comment-box', 'newsletter-email']
+KEY_TYPES = ['letter', 'letter', 'letter', 'space', 'backspace', 'number', 'enter', 'other']
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/129.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_6) AppleWebKit/605.1.15 Version/17.6 Safari/605.1.15',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_6 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148',
+    'Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 Chrome/129.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64; rv:131.0) Gecko/20100101 Firefox/131.0'
+]
+RESOLUTIONS = ['1920x1080', '1366x768', '1536x864', '2560x1440', '390x844', '412x915']
+TIMEZONES = ['Europe/Brussels', 'Europe/London', 'Europe/Madrid', 'America/New_York', 'America/Chicago',
+             'Australia/Sydney']
+
+# Relative activity per hour of the day: quiet at night, busiest around evening kick-offs
+HOURLY_ACTIVITY = np.array([2, 1.2, 0.8, 0.5, 0.4, 0.5, 1, 2, 3, 3.5, 4, 4.5,
+                            5, 5, 4.5, 4.5, 5, 6, 7.5, 9, 10, 9, 6.5, 4], dtype=float)
+
+
+def zipf_weights(n, exponent):
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def user_event_counts(users, interactions, exponent, seed):
+    """Events per user: Zipf over a shuffled ranking, every user at least one."""
+    rng = np.random.default_rng([seed, 0])
+    weights = zipf_weights(users, exponent)[rng.permutation(users)]
+    counts = rng.multinomial(max(interactions - users, 0), weights)
+    return counts + 1
+
+
+def user_id(index, seed):
+    salt = (seed * MIX_48 + 0x5DEECE66D) & ID_MASK
+    return generate_uid(f"{((index + 1) * MIX_48 & ID_MASK) ^ salt:012x}")
+
+
+def generate_chunk(chunk, first_user, counts, seed, end, days):
+    """Users, sessions and interactions for one chunk of users, as three lists of documents."""
+    rng = np.random.default_rng([seed, 1, chunk])
+    page_p = zipf_weights(len(PAGES), 1.1)
+    hashtag_p = zipf_weights(len(HASHTAGS), 1.0)
+    event_p = np.array([share for _, share in EVENT_MIX], dtype=float)
+    event_p /= event_p.sum()
+    hour_p = HOURLY_ACTIVITY / HOURLY_ACTIVITY.sum()
+
+    # Split every user's events into sessions of roughly MEAN_SESSION_EVENTS
+    session_counts = np.minimum(counts, 1 + rng.poisson(counts / MEAN_SESSION_EVENTS))
+    session_user = np.repeat(np.arange(len(counts)), session_counts)
+    sizes = np.concatenate([
+        rng.multinomial(count - sessions, np.full(sessions, 1 / sessions)) + 1
+        for count, sessions in zip(counts.tolist(), session_counts.tolist())
+    ])
+    session_count = len(sizes)
+
+    day = rng.integers(0, days, session_count)
+    hour = rng.choice(24, session_count, p=hour_p)
+    starts = end - (days - day) * 86400 + hour * 3600 + rng.random(session_count) * 3600
+
+    # Event timestamps: exponential gaps summed up within each session
+    events = int(sizes.sum())
+    first = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    session_of = np.repeat(np.arange(session_count), sizes)
+    gaps = rng.exponential(MEAN_EVENT_GAP, events) + 0.1
+    gaps[first] = 0
+    elapsed = np.cumsum(gaps)
+    timestamps = starts[session_of] + elapsed - elapsed[first][session_of]
+    ends = timestamps[first + sizes - 1]
+
+    types = rng.choice(len(EVENT_TYPES), events, p=event_p)
+    types[first] = PAGE_VIEW
+    # Every event happens on the page of the latest page view of its session
+    page_choice = rng.choice(len(PAGES), events, p=page_p)
+    last_view = np.maximum.accumulate(np.where(types == PAGE_VIEW, np.arange(events), 0))
+    pages = page_choice[last_view]
+
+    # Plain lists: indexing them is much cheaper than indexing NumPy arrays
+    xs = rng.integers(0, 1920, events).tolist()
+    ys = rng.integers(0, 1080, events).tolist()
+    speeds = rng.gamma(2, 300, events).astype(int).tolist()
+    depths = np.minimum(100, rng.exponential(35, events).astype(int)).tolist()
+    hover_ms = np.minimum(86400000, rng.lognormal(6.5, 1.1, events).astype(int)).tolist()
+    hashtag_clicks = (rng.random(events) < 0.35).tolist()
+    hashtags = rng.choice(len(HASHTAGS), events, p=hashtag_p).tolist()
+    elements = rng.integers(0, len(ELEMENTS), events).tolist()
+    picks = rng.integers(0, 1 << 16, events).tolist()
+
+    users = []
+    for i, (count, sessions) in enumerate(zip(counts.tolist(), session_counts.tolist())):
+        pick = picks[i]
+        users.append({
+            'user_id': user_id(first_user + i, seed),
+            'fingerprint': {
+                'user_agent': USER_AGENTS[pick % len(USER_AGENTS)],
+                'screen_resolution': RESOLUTIONS[pick // 7 % len(RESOLUTIONS)],
+                'timezone': TIMEZONES[pick // 53 % len(TIMEZONES)]
+            },
+            'metadata': {},
+            'total_interactions': count,
+            'total_sessions': sessions
+        })
+
+    session_docs = []
+    session_ids = []
+    id_bits = rng.integers(0, 1 << 48, session_count, dtype=np.int64).tolist()
+    for s, (owner, start, stop) in enumerate(zip(session_user.tolist(), starts.tolist(), ends.tolist())):
+        user = users[owner]
+        session_id = generate_session_id(f"{id_bits[s]:012x}", start)
+        session_ids.append(session_id)
+        session_docs.append({
+            'user_id': user['user_id'],
+            'session_id': session_id,
+            'started_at': datetime.fromtimestamp(start),
+            'active': False,
+            'ended_at': datetime.fromtimestamp(stop)
+        })
+        # Users are created on their first event and touched on every later one
+        if 'created_at' not in user or start < user['created_at']:
+            user['created_at'] = start
+        user['last_seen'] = max(user.get('last_seen', stop), stop)
+
+    for user in users:
+        user['created_at'] = datetime.fromtimestamp(user['created_at'])
+        user['last_seen'] = datetime.fromtimestamp(user['last_seen'])
+
+    interactions = []
+    hover_open = False
+    for e, (session, event_type, timestamp, page) in enumerate(zip(
+            session_of.tolist(), types.tolist(), timestamps.tolist(), pages.tolist())):
+        owner = session_docs[session]
+        doc = {
+            # Same layout as Interaction.to_dict()
+            'user_id': owner['user_id'],
+            'event_type': EVENT_TYPES[event_type],
+            'timestamp': timestamp,
+            'session_id': session_ids[session],
+            'data': {}
+        }
+        page_url = PAGES[page]
+        if event_type == 0:  # mouse_move
+            doc['x'] = xs[e]
+            doc['y'] = ys[e]
+            doc['metadata'] = {'speed': speeds[e], 'page_url': page_url}
+        elif event_type == 1:  # hover, alternating start and end
+            doc['element'] = ELEMENTS[elements[e]]
+            doc['page_url'] = page_url
+            if hover_open:
+                doc['duration'] = hover_ms[e]
+            doc['metadata'] = {'element_tag': 'div', 'hover_action': 'end' if hover_open else 'start'}
+            hover_open = not hover_open
+        elif event_type == 2:  # scroll
+            doc['scroll_depth'] = depths[e]
+            doc['metadata'] = {'scroll_position': depths[e] * 60, 'page_height': 7000,
+                               'viewport_height': 1000, 'page_url': page_url}
+        elif event_type == 3:  # click
+            element = f"hashtag-{HASHTAGS[hashtags[e]]}" if hashtag_clicks[e] else ELEMENTS[elements[e]]
+            doc['element'] = element
+            doc['page_url'] = page_url
+            doc['x'] = xs[e]
+            doc['y'] = ys[e]
+            doc['metadata'] = {'element_tag': 'button', 'element_id': element, 'button': 0,
+                               'ctrl_key': False, 'shift_key': False, 'alt_key': False}
+        elif event_type == 4:  # element_focus
+            doc['element'] = FOCUS_ELEMENTS[elements[e] % len(FOCUS_ELEMENTS)]
+            doc['metadata'] = {'element_tag': 'input', 'focus_action': 'in' if picks[e] % 2 else 'out',
+                               'page_url': page_url}
+        elif event_type == 5:  # key_press
+            doc['metadata'] = {'key_type': KEY_TYPES[picks[e] % len(KEY_TYPES)], 'ctrl_key': False,
+                               'shift_key': False, 'alt_key': False, 'page_url': page_url}
+        elif event_type == 6:  # page_view
+            doc['metadata'] = {'visibility_state': 'visible', 'hidden': False, 'page_url': page_url}
+        else:  # form_submit
+            doc['element'] = 'newsletter-form'
+            doc['metadata'] = {'form_id': 'newsletter-form', 'page_url': page_url}
+        interactions.append(doc)
+
+    return users, session_docs, interactions
+
+
+def _insert(collection, docs, batch_size):
+    for start in range(0, len(docs), batch_size):
+        collection.insert_many(docs[start:start + batch_size], ordered=False)
+
+
+# Reused: json.dumps builds a new encoder on every call when given default=
+_encoder = json.JSONEncoder(default=json_util.default)
+
+
+def _write_ndjson(path, docs):
+    with open(path, 'w') as f:
+        f.writelines(_encoder.encode(doc) + '\n' for doc in docs)
+
+
+def write_chunk(task):
+    chunk, first_user, counts, options = task
+    users, sessions, interactions = generate_chunk(
+        chunk, first_user, counts, options['seed'], options['end'], options['days']
+    )
+
+    if options['ndjson']:
+        for name, docs in (('users', users), ('sessions', sessions), ('interactions', interactions)):
+            _write_ndjson(os.path.join(options['ndjson'], f"{name}-{chunk:05d}.ndjson"), docs)
+    else:
+        db = _database(options)
+        _insert(db.users, users, options['batch_size'])
+        _insert(db.sessions, sessions, options['batch_size'])
+        _insert(db.interactions, interactions, options['batch_size'])
+    return len(users), len(sessions), len(interactions)
+
+
+_client = None
+
+
+def _database(options):
+    # One client per worker process
+    global _client
+    if _client is None:
+        _client = MongoClient(options['uri'], w=1)
+    return _client[options['db']]
+
+
+def parse_end(value):
+    if value:
+        end = datetime.fromisoformat(value)
+        return (end if end.tzinfo else end.replace(tzinfo=timezone.utc)).timestamp()
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (today + timedelta(days=1)).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic analytics dataset')
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--interactions', type=int, default=5000000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--end', help='end of the time window (ISO date, default: next UTC midnight)')
+    parser.add_argument('--zipf', type=float, default=1.0, help='exponent of the per-user activity law')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--ndjson', metavar='DIR', help='write NDJSON files here instead of MongoDB')
+    parser.add_argument('--drop', action='store_true', help='drop users, sessions and interactions first')
+    args = parser.parse_args()
+
+    options = {
+        'seed': args.seed,
+        'end': parse_end(args.end),
+        'days': args.days,
+        'batch_size': args.batch_size,
+        'ndjson': args.ndjson,
+        'uri': os.getenv('MONGODB_URI', 'mongodb://localhost:27017'),
+        'db': os.getenv('MONGO_DB', 'womens_football_analytics')
+    }
+
+    if args.ndjson:
+        os.makedirs(args.ndjson, exist_ok=True)
+        target = args.ndjson
+    else:
+        db = _database(options)
+        if args.drop:
+            for name in ('users', 'sessions', 'interactions'):
+                db.drop_collection(name)
+            print("✓ Dropped users, sessions and interactions")
+        target = f"{options['db']} on {options['uri']}"
+
+    counts = user_event_counts(args.users, args.interactions, args.zipf, args.seed)
+    tasks = [
+        (chunk, first, counts[first:first + USERS_PER_CHUNK], options)
+        for chunk, first in enumerate(range(0, args.users, USERS_PER_CHUNK))
+    ]
+    sample = generate_chunk(0, 0, counts[:1], args.seed, options['end'], args.days)
+    assert is_valid_uid(sample[0][0]['user_id']) and is_valid_session_id(sample[1][0]['session_id'])
+
+    print(f"🔄 Generating {args.users:,} users and {int(counts.sum()):,} interactions over {args.days} days "
+          f"into {target} ({len(tasks)} chunks, {args.workers} workers)")
+    started = time.time()
+    totals = np.zeros(3, dtype=np.int64)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for done, written in enumerate(pool.map(write_chunk, tasks), 1):
+            totals += written
+            if done % max(1, len(tasks) // 10) == 0 or done == len(tasks):
+                elapsed = time.time() - started
+                print(f"  {done}/{len(tasks)} chunks, {int(totals.sum()):,} documents, "
+                      f"{totals.sum() / elapsed:,.0f} docs/s")
+
+    elapsed = time.time() - started
+    print(f"✓ Wrote {totals[0]:,} users, {totals[1]:,} sessions and {totals[2]:,} interactions "
+          f"in {elapsed:.1f}s ({totals.sum() / elapsed:,.0f} docs/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+"""
+Online migration of the legacy event stores into the canonical schema.
+
+Before the blueprints, app.py wrote tracking events to an `events`
+collection (datetime timestamps set by the server, unvalidated client
+fields) and session documents with start_time/end_time. This job copies
+the events into interactions through Interaction.from_event, and renames
+the session fields in place (from the UTC the legacy routes wrote to the
+local time the blueprints write), while the backend keeps serving:
+
+- Documents are read in _id order, a batch at a time, and written as one
+  unordered bulk of upserts keyed by the source _id, so a batch that is
+  replayed after a crash changes nothing. Keeping the old _ids also keeps
+  the copies out of the tailers, which only follow recent ObjectIds.
+- After each batch the _id it reached is saved in `migrations`; a
+  restarted run carries on from there (--restart starts over).
+- The batch size follows MongoDB's latency: a batch slower than
+  --target-ms halves it and pauses for as long as the batch took, faster
+  ones grow it again up to --max-batch.
+- Progress is printed every --progress seconds.
+- A run claims its task in `migrations`; a second runner refuses to start
+  until the first one's heartbeat is older than HEARTBEAT_TIMEOUT.
+
+    python -m jobs.migrate_events
+    python -m jobs.migrate_events --target-ms 50 --max-batch 2000
+    python -m jobs.migrate_events --only sessions --restart
+
+Users first seen in `events` get a user document, and each copied event
+counts towards total_interactions. The sources are left as they are; drop
+`events` once the counts check out.
+"""
+
+import argparse
+import os
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from models.interaction import Interaction, OPTIONAL_FIELDS
+from utils.data_validator import sanitize_tracking_data
+
+
+HEARTBEAT_TIMEOUT = 60
+LEGACY_EVENT_FIELDS = {'_id', 'user_id', 'session_id', 'event_type', 'timestamp', *OPTIONAL_FIELDS}
+
+
+def legacy_interaction(doc):
+    """The canonical interaction for an `events` document, or None if it has no usable event."""
+    if not isinstance(doc.get('user_id'), str) or not isinstance(doc.get('event_type'), str):
+        return None
+
+    event = sanitize_tracking_data(doc)
+    if event.get('timestamp') is None and isinstance(doc['_id'], ObjectId):
+        event['timestamp'] = doc['_id'].generation_time
+    if event.get('timestamp') is None:
+        return None
+
+    # Fields the tracker no longer sends are kept under data
+    extra = {key: value for key, value in doc.items() if key not in LEGACY_EVENT_FIELDS}
+    try:
+        return Interaction.from_event(event, data=extra or None)
+    except (TypeError, ValueError):
+        return None
+
+
+class EventsTask:
+    name = 'events'
+    source = 'events'
+    query = {}
+
+    def write(self, db, docs):
+        ops, interactions = [], {}
+        for doc in docs:
+            interaction = legacy_interaction(doc)
+            if interaction is None:
+                continue
+            ops.append(UpdateOne({'_id': doc['_id']}, {'$setOnInsert': interaction.to_dict()}, upsert=True))
+            interactions[doc['_id']] = interaction
+        if not ops:
+            return 0, len(docs)
+
+        result = db['interactions'].bulk_write(ops, ordered=False)
+
+        # Only events inserted by this write count towards the users, so a replayed batch adds nothing
+        users = {}
+        for inserted_id in result.upserted_ids.values():
+            interaction = interactions[inserted_id]
+            first, last, count = users.get(interaction.user_id, (interaction.timestamp, interaction.timestamp, 0))
+            users[interaction.user_id] = (min(first, interaction.timestamp), max(last, interaction.timestamp), count + 1)
+        if users:
+            db['users'].bulk_write([
+                UpdateOne(
+                    {'user_id': user_id},
+                    {
+                        '$setOnInsert': {'fingerprint': {}, 'metadata': {}, 'total_sessions': 0},
+                        '$min': {'created_at': datetime.fromtimestamp(first)},
+                        '$max': {'last_seen': datetime.fromtimestamp(last)},
+                        '$inc': {'total_interactions': count}
+                    },
+                    upsert=True
+                )
+                for user_id, (first, last, count) in users.items()
+            ], ordered=False)
+
+        return len(ops), len(docs) - len(ops)
+
+
+def local_time(value):
+    """A naive UTC datetime from the legacy writer as the naive local time the blueprints store."""
+    if not isinstance(value, datetime):
+        return value
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone().replace(tzinfo=None)
+
+
+class SessionsTask:
+    name = 'sessions'
+    source = 'sessions'
+    query = {'start_time': {'$exists': True}}
+
+    def write(self, db, docs):
+        ops = []
+        for doc in docs:
+            # The legacy routes stored utcnow(), /session/start and /session/end store local now()
+            fields = {'started_at': local_time(doc['start_time'])}
+            if doc.get('end_time') is not None:
+                fields['ended_at'] = local_time(doc['end_time'])
+            ops.append(UpdateOne(
+                {'_id': doc['_id'], 'start_time': {'$exists': True}},
+                {'$set': fields, '$unset': {'start_time': '', 'end_time': ''}}
+            ))
+        db['sessions'].bulk_write(ops, ordered=False)
+        return len(ops), 0
+
+
+TASKS = {task.name: task for task in (EventsTask(), SessionsTask())}
+
+
+class Migration:
+    def __init__(self, db, task, batch=500, min_batch=50, max_batch=5000, target_ms=200, progress_every=5):
+        self.db = db
+        self.task = task
+        self.batch = batch
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.target = target_ms / 1000
+        self.progress_every = progress_every
+        self.holder = f"{socket.gethostname()}:{os.getpid()}"
+        self.checkpoints = db['migrations']
+
+    def claim(self, restart=False):
+        now = datetime.utcnow()
+        try:
+            checkpoint = self.checkpoints.find_one_and_update(
+                {
+                    '_id': self.task.name,
+                    '$or': [
+                        {'holder': None},
+                        {'holder': self.holder},
+                        {'heartbeat_at': {'$lt': now - timedelta(seconds=HEARTBEAT_TIMEOUT)}}
+                    ]
+                },
+                {
+                    '$set': {'holder': self.holder, 'heartbeat_at': now},
+                    '$setOnInsert': {'last_id': None, 'copied': 0, 'skipped': 0, 'batches': 0, 'started_at': now}
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # The checkpoint exists and another runner's heartbeat is fresh
+            raise SystemExit(f"✗ The {self.task.name} migration is already running elsewhere")
+
+        if restart:
+            reset = {'last_id': None, 'copied': 0, 'skipped': 0, 'batches': 0, 'started_at': now, 'finished_at': None}
+            self.checkpoints.update_one({'_id': self.task.name}, {'$set': reset})
+            checkpoint.update(reset)
+        return checkpoint
+
+    def save(self, last_id, copied, skipped):
+        result = self.checkpoints.update_one(
+            {'_id': self.task.name, 'holder': self.holder},
+            {
+                '$set': {'last_id': last_id, 'heartbeat_at': datetime.utcnow()},
+                '$inc': {'copied': copied, 'skipped': skipped, 'batches': 1}
+            }
+        )
+        if result.matched_count == 0:
+            raise SystemExit(f"✗ Lost the claim on the {self.task.name} migration, stopping")
+
+    def release(self, finished=False):
+        update = {'holder': None}
+        if finished:
+            update['finished_at'] = datetime.utcnow()
+        self.checkpoints.update_one({'_id': self.task.name, 'holder': self.holder}, {'$set': update})
+
+    def throttle(self, elapsed):
+        """Next batch size and pause, from how long the last batch took."""
+        if elapsed > self.target:
+            self.batch = max(self.min_batch, self.batch // 2)
+            return elapsed
+        self.batch = min(self.max_batch, self.batch + max(1, self.batch // 4))
+        return 0
+
+    def run(self, restart=False):
+        checkpoint = self.claim(restart)
+        last_id = checkpoint['last_id']
+        source = self.db[self.task.source]
+
+        def pending_query():
+            query = dict(self.task.query)
+            if last_id is not None:
+                query['_id'] = {'$gt': last_id}
+            return query
+
+        done_before = checkpoint['copied'] + checkpoint['skipped']
+        total = done_before + source.count_documents(pending_query())
+        copied = skipped = 0
+        started = last_report = time.perf_counter()
+        print(f"🔄 Migrating {self.task.name}: {total - done_before:,} documents to go"
+              f"{f' (resuming after {done_before:,})' if done_before else ''}")
+
+        finished = False
+        try:
+            while True:
+                batch_started = time.perf_counter()
+                docs = list(source.find(pending_query()).sort('_id', 1).limit(self.batch))
+                if not docs:
+                    finished = True
+                    break
+                batch_copied, batch_skipped = self.task.write(self.db, docs)
+                elapsed = time.perf_counter() - batch_started
+
+                last_id = docs[-1]['_id']
+                self.save(last_id, batch_copied, batch_skipped)
+                copied += batch_copied
+                skipped += batch_skipped
+
+                size = len(docs)
+                pause = self.throttle(elapsed)
+                now = time.perf_counter()
+                if now - last_report >= self.progress_every:
+                    last_report = now
+                    self.report(done_before + copied + skipped, total, copied + skipped, now - started,
+                                size, elapsed, pause)
+                if pause:
+                    time.sleep(pause)
+        finally:
+            self.release(finished)
+
+        seconds = time.perf_counter() - started
+        print(f"✓ {self.task.name}: {copied:,} migrated, {skipped:,} skipped in {seconds:.1f}s")
+        return {'copied': copied, 'skipped': skipped, 'seconds': seconds}
+
+    def report(self, done, total, done_now, seconds, size, elapsed, pause):
+        rate = done_now / seconds if seconds else 0
+        eta = f"{(total - done) / rate:.0f}s" if rate else '?'
+        throttled = f", paused {pause * 1000:.0f} ms" if pause else ''
+        print(f"🔄 {self.task.name}: {done:,}/{total:,} ({done / max(1, total):.0%}), {rate:,.0f} docs/s, "
+              f"batch of {size} took {elapsed * 1000:.0f} ms{throttled}, ETA {eta}")
+
+
+def run(db, only=None, restart=False, **options):
+    return {
+        name: Migration(db, task, **options).run(restart=restart)
+        for name, task in TASKS.items()
+        if only is None or name == only
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrate the legacy events and sessions into the canonical schema')
+    parser.add_argument('--only', choices=list(TASKS))
+    parser.add_argument('--restart', action='store_true', help='ignore the saved checkpoint and start over')
+    parser.add_argument('--batch', type=int, default=500, help='initial batch size')
+    parser.add_argument('--min-batch', type=int, default=50)
+    parser.add_argument('--max-batch', type=int, default=5000)
+    parser.add_argument('--target-ms', type=float, default=200, help='slowest acceptable batch before backing off')
+    parser.add_argument('--progress', type=float, default=5, help='seconds between progress lines')
+    args = parser.parse_args()
+
+    client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017'))
+    db = client[os.getenv('MONGO_DB', 'womens_football_analytics')]
+
+    run(db, only=args.only, restart=args.restart, batch=args.batch, min_batch=args.min_batch,
+        max_batch=args.max_batch, target_ms=args.target_ms, progress_every=args.progress)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+"""
+Offline analytics report over interaction exports.
+
+Reads mongoexport NDJSON (.json/.ndjson, optionally .gz) or mongodump
+BSON (.bson) files, splits them into chunks processed by a process pool
+and merges the partial aggregates into a JSON report. It never connects
+to MongoDB. Gzipped inputs cannot be split, so each one is read from
+start to end by a single worker; decompress large exports first to spread
+them over the pool.
+
+    python -m jobs.offline_report dump/interactions.bson -o report.json
+    python -m jobs.offline_report exports/*.ndjson --workers 8
+"""
+
+import argparse
+import gzip
+import json
+import os
+import struct
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import combinations
+
+import bson
+from bson import json_util
+
+
+CHUNK_BYTES = 64 * 1024 * 1024
+TOP_N = 10
+
+
+class PartialReport:
+    """Mergeable aggregates for one chunk of input."""
+
+    def __init__(self):
+        self.total = 0
+        self.skipped = 0
+        self.event_types = Counter()
+        self.users = Counter()
+        self.hours = Counter()
+        self.hashtags = Counter()
+        self.user_hashtags = {}
+        self.first_timestamp = None
+        self.last_timestamp = None
+
+    def add(self, doc):
+        timestamp = doc.get('timestamp')
+        if isinstance(timestamp, datetime):
+            # BSON dates decode as naive UTC
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.replace(tzinfo=timezone.utc)
+            timestamp = timestamp.timestamp()
+        if not isinstance(timestamp, (int, float)) or 'event_type' not in doc:
+            self.skipped += 1
+            return
+
+        self.total += 1
+        user_id = doc.get('user_id')
+        event_type = doc['event_type']
+
+        self.event_types[event_type] += 1
+        self.users[user_id] += 1
+        self.hours[datetime.fromtimestamp(timestamp).hour] += 1
+
+        if self.first_timestamp is None or timestamp < self.first_timestamp:
+            self.first_timestamp = timestamp
+        if self.last_timestamp is None or timestamp > self.last_timestamp:
+            self.last_timestamp = timestamp
+
+        element = doc.get('element') or ''
+        if event_type == 'click' and element.startswith('hashtag-'):
+            hashtag = element.replace('hashtag-', '')
+            self.hashtags[hashtag] += 1
+            self.user_hashtags.setdefault(user_id, set()).add(hashtag)
+
+    def merge(self, other):
+        self.total += other.total
+        self.skipped += other.skipped
+        self.event_types.update(other.event_types)
+        self.users.update(other.users)
+        self.hours.update(other.hours)
+        self.hashtags.update(other.hashtags)
+        for user_id, hashtags in other.user_hashtags.items():
+            self.user_hashtags.setdefault(user_id, set()).update(hashtags)
+        for timestamp in (other.first_timestamp, other.last_timestamp):
+            if timestamp is None:
+                continue
+            if self.first_timestamp is None or timestamp < self.first_timestamp:
+                self.first_timestamp = timestamp
+            if self.last_timestamp is None or timestamp > self.last_timestamp:
+                self.last_timestamp = timestamp
+        return self
+
+    def to_report(self):
+        pairs = Counter()
+        for hashtags in self.user_hashtags.values():
+            for pair in combinations(sorted(hashtags), 2):
+                pairs[pair] += 1
+
+        total_users = len(self.users)
+
+        return {
+            'stats': {
+                'total_interactions': self.total,
+                'skipped_documents': self.skipped,
+                'total_users': total_users,
+                'avg_interactions_per_user': round(self.total / total_users, 2) if total_users > 0 else 0,
+                'first_event': datetime.fromtimestamp(self.first_timestamp).isoformat() if self.first_timestamp else None,
+                'last_event': datetime.fromtimestamp(self.last_timestamp).isoformat() if self.last_timestamp else None
+            },
+            'event_types': [
+                {'type': event_type, 'count': count}
+                for event_type, count in self.event_types.most_common(TOP_N)
+            ],
+            'top_users': [
+                {'user_id': user_id, 'interactions': count}
+                for user_id, count in self.users.most_common(TOP_N)
+            ],
+            'hour_of_day': [
+                {'hour': hour, 'interactions': self.hours.get(hour, 0)}
+                for hour in range(24)
+            ],
+            'trending': [
+                {'hashtag': tag, 'clicks': count, 'trending_score': count * 100}
+                for tag, count in self.hashtags.most_common(TOP_N)
+            ],
+            'hashtag_affinity': [
+                {'hashtags': list(pair), 'users': count}
+                for pair, count in pairs.most_common(TOP_N)
+            ]
+        }
+
+
+def _open(path):
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+
+def _is_bson(path):
+    return path.endswith('.bson') or path.endswith('.bson.gz')
+
+
+def plan_chunks(paths, chunk_bytes=CHUNK_BYTES):
+    """Split inputs into (path, start, end) byte ranges.
+
+    NDJSON chunks may start mid-line; the reader skips to the next line and
+    reads past the end of its range to finish the last line. BSON chunk
+    boundaries are found by walking the document length prefixes.
+    Compressed files cannot be seeked cheaply and are one chunk each, so
+    a .gz input is processed serially by one worker.
+    """
+    chunks = []
+    for path in paths:
+        size = os.path.getsize(path)
+        if path.endswith('.gz') or size <= chunk_bytes:
+            chunks.append((path, 0, None))
+        elif _is_bson(path):
+            chunks.extend(_bson_chunks(path, size, chunk_bytes))
+        else:
+            chunks.extend((path, start, min(start + chunk_bytes, size))
+                          for start in range(0, size, chunk_bytes))
+    return chunks
+
+
+def _bson_chunks(path, size, chunk_bytes):
+    chunks = []
+    with open(path, 'rb') as f:
+        start = offset = 0
+        while offset < size:
+            f.seek(offset)
+            header = f.read(4)
+            if len(header) < 4:
+                break
+            offset += struct.unpack('<i', header)[0]
+            if offset - start >= chunk_bytes:
+                chunks.append((path, start, offset))
+                start = offset
+    if start < size:
+        chunks.append((path, start, size))
+    return chunks
+
+
+def _iter_ndjson(path, start, end):
+    with _open(path) as f:
+        if start:
+            f.seek(start - 1)
+            # Partial line: it belongs to the previous chunk
+            if f.read(1) != b'\n':
+                f.readline()
+        position = f.tell()
+        for line in f:
+            if end is not None and position >= end:
+                break
+            position += len(line)
+            line = line.strip()
+            if line:
+                # Plain json is several times faster than json_util; only the
+                # timestamp needs Extended JSON handling for the report.
+                doc = json.loads(line)
+                if isinstance(doc.get('timestamp'), dict):
+                    doc['timestamp'] = json_util.loads(json.dumps(doc['timestamp']))
+                yield doc
+
+
+def _iter_bson(path, start, end):
+    """Decode one document at a time by its length prefix, never the whole range at once."""
+    with _open(path) as f:
+        if start:
+            f.seek(start)
+        position = start
+        while end is None or position < end:
+            header = f.read(4)
+            if not header:
+                break
+            length = struct.unpack('<i', header)[0] if len(header) == 4 else 0
+            body = f.read(length - 4) if length > 4 else b''
+            if len(body) != length - 4 or length <= 4:
+                raise bson.errors.InvalidBSON(f"truncated document at byte {position} of {path}")
+            position += length
+            yield bson.decode(header + body)
+
+
+def process_chunk(chunk):
+    path, start, end = chunk
+    partial = PartialReport()
+    reader = _iter_bson if _is_bson(path) else _iter_ndjson
+    for doc in reader(path, start, end):
+        partial.add(doc)
+    return partial
+
+
+def build_report(paths, workers=None, chunk_bytes=CHUNK_BYTES):
+    chunks = plan_chunks(paths, chunk_bytes)
+    workers = workers or os.cpu_count() or 1
+
+    report = PartialReport()
+    if workers == 1:
+        for chunk in chunks:
+            report.merge(process_chunk(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for partial in pool.map(process_chunk, chunks):
+                report.merge(partial)
+
+    return report.to_report(), len(chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build an analytics report from interaction exports')
+    parser.add_argument('paths', nargs='+', help='mongoexport NDJSON or mongodump BSON files')
+    parser.add_argument('-o', '--output', default='report.json')
+    parser.add_argument('--workers', type=int, default=None, help='defaults to the number of CPUs')
+    parser.add_argument('--chunk-mb', type=int, default=CHUNK_BYTES // 2**20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    report, chunk_count = build_report(args.paths, workers=args.workers, chunk_bytes=args.chunk_mb * 2**20)
+    elapsed = time.perf_counter() - start
+
+    report['generated_at'] = datetime.now().isoformat()
+    report['source'] = {'files': args.paths, 'chunks': chunk_count, 'seconds': round(elapsed, 2)}
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    total = report['stats']['total_interactions']
+    print(f"✓ Processed {total:,} interactions from {chunk_count} chunks in {elapsed:.1f}s "
+          f"({total / elapsed:,.0f}/s) -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+"""
+Batch job that clusters users into behavioural segments.
+
+Rolls interactions up per user inside MongoDB, builds a dense feature
+matrix (event-type mix, local hour-of-day activity, top clicked hashtags),
+clusters it with mini-batch k-means and swaps the assignments into
+user_segments together with the centroids in segment_centroids.
+
+    python -m jobs.segment_users --segments 8
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+from pymongo import MongoClient
+
+DEFAULT_SEGMENTS = 8
+TOP_HASHTAGS = 20
+BATCH_SIZE = 4096
+MAX_ITERATIONS = 300
+WRITE_BATCH_SIZE = 10000
+
+# Pinned rather than read from the validator, so accepting a new event type
+# does not shift the feature columns of stored centroids. Each run also
+# records its feature names in segment_runs.
+EVENT_FEATURES = (
+    'click', 'hover', 'scroll', 'page_view', 'session_start', 'session_end',
+    'element_focus', 'mouse_move', 'key_press', 'form_submit'
+)
+
+
+def local_timezone():
+    """The server's zone for $hour, so the hour features match the local hours the routes report.
+
+    SEGMENT_TIMEZONE or TZ if set, else the zone /etc/localtime links to,
+    else today's UTC offset (which does not follow daylight saving).
+    """
+    name = os.getenv('SEGMENT_TIMEZONE') or os.getenv('TZ', '').lstrip(':')
+    if name:
+        return name
+    target = os.path.realpath('/etc/localtime')
+    if '/zoneinfo/' in target:
+        return target.split('/zoneinfo/', 1)[1]
+    offset = int(datetime.now().astimezone().utcoffset().total_seconds() // 60)
+    return f"{'+' if offset >= 0 else '-'}{abs(offset) // 60:02d}:{abs(offset) % 60:02d}"
+
+
+TIMEZONE = local_timezone()
+
+ROLLUP_PIPELINE = [
+    {'$match': {'timestamp': {'$type': 'number'}}},
+    {'$group': {
+        '_id': {
+            'user_id': '$user_id',
+            'event_type': '$event_type',
+            'hour': {'$hour': {'date': {'$toDate': {'$multiply': ['$timestamp', 1000]}}, 'timezone': TIMEZONE}},
+            'hashtag': {'$cond': [
+                {'$and': [
+                    {'$eq': ['$event_type', 'click']},
+                    {'$eq': [{'$substrCP': [{'$ifNull': ['$element', '']}, 0, 8]}, 'hashtag-']}
+                ]},
+                {'$substrCP': ['$element', 8, 200]},
+                None
+            ]}
+        },
+        'count': {'$sum': 1}
+    }},
+    {'$group': {
+        '_id': '$_id.user_id',
+        'cells': {'$push': {
+            'event_type': '$_id.event_type',
+            'hour': '$_id.hour',
+            'hashtag': '$_id.hashtag',
+            'count': '$count'
+        }},
+        'total': {'$sum': '$count'},
+        'rolled_up_at': {'$first': '$$NOW'}
+    }},
+    {'$merge': {'into': 'user_rollups', 'whenMatched': 'replace', 'whenNotMatched': 'insert'}}
+]
+
+
+def feature_names(hashtags):
+    return (
+        [f"event:{event_type}" for event_type in EVENT_FEATURES] +
+        [f"hour:{hour:02d}" for hour in range(24)] +
+        [f"hashtag:{tag}" for tag in hashtags] +
+        ['activity']
+    )
+
+
+def build_feature_matrix(rollups, top_hashtags=TOP_HASHTAGS):
+    """Turn rollup documents into (user_ids, raw counts, hashtags).
+
+    Raw counts are laid out as event types, then 24 hours, then the most
+    clicked hashtags across all users, then total activity.
+    """
+    event_columns = {event_type: i for i, event_type in enumerate(EVENT_FEATURES)}
+    hour_offset = len(EVENT_FEATURES)
+
+    user_ids = []
+    dense_rows = []
+    tag_rows, tag_codes, tag_counts = [], [], []
+    tags = {}
+
+    for row, rollup in enumerate(rollups):
+        user_ids.append(rollup['_id'])
+        dense = np.zeros(hour_offset + 24, dtype=np.float32)
+        for cell in rollup['cells']:
+            count = cell['count']
+            column = event_columns.get(cell['event_type'])
+            if column is not None:
+                dense[column] += count
+            if cell.get('hour') is not None:
+                dense[hour_offset + cell['hour']] += count
+            if cell.get('hashtag'):
+                tag_rows.append(row)
+                tag_codes.append(tags.setdefault(cell['hashtag'], len(tags)))
+                tag_counts.append(count)
+        dense_rows.append(dense)
+
+    n_users = len(user_ids)
+    tag_rows = np.asarray(tag_rows, dtype=np.int64)
+    tag_codes = np.asarray(tag_codes, dtype=np.int64)
+    tag_counts = np.asarray(tag_counts, dtype=np.float32)
+
+    totals = np.bincount(tag_codes, weights=tag_counts, minlength=len(tags))
+    top = np.argsort(-totals, kind='stable')[:top_hashtags]
+    top = top[totals[top] > 0]
+    names = list(tags)
+    hashtags = [names[code] for code in top]
+
+    column_of_tag = np.full(len(tags), -1, dtype=np.int64)
+    column_of_tag[top] = np.arange(len(top))
+
+    counts = np.zeros((n_users, hour_offset + 24 + len(hashtags) + 1), dtype=np.float32)
+    if n_users:
+        counts[:, :hour_offset + 24] = np.vstack(dense_rows)
+    keep = column_of_tag[tag_codes] >= 0 if len(tag_codes) else np.zeros(0, dtype=bool)
+    np.add.at(counts, (tag_rows[keep], hour_offset + 24 + column_of_tag[tag_codes[keep]]), tag_counts[keep])
+    counts[:, -1] = counts[:, :len(EVENT_FEATURES)].sum(axis=1)
+
+    return user_ids, counts, hashtags
+
+
+def normalize_features(counts, n_hashtags):
+    """Scale each block to shares so users are compared by behaviour, not volume."""
+    events = len(EVENT_FEATURES)
+    blocks = [(0, events), (events, events + 24), (events + 24, events + 24 + n_hashtags)]
+
+    features = np.empty_like(counts)
+    for start, end in blocks:
+        block = counts[:, start:end]
+        totals = block.sum(axis=1, keepdims=True)
+        np.divide(block, totals, out=features[:, start:end], where=totals > 0)
+        features[:, start:end][totals[:, 0] == 0] = 0
+    features[:, -1] = np.log1p(counts[:, -1])
+
+    mean = features.mean(axis=0)
+    std = features.std(axis=0)
+    std[std == 0] = 1
+    return (features - mean) / std, mean, std
+
+
+def _squared_distances(X, centroids):
+    return (
+        np.einsum('ij,ij->i', X, X)[:, None]
+        - 2 * X @ centroids.T
+        + np.einsum('ij,ij->i', centroids, centroids)[None, :]
+    )
+
+
+def _kmeans_plus_plus(X, k, rng):
+    centroids = np.empty((k, X.shape[1]), dtype=X.dtype)
+    centroids[0] = X[rng.integers(len(X))]
+    closest = _squared_distances(X, centroids[:1])[:, 0]
+    for i in range(1, k):
+        weights = np.maximum(closest, 0)
+        total = weights.sum()
+        index = rng.choice(len(X), p=weights / total) if total > 0 else rng.integers(len(X))
+        centroids[i] = X[index]
+        closest = np.minimum(closest, _squared_distances(X, centroids[i:i + 1])[:, 0])
+    return centroids
+
+
+def assign(X, centroids, chunk_size=65536):
+    labels = np.empty(len(X), dtype=np.int32)
+    distances = np.empty(len(X), dtype=np.float32)
+    for start in range(0, len(X), chunk_size):
+        d = _squared_distances(X[start:start + chunk_size], centroids)
+        labels[start:start + chunk_size] = d.argmin(axis=1)
+        distances[start:start + chunk_size] = np.sqrt(np.maximum(d.min(axis=1), 0))
+    return labels, distances
+
+
+def minibatch_kmeans(X, k, batch_size=BATCH_SIZE, max_iterations=MAX_ITERATIONS,
+                     patience=10, seed=0):
+    """Mini-batch k-means (Sculley, 2010) with k-means++ seeding on a sample.
+
+    Stops once the smoothed batch inertia has not improved for `patience`
+    iterations, like scikit-learn's MiniBatchKMeans.
+    """
+    rng = np.random.default_rng(seed)
+    k = min(k, len(X))
+
+    sample = X[rng.choice(len(X), size=min(len(X), 20 * batch_size), replace=False)]
+    centroids = _kmeans_plus_plus(sample, k, rng)
+    seen = np.zeros(k, dtype=np.float64)
+    clusters = np.arange(k)
+
+    smoothed = None
+    best = np.inf
+    stale = 0
+
+    for iteration in range(max_iterations):
+        batch = X[rng.integers(0, len(X), size=min(batch_size, len(X)))]
+        distances = _squared_distances(batch, centroids)
+        labels = distances.argmin(axis=1)
+        inertia = float(distances[np.arange(len(batch)), labels].mean())
+
+        membership = (labels[None, :] == clusters[:, None]).astype(batch.dtype)
+        counts = membership.sum(axis=1).astype(np.float64)
+        sums = membership @ batch
+
+        updated = counts > 0
+        seen[updated] += counts[updated]
+        rate = (counts[updated] / seen[updated])[:, None]
+        centroids[updated] = (1 - rate) * centroids[updated] + rate * (sums[updated] / counts[updated, None])
+
+        alpha = min(1.0, 2 * len(batch) / len(X))
+        smoothed = inertia if smoothed is None else smoothed * (1 - alpha) + inertia * alpha
+        if smoothed < best:
+            best = smoothed
+            stale = 0
+        else:
+            stale += 1
+            if stale >= patience:
+                break
+
+    return centroids, iteration + 1
+
+
+def describe_centroids(centroids, mean, std, names):
+    """Name each segment by the features that stand out most from the average."""
+    descriptions = []
+    for centroid in centroids:
+        top = np.argsort(-centroid)[:3]
+        descriptions.append({
+            'top_features': [names[i] for i in top],
+            'centroid': {names[i]: round(float(centroid[i] * std[i] + mean[i]), 4) for i in range(len(names))}
+        })
+    return descriptions
+
+
+def store_results(db, user_ids, labels, distances, centroids, descriptions, run):
+    staging = db['user_segments_staging']
+    staging.drop()
+
+    for start in range(0, len(user_ids), WRITE_BATCH_SIZE):
+        staging.insert_many([
+            {'_id': user_id, 'segment': int(label), 'distance': float(distance)}
+            for user_id, label, distance in zip(
+                user_ids[start:start + WRITE_BATCH_SIZE],
+                labels[start:start + WRITE_BATCH_SIZE],
+                distances[start:start + WRITE_BATCH_SIZE]
+            )
+        ], ordered=False)
+    staging.create_index('segment')
+    staging.rename('user_segments', dropTarget=True)
+
+    sizes = np.bincount(labels, minlength=len(centroids))
+    db['segment_centroids'].delete_many({})
+    db['segment_centroids'].insert_many([
+        dict(description, _id=segment, size=int(sizes[segment]), run_at=run['run_at'])
+        for segment, description in enumerate(descriptions)
+    ])
+    db['segment_runs'].insert_one(run)
+
+
+def run(db, k=DEFAULT_SEGMENTS, seed=0, skip_rollup=False):
+    timings = {}
+
+    start = time.perf_counter()
+    if not skip_rollup:
+        db['interactions'].aggregate(ROLLUP_PIPELINE, allowDiskUse=True)
+    timings['rollup'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rollups = db['user_rollups'].find({}, {'cells': 1}).batch_size(5000)
+    user_ids, counts, hashtags = build_feature_matrix(rollups)
+    if not user_ids:
+        print("⚠ No user rollups found, nothing to segment")
+        return None
+    X, mean, std = normalize_features(counts, len(hashtags))
+    timings['features'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    centroids, iterations = minibatch_kmeans(X, k, seed=seed)
+    labels, distances = assign(X, centroids)
+    timings['clustering'] = time.perf_counter() - start
+
+    names = feature_names(hashtags)
+    run_info = {
+        'run_at': datetime.now(),
+        'users': len(user_ids),
+        'segments': len(centroids),
+        'iterations': iterations,
+        'inertia': float(np.square(distances).sum()),
+        'features': names,
+        'timezone': TIMEZONE,
+        'timings': timings
+    }
+
+    start = time.perf_counter()
+    store_results(db, user_ids, labels, distances, centroids,
+                  describe_centroids(centroids, mean, std, names), run_info)
+    timings['store'] = time.perf_counter() - start
+
+    return run_info
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cluster users into behavioural segments')
+    parser.add_argument('--segments', type=int, default=DEFAULT_SEGMENTS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skip-rollup', action='store_true', help='reuse the existing user_rollups collection')
+    args = parser.parse_args()
+
+    client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017'))
+    db = client[os.getenv('MONGO_DB', 'womens_football_analytics')]
+
+    run_info = run(db, k=args.segments, seed=args.seed, skip_rollup=args.skip_rollup)
+    if run_info:
+        timings = ', '.join(f"{name} {seconds:.1f}s" for name, seconds in run_info['timings'].items())
+        print(f"✓ Segmented {run_info['users']:,} users into {run_info['segments']} segments ({timings})")
+
+
+if __name__ == '__main__':
+    main()
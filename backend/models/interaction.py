@@ -1,32 +1,104 @@
 """
 Interaction Model
 Represents a single user interaction event
+
+This is the one stored shape for tracking events: they all live in the
+interactions collection with `timestamp` in epoch seconds (a float, as the
+tracker sends it). Anything built from a tracking payload or from an older
+document goes through Interaction.from_event.
 """
 
-from datetime import datetime
+from datetime import datetime, timezone
+
+OPTIONAL_FIELDS = (
+    'element', 'page_url', 'target', 'value',
+    'x', 'y', 'scroll_depth', 'duration', 'metadata'
+)
+
+
+def to_epoch(value):
+    """Epoch seconds for a timestamp in any form the event stores have held."""
+    if isinstance(value, datetime):
+        # BSON dates come back naive and in UTC
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    if isinstance(value, str):
+        return to_epoch(datetime.fromisoformat(value.replace('Z', '+00:00')))
+    value = float(value)
+    # Date.now() is in milliseconds
+    return value / 1000 if value > 1e11 else value
+
 
 class Interaction:
-    def __init__(self, user_id, event_type, data=None, timestamp=None):
+    __slots__ = ('user_id', 'event_type', 'timestamp', 'session_id', 'data') + OPTIONAL_FIELDS
+
+    def __init__(self, user_id, event_type, data=None, timestamp=None, session_id=None, element=None,
+                 page_url=None, target=None, value=None, x=None, y=None, scroll_depth=None, duration=None,
+                 metadata=None):
         self.user_id = user_id
         self.event_type = event_type
         self.data = data or {}
-        self.timestamp = timestamp or datetime.utcnow()
-        self.session_id = data.get('session_id') if data else None
-    
+        self.timestamp = timestamp or datetime.now().timestamp()
+        self.session_id = session_id or (data.get('session_id') if data else None)
+        self.element = element
+        self.page_url = page_url
+        self.target = target
+        self.value = value
+        self.x = x
+        self.y = y
+        self.scroll_depth = scroll_depth
+        self.duration = duration
+        self.metadata = metadata
+
     def to_dict(self):
-        return {
+        interaction = {
             'user_id': self.user_id,
             'event_type': self.event_type,
             'timestamp': self.timestamp,
             'session_id': self.session_id,
             'data': self.data
         }
-    
+        # Optional fields are only stored when set (spelled out: a getattr loop is ~2x slower)
+        if self.element is not None:
+            interaction['element'] = self.element
+        if self.page_url is not None:
+            interaction['page_url'] = self.page_url
+        if self.target is not None:
+            interaction['target'] = self.target
+        if self.value is not None:
+            interaction['value'] = self.value
+        if self.x is not None:
+            interaction['x'] = self.x
+        if self.y is not None:
+            interaction['y'] = self.y
+        if self.scroll_depth is not None:
+            interaction['scroll_depth'] = self.scroll_depth
+        if self.duration is not None:
+            interaction['duration'] = self.duration
+        if self.metadata is not None:
+            interaction['metadata'] = self.metadata
+        return interaction
+
+    @staticmethod
+    def from_event(event, data=None):
+        """The canonical interaction for a sanitized tracking event."""
+        return Interaction(
+            user_id=event['user_id'],
+            event_type=event['event_type'],
+            data=data,
+            timestamp=to_epoch(event['timestamp']),
+            session_id=event.get('session_id'),
+            **{field: event[field] for field in OPTIONAL_FIELDS if field in event}
+        )
+
     @staticmethod
     def from_dict(data):
         return Interaction(
             user_id=data.get('user_id'),
             event_type=data.get('event_type'),
             data=data.get('data'),
-            timestamp=data.get('timestamp')
+            timestamp=data.get('timestamp'),
+            session_id=data.get('session_id'),
+            **{k: data[k] for k in OPTIONAL_FIELDS if k in data}
         )
@@ -0,0 +1,85 @@
+"""
+Reddit Post Model
+Compact record of the few listing fields the analytics use
+"""
+
+import ijson
+
+
+class RedditPost:
+    __slots__ = (
+        'id', 'title', 'selftext', 'subreddit', 'author', 'score', 'num_comments',
+        'num_crossposts', 'created_utc', 'permalink', 'source_subreddit'
+    )
+
+    # Listing fields copied onto the record; everything else Reddit sends is skipped
+    FIELDS = __slots__[:-1]
+
+    def __init__(self, id=None, title='', selftext='', subreddit=None, author='anonymous', score=0,
+                 num_comments=0, num_crossposts=0, created_utc=0, permalink='', source_subreddit=None):
+        self.id = id
+        self.title = title or ''
+        self.selftext = selftext or ''
+        self.subreddit = subreddit
+        self.author = author or 'anonymous'
+        self.score = score or 0
+        self.num_comments = num_comments or 0
+        self.num_crossposts = num_crossposts or 0
+        self.created_utc = created_utc or 0
+        self.permalink = permalink or ''
+        self.source_subreddit = source_subreddit
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    @staticmethod
+    def from_dict(data):
+        return RedditPost(**{field: data[field] for field in RedditPost.__slots__ if field in data})
+
+
+def parse_listing(stream, seen_ids=None):
+    """Stream-parse a Reddit listing (a file-like JSON body) into RedditPosts.
+
+    Posts are built one at a time and projected straight away, so only one
+    full post object is alive at once. Ids already in seen_ids are skipped
+    and new ones are added to it.
+    """
+    seen_ids = set() if seen_ids is None else seen_ids
+    posts = []
+    for data in ijson.items(stream, 'data.children.item.data', use_float=True):
+        post_id = data.get('id')
+        if not post_id or post_id in seen_ids:
+            continue
+        seen_ids.add(post_id)
+        posts.append(RedditPost(**{field: data.get(field) for field in RedditPost.FIELDS}))
+    return posts
+
+
+def parse_comments(stream, depth=1, limit=20):
+    """Stream-parse a Reddit comments page into the text of its comments.
+
+    The page is the post listing followed by the comment listing. Comments
+    are taken level by level, top-level first, down to `depth` levels and
+    at most `limit` bodies; "load more" stubs and deleted comments are
+    skipped.
+    """
+    texts = []
+    level = []
+    for child in ijson.items(stream, 'item.data.children.item', use_float=True):
+        if child.get('kind') == 't1':
+            level.append(child.get('data', {}))
+
+    for _ in range(depth):
+        replies = []
+        for data in level:
+            if len(texts) >= limit:
+                return texts
+            body = data.get('body')
+            if body and body not in ('[deleted]', '[removed]'):
+                texts.append(body)
+            nested = data.get('replies')
+            if isinstance(nested, dict):
+                replies.extend(child.get('data', {}) for child in nested.get('data', {}).get('children', [])
+                               if child.get('kind') == 't1')
+        level = replies
+    return texts
@@ -1,12 +1,56 @@
+import os
+import threading
+import time
 import requests
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime, timedelta
 import re
-from collections import Counter
+
+import ijson
+
+from models.reddit_post import RedditPost, parse_comments, parse_listing
+from utils.circuit_breaker import CircuitBreaker
+from utils.comment_fetcher import CommentFetcher, MAX_COMMENTS, MAX_DEPTH
+from utils.metrics import reddit_fetch_seconds, reddit_fetches_skipped
+from utils.post_aggregates import PostColumns, aggregate_posts
+from utils.query_cache import QueryCache, CachedFailure
+
+REQUEST_TIMEOUT = float(os.getenv('REDDIT_TIMEOUT', 10))
+
+# Hedging sends a second copy of a request that is slower than the given
+# percentile of recent latencies, and takes whichever answers first
+HEDGE_ENABLED = os.getenv('REDDIT_HEDGE', '0') == '1'
+HEDGE_PERCENTILE = float(os.getenv('REDDIT_HEDGE_PERCENTILE', 95))
+HEDGE_MIN_SAMPLES = 20
+
+# Requests kept in hand from the rate-limit budget; hedges never spend them
+RATE_LIMIT_RESERVE = int(os.getenv('REDDIT_RATE_LIMIT_RESERVE', 10))
+
+LAST_GOOD_MAX = 200
+
+
+class RedditUnavailable(Exception):
+    pass
+
+
+def _close_response(future):
+    if future.exception() is None:
+        future.result().close()
+
+
+def _encode_posts(posts):
+    return [post.to_dict() for post in posts]
+
+
+def _decode_posts(documents):
+    return [RedditPost.from_dict(document) for document in documents]
+
 
 class RedditService:
     
     def __init__(self):
-        self.base_url = "https://www.reddit.com"
+        self.base_url = os.getenv('REDDIT_BASE_URL', "https://www.reddit.com")
         self.headers = {
             'User-Agent': 'WomensFootballAnalytics/1.0 (Educational Project)'
         }
@@ -19,46 +63,268 @@ class RedditService:
             'chelseafc', 
             'Arsenal'    
         ]
+        self.search_terms = [
+            "women's football",
+            "women's soccer", 
+            "WSL",
+            "NWSL",
+            "UWCL women"
+        ]
+
+        self.breakers = {}
+        self.last_good = OrderedDict()
+        self.latencies = deque(maxlen=200)
+        self.rate_limit = {'remaining': None, 'used': None, 'reset_at': None}
+        self.hedges = {'sent': 0, 'won': 0}
+        self._lock = threading.Lock()
+        self._hedge_pool = None
+        self.search_cache = QueryCache(
+            'reddit_search',
+            max_entries=int(os.getenv('REDDIT_SEARCH_CACHE_SIZE', 256)),
+            ttl=float(os.getenv('REDDIT_SEARCH_CACHE_TTL', 300)),
+            negative_ttl=float(os.getenv('REDDIT_SEARCH_CACHE_NEGATIVE_TTL', 30)),
+            shared=os.getenv('REDDIT_SEARCH_CACHE_SHARED', '0') == '1',
+            encode=_encode_posts,
+            decode=_decode_posts
+        )
+        self.comments = CommentFetcher(self)
         
     def fetch_subreddit_posts(self, subreddit, limit=25, time_filter='week'):
-        try:
-            url = f"{self.base_url}/r/{subreddit}/top.json"
-            params = {
-                'limit': limit,
-                't': time_filter,
-                'raw_json': 1
-            }
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data.get('data', {}).get('children', [])
-            else:
-                print(f"Error fetching r/{subreddit}: {response.status_code}")
-                return []
-        except Exception as e:
-            print(f"Exception fetching r/{subreddit}: {e}")
-            return []
+        url = f"{self.base_url}/r/{subreddit}/top.json"
+        params = {
+            'limit': limit,
+            't': time_filter,
+            'raw_json': 1
+        }
+        return self._get_listing(f"r/{subreddit}", f"r/{subreddit}", url, params)
     
-    def search_reddit(self, query, limit=50):
+    def search_reddit(self, query, limit=50, refresh=False):
+        url = f"{self.base_url}/search.json"
+        params = {
+            'q': query,
+            'limit': limit,
+            'sort': 'relevance',
+            't': 'month',
+            'raw_json': 1
+        }
+        key = f"{' '.join(query.lower().split())}|{limit}|relevance|month"
+        cache_key = f"search:{key}"
         try:
-            url = f"{self.base_url}/search.json"
-            params = {
-                'q': query,
-                'limit': limit,
-                'sort': 'relevance',
-                't': 'month',
-                'raw_json': 1
-            }
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data.get('data', {}).get('children', [])
-            return []
+            return self.search_cache.get_or_compute(
+                key, lambda: self._get_listing('search', cache_key, url, params, fallback=False), refresh=refresh
+            )
+        except (RedditUnavailable, CachedFailure):
+            return self._fallback(cache_key)
+
+    def fetch_comments(self, post_id, limit=MAX_COMMENTS, depth=MAX_DEPTH):
+        """Text of the top comments of a post. Raises RedditUnavailable on failure."""
+        # Comments are optional, so like hedges they never spend the reserved budget
+        if not self._spare_budget():
+            raise RedditUnavailable(f"comments:{post_id}: rate limit reserve")
+        url = f"{self.base_url}/comments/{post_id}.json"
+        params = {
+            'limit': limit,
+            'depth': depth,
+            'sort': 'top',
+            'raw_json': 1
+        }
+        return self._get_listing(
+            'comments', f"comments:{post_id}", url, params, fallback=False,
+            parse=lambda stream: parse_comments(stream, depth, limit), remember=False
+        )
+
+    def _get_listing(self, endpoint, cache_key, url, params, fallback=True, parse=parse_listing, remember=True):
+        """Fetch a listing through the endpoint's breaker and parse the streamed body.
+
+        When Reddit is unavailable this returns the last good copy, or raises
+        RedditUnavailable with fallback=False. remember=False keeps the result
+        out of the last good copies.
+        """
+        breaker = self._breaker(endpoint)
+
+        def unavailable(reason):
+            if not fallback:
+                raise RedditUnavailable(f"{cache_key}: {reason}")
+            return self._fallback(cache_key)
+
+        if self._budget_exhausted():
+            print(f"⚠ Reddit rate limit exhausted, serving last good data for {cache_key}")
+            reddit_fetches_skipped.inc(endpoint, 'rate_limit')
+            return unavailable('rate limit exhausted')
+        if not breaker.allow():
+            reddit_fetches_skipped.inc(endpoint, 'circuit_open')
+            return unavailable('circuit open')
+
+        started = time.perf_counter()
+
+        def timed(outcome):
+            reddit_fetch_seconds.observe(time.perf_counter() - started, endpoint, outcome)
+
+        try:
+            response = self._fetch(url, params)
         except Exception as e:
-            print(f"Exception searching Reddit: {e}")
+            breaker.record_failure()
+            timed('error')
+            print(f"Exception fetching {cache_key}: {e}")
+            return unavailable(str(e))
+
+        if response.status_code != 200:
+            response.close()
+            timed(f"http_{response.status_code}")
+
+        if response.status_code == 429:
+            breaker.record_failure(retry_after=self._seconds_until_reset())
+            print(f"⚠ Rate limited by Reddit on {cache_key}")
+            return unavailable('rate limited')
+        if response.status_code >= 500:
+            breaker.record_failure()
+            print(f"Error fetching {cache_key}: {response.status_code}")
+            return unavailable(f"HTTP {response.status_code}")
+
+        # Anything else means Reddit itself is up, even if this listing is not there
+        breaker.record_success()
+        if response.status_code != 200:
+            print(f"Error fetching {cache_key}: {response.status_code}")
             return []
+
+        try:
+            # Project each post into a RedditPost while the body streams in
+            response.raw.decode_content = True
+            posts = parse(response.raw)
+        except (ijson.JSONError, ijson.IncompleteJSONError, requests.RequestException) as e:
+            timed('invalid')
+            print(f"Invalid response for {cache_key}: {e}")
+            return unavailable('invalid response')
+        finally:
+            response.close()
+        timed('ok')
+
+        if not remember:
+            return posts
+        with self._lock:
+            self.last_good[cache_key] = posts
+            self.last_good.move_to_end(cache_key)
+            while len(self.last_good) > LAST_GOOD_MAX:
+                self.last_good.popitem(last=False)
+        return posts
+
+    def _breaker(self, endpoint):
+        with self._lock:
+            if endpoint not in self.breakers:
+                self.breakers[endpoint] = CircuitBreaker(
+                    endpoint,
+                    failure_threshold=int(os.getenv('REDDIT_BREAKER_FAILURES', 3)),
+                    reset_timeout=float(os.getenv('REDDIT_BREAKER_RESET', 30))
+                )
+            return self.breakers[endpoint]
+
+    def _fallback(self, cache_key):
+        with self._lock:
+            return self.last_good.get(cache_key, [])
+
+    def _send(self, url, params):
+        started = time.perf_counter()
+        response = requests.get(url, headers=self.headers, params=params, timeout=REQUEST_TIMEOUT, stream=True)
+        if response.status_code < 500:
+            self.latencies.append(time.perf_counter() - started)
+        self._update_rate_limit(response.headers)
+        return response
+
+    def _fetch(self, url, params):
+        delay = self._hedge_delay()
+        if delay is None:
+            return self._send(url, params)
+
+        pool = self._pool()
+        pending = {pool.submit(self._send, url, params)}
+        done, pending = wait(pending, timeout=delay)
+        hedge = None
+        if not done and self._spare_budget():
+            hedge = pool.submit(self._send, url, params)
+            pending.add(hedge)
+            with self._lock:
+                self.hedges['sent'] += 1
+
+        error = None
+        while done or pending:
+            for future in done:
+                try:
+                    response = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if future is hedge:
+                    with self._lock:
+                        self.hedges['won'] += 1
+                # The slower copy finishes on its own in the pool; drop its connection then
+                for loser in pending:
+                    loser.add_done_callback(_close_response)
+                return response
+            done, pending = wait(pending, return_when=FIRST_COMPLETED) if pending else (set(), set())
+        raise error
+
+    def _pool(self):
+        with self._lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='reddit-hedge')
+            return self._hedge_pool
+
+    def _hedge_delay(self):
+        if not HEDGE_ENABLED or len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * HEDGE_PERCENTILE / 100))]
+
+    def _update_rate_limit(self, headers):
+        remaining = headers.get('X-Ratelimit-Remaining')
+        if remaining is None:
+            return
+        try:
+            with self._lock:
+                self.rate_limit['remaining'] = float(remaining)
+                self.rate_limit['used'] = int(float(headers.get('X-Ratelimit-Used', 0)))
+                self.rate_limit['reset_at'] = time.time() + float(headers.get('X-Ratelimit-Reset', 0))
+        except ValueError:
+            pass
+
+    def _seconds_until_reset(self):
+        reset_at = self.rate_limit.get('reset_at')
+        return max(1, reset_at - time.time()) if reset_at else None
+
+    def _budget_exhausted(self):
+        remaining, reset_at = self.rate_limit['remaining'], self.rate_limit['reset_at']
+        return remaining is not None and remaining < 1 and bool(reset_at) and time.time() < reset_at
+
+    def _spare_budget(self):
+        remaining, reset_at = self.rate_limit['remaining'], self.rate_limit['reset_at']
+        if remaining is None or (reset_at and time.time() >= reset_at):
+            return True
+        return remaining > RATE_LIMIT_RESERVE
+
+    def health(self):
+        ordered = sorted(self.latencies)
+        reset_at = self.rate_limit['reset_at']
+        return {
+            'breakers': [breaker.stats() for breaker in list(self.breakers.values())],
+            'rate_limit': {
+                'remaining': self.rate_limit['remaining'],
+                'used': self.rate_limit['used'],
+                'resets_in_seconds': round(max(0, reset_at - time.time())) if reset_at else None
+            },
+            'latency_ms': {
+                'samples': len(ordered),
+                'p50': round(ordered[len(ordered) // 2] * 1000, 1) if ordered else None,
+                'p95': round(ordered[int(len(ordered) * 0.95)] * 1000, 1) if ordered else None
+            },
+            'hedging': {
+                'enabled': HEDGE_ENABLED,
+                'delay_ms': round(self._hedge_delay() * 1000, 1) if self._hedge_delay() is not None else None,
+                **self.hedges
+            },
+            'fallback_entries': len(self.last_good),
+            'search_cache': self.search_cache.stats(),
+            'comments': self.comments.stats()
+        }
     
     def extract_hashtags(self, text):
         if not text:
@@ -97,170 +363,50 @@ class RedditService:
             return 'negative'
         return 'neutral'
     
-    def get_social_media_data(self):
-        all_posts = []
-        
+    def sources(self):
+        """Every listing the social dashboard is built from, as (kind, name) pairs."""
+        return [('subreddit', name) for name in self.subreddits] + \
+            [('search', term) for term in self.search_terms]
 
-        for subreddit in self.subreddits[:4]:  
-            posts = self.fetch_subreddit_posts(subreddit, limit=25)
-            for post in posts:
-                post_data = post.get('data', {})
-                post_data['source_subreddit'] = subreddit
-                all_posts.append(post_data)
-        
-        search_terms = [
-            "women's football",
-            "women's soccer", 
-            "WSL",
-            "NWSL",
-            "UWCL women"
-        ]
-        
-        for term in search_terms:
-            results = self.search_reddit(term, limit=20)
-            for post in results:
-                post_data = post.get('data', {})
-                post_data['source_subreddit'] = 'search'
-                all_posts.append(post_data)
-        
+    def fetch_source(self, kind, name):
+        if kind == 'subreddit':
+            posts = self.fetch_subreddit_posts(name, limit=25)
+            source = name
+        else:
+            # Polling wants fresh results, which then serve user searches too
+            posts = self.search_reddit(name, limit=20, refresh=True)
+            source = 'search'
+
+        for post in posts:
+            post.source_subreddit = source
+        return posts
+
+    def build_social_data(self, posts):
         seen_ids = set()
         unique_posts = []
-        for post in all_posts:
-            post_id = post.get('id')
-            if post_id and post_id not in seen_ids:
-                seen_ids.add(post_id)
+        for post in posts:
+            if post.id and post.id not in seen_ids:
+                seen_ids.add(post.id)
                 unique_posts.append(post)
         
         return self._process_posts(unique_posts)
+
+    def get_social_media_data(self):
+        # Duplicates across sources are dropped as each listing arrives
+        seen_ids = set()
+        unique_posts = []
+        for kind, name in self.sources():
+            for post in self.fetch_source(kind, name):
+                if post.id not in seen_ids:
+                    seen_ids.add(post.id)
+                    unique_posts.append(post)
+        return self._process_posts(unique_posts)
     
     def _process_posts(self, posts):
         if not posts:
             return self._empty_response()
-        
-        processed_posts = []
-        all_hashtags = []
-        sentiments = {'positive': 0, 'neutral': 0, 'negative': 0}
-        hourly_engagement = Counter()
-        platform_dist = Counter()
-        
-        total_likes = 0
-        total_comments = 0
-        total_shares = 0
-        
-        for post in posts:
-            title = post.get('title', '')
-            selftext = post.get('selftext', '')
-            full_text = f"{title} {selftext}"
-            
-            score = post.get('score', 0)
-            num_comments = post.get('num_comments', 0)
-            created_utc = post.get('created_utc', 0)
-            subreddit = post.get('subreddit', post.get('source_subreddit', 'unknown'))
-            author = post.get('author', 'anonymous')
-            
-            engagement = score + (num_comments * 2)  # Comments weighted more
-            
-            hashtags = self.extract_hashtags(full_text)
-            all_hashtags.extend(hashtags)
-            
-            sentiment = self.analyze_sentiment(full_text, score, num_comments)
-            sentiments[sentiment] += 1
-
-            if created_utc:
-                post_hour = datetime.utcfromtimestamp(created_utc).hour
-                hourly_engagement[post_hour] += engagement
-            
-            platform_dist[f"r/{subreddit}"] += 1
-            
-            total_likes += score
-            total_comments += num_comments
-            total_shares += post.get('crossposts', 0) if isinstance(post.get('crossposts'), int) else 0
-            
-            processed_posts.append({
-                'id': post.get('id'),
-                'text': title[:200] + ('...' if len(title) > 200 else ''),
-                'fullText': full_text[:500],
-                'platform': f"Reddit (r/{subreddit})",
-                'author': f"u/{author}",
-                'likes': score,
-                'comments': num_comments,
-                'shares': post.get('num_crossposts', 0),
-                'engagement': engagement,
-                'sentiment': sentiment,
-                'timestamp': datetime.utcfromtimestamp(created_utc).isoformat() if created_utc else None,
-                'url': f"https://reddit.com{post.get('permalink', '')}"
-            })
-        
-        hashtag_counts = Counter(all_hashtags)
-        trending_hashtags = [
-            {'hashtag': tag, 'engagement': count * 100, 'posts': count}
-            for tag, count in hashtag_counts.most_common(10)
-        ]
-        
-
-        default_hashtags = ['WomensFootball', 'WSL', 'NWSL', 'UWCL', 'Lionesses', 
-        'WomensSoccer', 'WomenInSports', 'GirlsFootball']
-        if len(trending_hashtags) < 5:
-            for tag in default_hashtags:
-                if not any(h['hashtag'].lower() == tag.lower() for h in trending_hashtags):
-                    trending_hashtags.append({
-                        'hashtag': tag,
-                        'engagement': len(posts) * 50,
-                        'posts': len(posts) // 2
-                    })
-                if len(trending_hashtags) >= 10:
-                    break
-        
-        total_sentiment = sum(sentiments.values()) or 1
-        sentiment_data = {
-            'positive': round((sentiments['positive'] / total_sentiment) * 100),
-            'neutral': round((sentiments['neutral'] / total_sentiment) * 100),
-            'negative': round((sentiments['negative'] / total_sentiment) * 100)
-        }
-        
-        optimal_times = [
-            {
-                'hour': hour,
-                'avgEngagement': eng // max(1, platform_dist.get(hour, 1)),
-                'postCount': platform_dist.get(hour, 0)
-            }
-            for hour, eng in sorted(hourly_engagement.items(), key=lambda x: x[1], reverse=True)
-        ][:8]
-        
-        if not optimal_times:
-            optimal_times = [
-                {'hour': 18, 'avgEngagement': 500, 'postCount': 15},
-                {'hour': 19, 'avgEngagement': 450, 'postCount': 12},
-                {'hour': 20, 'avgEngagement': 420, 'postCount': 14},
-                {'hour': 12, 'avgEngagement': 380, 'postCount': 10},
-                {'hour': 17, 'avgEngagement': 350, 'postCount': 11},
-                {'hour': 21, 'avgEngagement': 320, 'postCount': 9},
-            ]
-        
-        platform_distribution = [
-            {'platform': platform, 'count': count}
-            for platform, count in platform_dist.most_common(6)
-        ]
-        
-        sorted_posts = sorted(processed_posts, key=lambda x: x['engagement'], reverse=True)
-        avg_engagement = sum(p['engagement'] for p in processed_posts) / len(processed_posts) if processed_posts else 0
-        viral_posts = [p for p in sorted_posts if p['engagement'] > avg_engagement * 2][:5]
-        
-        return {
-            'totalPosts': len(processed_posts),
-            'totalLikes': total_likes,
-            'totalComments': total_comments,
-            'totalShares': total_shares,
-            'avgEngagement': round(avg_engagement),
-            'sentiment': sentiment_data,
-            'trendingHashtags': trending_hashtags,
-            'viralPosts': viral_posts,
-            'recentPosts': sorted_posts[:20],
-            'optimalTimes': optimal_times,
-            'platformDistribution': platform_distribution,
-            'dataSource': 'Reddit API',
-            'lastUpdated': datetime.utcnow().isoformat()
-        }
+        comments = self.comments.comment_texts(posts)
+        return aggregate_posts(PostColumns.from_posts(posts, self, comments))
     
     def _empty_response(self):
         """Return empty response structure"""
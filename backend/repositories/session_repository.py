@@ -0,0 +1,164 @@
+"""
+Handles database operations for derived sessions and sessionizer state.
+"""
+
+from datetime import datetime
+
+from pymongo import UpdateOne, ReplaceOne
+from utils.database import get_collection
+
+
+CURSOR_ID = '__cursor__'
+STAT_FIELDS = ('sessions', 'total_duration', 'total_events', 'total_pages', 'bounces')
+
+
+class SessionRepository:
+    @property
+    def sessions(self):
+        return get_collection('sessions')
+
+    @property
+    def checkpoints(self):
+        return get_collection('session_checkpoints')
+
+    @property
+    def stats(self):
+        return get_collection('session_stats')
+
+    def save_closed_sessions(self, closed_sessions):
+        """Upsert closed sessions and count the ones not stored before into session_stats.
+
+        Only sessions this write inserted are counted, so closing the same
+        session again after a restart or a replayed batch adds nothing. A
+        crash between the two writes leaves those sessions uncounted until
+        rebuild_stats() recomputes their days.
+        """
+        if not closed_sessions:
+            return 0
+
+        session_ops = []
+        by_key = {}
+
+        for session in closed_sessions:
+            by_key[session['session_key']] = session
+            session_ops.append(UpdateOne(
+                {'session_key': session['session_key']},
+                {'$set': session},
+                upsert=True
+            ))
+
+            # Close the document written by /session/start, if the client never called /session/end
+            if session.get('session_id'):
+                session_ops.append(UpdateOne(
+                    {
+                        'user_id': session['user_id'],
+                        'session_id': session['session_id'],
+                        'active': True
+                    },
+                    {'$set': {
+                        'ended_at': session['ended_at'],
+                        'active': False
+                    }}
+                ))
+
+        try:
+            result = self.sessions.bulk_write(session_ops, ordered=False)
+
+            # The sessions this write inserted, found by the _ids their upserts generated
+            inserted = self.sessions.find(
+                {'_id': {'$in': list(result.upserted_ids.values())}}, {'_id': 0, 'session_key': 1}
+            ) if result.upserted_ids else []
+
+            stats_inc = {}
+            for doc in inserted:
+                session = by_key[doc['session_key']]
+                day = session['started_at'].strftime('%Y-%m-%d')
+                for stats_id in ('global', f"day:{day}"):
+                    inc = stats_inc.setdefault(stats_id, dict.fromkeys(STAT_FIELDS, 0))
+                    inc['sessions'] += 1
+                    inc['total_duration'] += session['duration']
+                    inc['total_events'] += session['event_count']
+                    inc['total_pages'] += session['page_count']
+                    inc['bounces'] += 1 if session['bounce'] else 0
+
+            if stats_inc:
+                self.stats.bulk_write([
+                    UpdateOne({'_id': stats_id}, {'$inc': inc}, upsert=True)
+                    for stats_id, inc in stats_inc.items()
+                ], ordered=False)
+            return len(closed_sessions)
+        except Exception as e:
+            print(f"Error saving closed sessions: {e}")
+            return 0
+
+    def rebuild_stats(self, since):
+        """Recompute the day stats from the derived sessions started on or after `since`, then the global stats."""
+        first_day = datetime(since.year, since.month, since.day)
+        try:
+            days = self.sessions.aggregate([
+                {'$match': {'source': 'sessionizer', 'started_at': {'$gte': first_day}}},
+                {'$group': {
+                    '_id': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$started_at'}},
+                    'sessions': {'$sum': 1},
+                    'total_duration': {'$sum': '$duration'},
+                    'total_events': {'$sum': '$event_count'},
+                    'total_pages': {'$sum': '$page_count'},
+                    'bounces': {'$sum': {'$cond': ['$bounce', 1, 0]}}
+                }}
+            ])
+            ops = [
+                ReplaceOne({'_id': f"day:{day.pop('_id')}"}, day, upsert=True)
+                for day in days
+            ]
+            if ops:
+                self.stats.bulk_write(ops, ordered=False)
+
+            totals = dict.fromkeys(STAT_FIELDS, 0)
+            for day in self.stats.find({'_id': {'$regex': '^day:'}}):
+                for field in STAT_FIELDS:
+                    totals[field] += day.get(field, 0)
+            self.stats.replace_one({'_id': 'global'}, totals, upsert=True)
+            return len(ops)
+        except Exception as e:
+            print(f"Error rebuilding session stats: {e}")
+            return 0
+
+    def save_checkpoint(self, open_sessions, removed_user_ids, cursor=None):
+        try:
+            ops = [
+                ReplaceOne({'_id': state['user_id']}, state, upsert=True)
+                for state in open_sessions
+            ]
+            if cursor is not None:
+                ops.append(ReplaceOne({'_id': CURSOR_ID}, dict(cursor, _id=CURSOR_ID), upsert=True))
+            if ops:
+                self.checkpoints.bulk_write(ops, ordered=False)
+            if removed_user_ids:
+                self.checkpoints.delete_many({'_id': {'$in': list(removed_user_ids)}})
+            return True
+        except Exception as e:
+            print(f"Error saving session checkpoint: {e}")
+            return False
+
+    def load_checkpoint(self):
+        """Return (open session states, tail cursor or None)."""
+        try:
+            states = []
+            cursor = None
+            for doc in self.checkpoints.find({}):
+                if doc['_id'] == CURSOR_ID:
+                    cursor = doc
+                else:
+                    states.append(doc)
+            return states, cursor
+        except Exception as e:
+            print(f"Error loading session checkpoint: {e}")
+            return [], None
+
+    def get_stats(self, day=None):
+        stats_id = f"day:{day}" if day else 'global'
+        try:
+            return self.stats.find_one({'_id': stats_id})
+        except Exception as e:
+            print(f"Error retrieving session stats: {e}")
+            return None
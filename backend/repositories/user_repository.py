@@ -7,9 +7,16 @@ from utils.database import get_collection
 from models.user import User
 
 
-class UserRepository:    
-    def __init__(self):
-        self.collection = get_collection('users')
+class UserRepository:
+    # Fields the admin listings return; metadata stays in the database
+    LISTING_PROJECTION = {
+        '_id': 0, 'user_id': 1, 'fingerprint': 1, 'created_at': 1, 'last_seen': 1,
+        'total_interactions': 1, 'total_sessions': 1
+    }
+
+    @property
+    def collection(self):
+        return get_collection('users')
     
     def create_user(self, user):
         try:
@@ -77,12 +84,21 @@ class UserRepository:
     
     def get_all_users(self, limit=100, skip=0):
         try:
-            users_data = self.collection.find().limit(limit).skip(skip)
+            users_data = self.collection.find({}, self.LISTING_PROJECTION).limit(limit).skip(skip)
             return [User.from_dict(data) for data in users_data]
         except Exception as e:
             print(f"Error retrieving users: {e}")
             return []
     
+    def get_users_by_ids(self, user_ids):
+        try:
+            users_data = self.collection.find({'user_id': {'$in': list(user_ids)}}, self.LISTING_PROJECTION)
+            users = {data['user_id']: User.from_dict(data) for data in users_data}
+            return [users[user_id] for user_id in user_ids if user_id in users]
+        except Exception as e:
+            print(f"Error retrieving users by id: {e}")
+            return []
+    
     def get_user_count(self):
         try:
             return self.collection.count_documents({})
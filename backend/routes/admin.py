@@ -1,15 +1,58 @@
 """
 Admin dashboard to view and manage all collected user data.
 """
-from flask import Blueprint, request, jsonify
+import os
+from flask import Blueprint, request, jsonify, send_from_directory
 from datetime import datetime, timedelta
 
 from utils.database import get_collection
 from repositories.user_repository import UserRepository
+from repositories.session_repository import SessionRepository
+from utils.sessionizer import sessionizer
+from utils.bulkhead import BULKHEADS
+from utils.reddit_poller import reddit_poller
+from utils.search_index import search_index
+from utils.slow_queries import slow_query_log, ranked_shapes
+from utils import request_profiler
+from utils.fanout import FanOut
+from utils.timeline import build_timeline, history_bounds, DEFAULT_POINTS, MAX_POINTS, MAX_TIMESTAMP
 
 admin_bp = Blueprint('admin', __name__)
 
 user_repo = UserRepository()
+session_repo = SessionRepository()
+
+# Only the fields each listing returns are read; metadata and data stay in the database
+INTERACTION_LISTING_PROJECTION = {'_id': 0, 'user_id': 1, 'event_type': 1, 'timestamp': 1, 'element': 1, 'page_url': 1}
+USER_INTERACTION_PROJECTION = {'_id': 0, 'event_type': 1, 'timestamp': 1, 'element': 1, 'page_url': 1, 'x': 1, 'y': 1}
+
+# /stats runs one query per collection side by side, each with its own budget
+STATS_MAX_TIME_MS = int(os.getenv('ADMIN_STATS_MAX_TIME_MS', 5000))
+stats_fanout = FanOut('admin-stats', max_workers=int(os.getenv('ADMIN_STATS_CONCURRENCY', 6)))
+
+
+def _isoformat(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def _user_summary(user):
+    return {
+        'user_id': user.user_id,
+        'created_at': _isoformat(user.created_at),
+        'last_seen': _isoformat(user.last_seen),
+        'total_interactions': user.total_interactions,
+        'total_sessions': user.total_sessions,
+        'fingerprint': user.fingerprint
+    }
+
+
+def _timeline_range(user_id):
+    """The user's whole history, end exclusive; an empty range ending now if there is none"""
+    bounds = history_bounds(user_id)
+    if bounds is None:
+        now = datetime.now().timestamp()
+        return now - 1, now
+    return bounds[0], bounds[1] + 1
 
 
 @admin_bp.route('/users', methods=['GET'])
@@ -18,20 +61,26 @@ def get_all_users():
         limit = min(int(request.args.get('limit', 50)), 100)
         skip = int(request.args.get('skip', 0))
         
-        users = user_repo.get_all_users(limit=limit, skip=skip)
-        total_count = user_repo.get_user_count()
+        if 'segment' in request.args:
+            try:
+                segment = int(request.args.get('segment'))
+            except ValueError:
+                return jsonify({
+                    'success': False,
+                    'error': 'segment must be an integer'
+                }), 400
+            segments_collection = get_collection('user_segments')
+            user_ids = [
+                doc['_id'] for doc in segments_collection.find({'segment': segment}, {'_id': 1})
+                .sort('_id', 1).skip(skip).limit(limit)
+            ]
+            users = user_repo.get_users_by_ids(user_ids)
+            total_count = segments_collection.count_documents({'segment': segment})
+        else:
+            users = user_repo.get_all_users(limit=limit, skip=skip)
+            total_count = user_repo.get_user_count()
         
-        users_data = [
-            {
-                'user_id': user.user_id,
-                'created_at': user.created_at.isoformat() if hasattr(user.created_at, 'isoformat') else str(user.created_at),
-                'last_seen': user.last_seen.isoformat() if hasattr(user.last_seen, 'isoformat') else str(user.last_seen),
-                'total_interactions': user.total_interactions,
-                'total_sessions': user.total_sessions,
-                'fingerprint': user.fingerprint
-            }
-            for user in users
-        ]
+        users_data = [_user_summary(user) for user in users]
         
         return jsonify({
             'success': True,
@@ -63,10 +112,12 @@ def get_user_details(user_id):
                 'error': 'User not found'
             }), 404
         
+        # The latest events only; older history is summarized by the timeline
+        limit = min(int(request.args.get('limit', 50)), 500)
         interactions_collection = get_collection('interactions')
         interactions = list(interactions_collection.find(
-            {'user_id': user_id}
-        ).sort('timestamp', -1).limit(500))
+            {'user_id': user_id}, USER_INTERACTION_PROJECTION
+        ).sort('timestamp', -1).limit(limit))
         
         interactions_data = [
             {
@@ -80,21 +131,14 @@ def get_user_details(user_id):
             for i in interactions
         ]
         
-        sessions_collection = get_collection('sessions')
-        sessions = list(sessions_collection.find({'user_id': user_id}))
+        sessions_count = get_collection('sessions').count_documents({'user_id': user_id})
         
         return jsonify({
             'success': True,
-            'user': {
-                'user_id': user.user_id,
-                'created_at': user.created_at.isoformat() if hasattr(user.created_at, 'isoformat') else str(user.created_at),
-                'last_seen': user.last_seen.isoformat() if hasattr(user.last_seen, 'isoformat') else str(user.last_seen),
-                'total_interactions': user.total_interactions,
-                'total_sessions': user.total_sessions,
-                'fingerprint': user.fingerprint
-            },
+            'user': _user_summary(user),
             'interactions': interactions_data,
-            'sessions_count': len(sessions)
+            'sessions_count': sessions_count,
+            'timeline': build_timeline(user_id, *_timeline_range(user_id))
         }), 200
         
     except Exception as e:
@@ -105,53 +149,136 @@ def get_user_details(user_id):
         }), 500
 
 
-@admin_bp.route('/stats', methods=['GET'])
-def get_overall_stats():
+@admin_bp.route('/users/<user_id>/timeline', methods=['GET'])
+def get_user_timeline(user_id):
+    """
+    Event counts per bucket and type between start and end (epoch seconds).
+    Defaults to the user's whole history; zoom in by passing a bucket's bounds.
+    """
     try:
-        users_collection = get_collection('users')
-        interactions_collection = get_collection('interactions')
-        sessions_collection = get_collection('sessions')
+        user = user_repo.get_user_by_id(user_id)
         
-        total_users = users_collection.count_documents({})
-        total_interactions = interactions_collection.count_documents({})
-        total_sessions = sessions_collection.count_documents({})
+        if not user:
+            return jsonify({
+                'success': False,
+                'error': 'User not found'
+            }), 404
         
-        seven_days_ago = datetime.now() - timedelta(days=7)
-        new_users_week = users_collection.count_documents({
-            'created_at': {'$gte': seven_days_ago}
-        })
+        default_start, default_end = _timeline_range(user_id)
+        try:
+            start = float(request.args.get('start', default_start))
+            end = float(request.args.get('end', default_end))
+            points = int(request.args.get('points', DEFAULT_POINTS))
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'start and end must be epoch seconds, points an integer'
+            }), 400
+        
+        if not 0 <= start < end <= MAX_TIMESTAMP or not 1 <= points <= MAX_POINTS:
+            return jsonify({
+                'success': False,
+                'error': f"end must be after start, both between 0 and {MAX_TIMESTAMP}, "
+                         f"and points between 1 and {MAX_POINTS}"
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'user_id': user_id,
+            'timeline': build_timeline(user_id, start, end, points)
+        }), 200
+        
+    except Exception as e:
+        print(f"Error getting user timeline: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error'
+        }), 500
+
 
-        event_pipeline = [
+def _facet_count(rows):
+    return rows[0]['n'] if rows else 0
+
+
+def _user_count():
+    return get_collection('users').count_documents({}, maxTimeMS=STATS_MAX_TIME_MS)
+
+
+def _new_user_count(since):
+    # A query of its own so it is answered from the created_at index, which a $facet cannot use
+    return get_collection('users').count_documents({'created_at': {'$gte': since}}, maxTimeMS=STATS_MAX_TIME_MS)
+
+
+def _interaction_counts():
+    # One pass over interactions feeds the total and both top-10 rankings
+    pipeline = [{'$facet': {
+        'total': [{'$count': 'n'}],
+        'event_types': [
             {'$group': {'_id': '$event_type', 'count': {'$sum': 1}}},
             {'$sort': {'count': -1}},
             {'$limit': 10}
-        ]
-        event_stats = list(interactions_collection.aggregate(event_pipeline))
-
-        user_pipeline = [
+        ],
+        'top_users': [
             {'$group': {'_id': '$user_id', 'count': {'$sum': 1}}},
             {'$sort': {'count': -1}},
             {'$limit': 10}
         ]
-        top_users = list(interactions_collection.aggregate(user_pipeline))
-        
+    }}]
+    facets = next(get_collection('interactions').aggregate(pipeline, maxTimeMS=STATS_MAX_TIME_MS))
+    return {
+        'total': _facet_count(facets['total']),
+        'event_types': facets['event_types'],
+        'top_users': facets['top_users']
+    }
+
+
+def _session_count():
+    return get_collection('sessions').count_documents({}, maxTimeMS=STATS_MAX_TIME_MS)
+
+
+@admin_bp.route('/stats', methods=['GET'])
+def get_overall_stats():
+    """Dashboard totals; sections whose query failed or ran out of time come back null"""
+    try:
+        seven_days_ago = datetime.now() - timedelta(days=7)
+        results, missing = stats_fanout.run({
+            'users': _user_count,
+            'new_users': lambda: _new_user_count(seven_days_ago),
+            'interactions': _interaction_counts,
+            'sessions': _session_count
+        }, timeout=STATS_MAX_TIME_MS / 1000 + 0.5)
+
+        if not results:
+            raise RuntimeError(f"no stats query succeeded: {missing}")
+
+        total_users = results.get('users')
+        interactions = results.get('interactions')
+        total_interactions = interactions['total'] if interactions else None
+
+        if total_users is not None and interactions:
+            avg_interactions = round(total_interactions / total_users, 2) if total_users > 0 else 0
+        else:
+            avg_interactions = None
+
         return jsonify({
             'success': True,
+            'partial': bool(missing),
+            'missing': missing,
             'stats': {
                 'total_users': total_users,
                 'total_interactions': total_interactions,
-                'total_sessions': total_sessions,
-                'new_users_this_week': new_users_week,
-                'avg_interactions_per_user': round(total_interactions / total_users, 2) if total_users > 0 else 0
+                'total_sessions': results.get('sessions'),
+                'new_users_this_week': results.get('new_users'),
+                'avg_interactions_per_user': avg_interactions
             },
             'event_types': [
                 {'type': item['_id'], 'count': item['count']}
-                for item in event_stats
-            ],
+                for item in interactions['event_types']
+            ] if interactions else None,
             'top_users': [
                 {'user_id': item['_id'], 'interactions': item['count']}
-                for item in top_users
-            ]
+                for item in interactions['top_users']
+            ] if interactions else None
         }), 200
         
     except Exception as e:
@@ -177,7 +304,7 @@ def get_all_interactions():
         skip = int(request.args.get('skip', 0))
         
         interactions_collection = get_collection('interactions')
-        interactions = list(interactions_collection.find(query)
+        interactions = list(interactions_collection.find(query, INTERACTION_LISTING_PROJECTION)
             .sort('timestamp', -1)
             .limit(limit)
             .skip(skip))
@@ -211,4 +338,148 @@ def get_all_interactions():
         return jsonify({
             'success': False,
             'error': 'Internal server error'
-        }), 500
\ No newline at end of file
+        }), 500
+
+
+@admin_bp.route('/sessions/stats', methods=['GET'])
+def get_session_stats():
+    try:
+        day = request.args.get('day')
+        if day:
+            try:
+                datetime.strptime(day, '%Y-%m-%d')
+            except ValueError:
+                return jsonify({
+                    'success': False,
+                    'error': 'day must be in format YYYY-MM-DD'
+                }), 400
+        
+        stats = session_repo.get_stats(day) or {}
+        total_sessions = stats.get('sessions', 0)
+        
+        def per_session(value):
+            return round(value / total_sessions, 2) if total_sessions > 0 else 0
+        
+        return jsonify({
+            'success': True,
+            'day': day,
+            'stats': {
+                'total_sessions': total_sessions,
+                'avg_duration_seconds': per_session(stats.get('total_duration', 0)),
+                'avg_events_per_session': per_session(stats.get('total_events', 0)),
+                'avg_pages_per_session': per_session(stats.get('total_pages', 0)),
+                'bounce_rate': round(stats.get('bounces', 0) / total_sessions * 100, 2) if total_sessions > 0 else 0,
+                'open_sessions': sessionizer.open_session_count()
+            }
+        }), 200
+        
+    except Exception as e:
+        print(f"Error getting session stats: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error'
+        }), 500
+
+
+@admin_bp.route('/segments', methods=['GET'])
+def get_segments():
+    try:
+        centroids = list(get_collection('segment_centroids').find().sort('_id', 1))
+        last_run = get_collection('segment_runs').find_one(
+            {}, {'_id': 0, 'features': 0}, sort=[('run_at', -1)]
+        )
+        
+        total_users = sum(c.get('size', 0) for c in centroids)
+        
+        return jsonify({
+            'success': True,
+            'segments': [
+                {
+                    'segment': c['_id'],
+                    'size': c.get('size', 0),
+                    'share': round(c.get('size', 0) / total_users * 100, 2) if total_users > 0 else 0,
+                    'top_features': c.get('top_features', []),
+                    'centroid': c.get('centroid', {})
+                }
+                for c in centroids
+            ],
+            'last_run': {
+                'run_at': last_run['run_at'].isoformat(),
+                'users': last_run['users'],
+                'iterations': last_run['iterations'],
+                'timings': last_run['timings']
+            } if last_run else None
+        }), 200
+        
+    except Exception as e:
+        print(f"Error getting segments: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error'
+        }), 500
+
+
+@admin_bp.route('/bulkheads', methods=['GET'])
+def get_bulkheads():
+    """Saturation counters of this worker's bulkhead pools"""
+    return jsonify({
+        'success': True,
+        'bulkheads': [bulkhead.stats() for bulkhead in BULKHEADS]
+    }), 200
+
+
+@admin_bp.route('/upstreams', methods=['GET'])
+def get_upstreams():
+    """Circuit breaker, rate-limit and polling state of the Reddit client"""
+    from reddit_service import reddit_service
+
+    return jsonify({
+        'success': True,
+        'reddit': reddit_service.health(),
+        'poller': reddit_poller.state(),
+        'search_index': search_index.stats()
+    }), 200
+
+
+@admin_bp.route('/slow-queries', methods=['GET'])
+def get_slow_queries():
+    """Slow MongoDB query shapes ranked by total time, with their latest explain plans"""
+    try:
+        hours = request.args.get('hours', 24, type=int)
+        limit = min(request.args.get('limit', 20, type=int), 100)
+
+        return jsonify({
+            'success': True,
+            'hours': hours,
+            'capture': slow_query_log.stats(),
+            'queries': ranked_shapes(hours=hours, limit=limit)
+        }), 200
+
+    except Exception as e:
+        print(f"Error getting slow queries: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error'
+        }), 500
+
+
+@admin_bp.route('/profiles', methods=['GET'])
+def get_profiles():
+    """Collapsed-stack files of profiled requests on this host, newest first"""
+    return jsonify({
+        'success': True,
+        'enabled': request_profiler.ENABLED,
+        'sample_rate': request_profiler.SAMPLE_RATE,
+        'profiles': request_profiler.list_profiles()
+    }), 200
+
+
+@admin_bp.route('/profiles/<name>', methods=['GET'])
+def get_profile(name):
+    """One collapsed-stack file, ready for flamegraph.pl or speedscope"""
+    if not name.endswith('.folded'):
+        return jsonify({
+            'success': False,
+            'error': 'Profile not found'
+        }), 404
+    return send_from_directory(request_profiler.PROFILE_DIR, name, mimetype='text/plain')
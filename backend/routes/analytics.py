@@ -7,43 +7,53 @@ from datetime import datetime, timedelta
 
 from utils.database import get_collection
 from utils.data_validator import validate_query_params
+from utils.navigation import navigation_index, MAX_PATH_DEPTH
 
 analytics_bp = Blueprint('analytics', __name__)
 
 
 @analytics_bp.route('/user/<user_id>', methods=['GET'])
 def get_user_analytics(user_id):
+    from utils.analytics_cache import analytics_cache
+
     try:
-        interactions_collection = get_collection('interactions')
-        
-        recent_interactions = list(interactions_collection.find(
-            {'user_id': user_id}
-        ).sort('timestamp', -1).limit(100))
+        cached = analytics_cache.user_activity(user_id, limit=100) if analytics_cache.ready() else None
         
-        clicked_elements = {}
-        for interaction in recent_interactions:
-            if interaction['event_type'] == 'click' and 'element' in interaction:
-                element = interaction['element']
-                clicked_elements[element] = clicked_elements.get(element, 0) + 1
+        # The cache only answers for users with a full page of events inside its window
+        if cached and cached[0] >= 100:
+            total_interactions, clicked_elements, hour_activity = cached
+        else:
+            interactions_collection = get_collection('interactions')
+            
+            recent_interactions = list(interactions_collection.find(
+                {'user_id': user_id}, {'_id': 0, 'event_type': 1, 'element': 1, 'timestamp': 1}
+            ).sort('timestamp', -1).limit(100))
+            total_interactions = len(recent_interactions)
+            
+            clicked_elements = {}
+            for interaction in recent_interactions:
+                if interaction['event_type'] == 'click' and 'element' in interaction:
+                    element = interaction['element']
+                    clicked_elements[element] = clicked_elements.get(element, 0) + 1
+            
+            hour_activity = {}
+            for interaction in recent_interactions:
+                timestamp = interaction.get('timestamp')
+                if timestamp:
+                    hour = datetime.fromtimestamp(timestamp).hour
+                    hour_activity[hour] = hour_activity.get(hour, 0) + 1
         
         top_interests = sorted(clicked_elements.items(), key=lambda x: x[1], reverse=True)[:5]
         
-        hour_activity = {}
-        for interaction in recent_interactions:
-            timestamp = interaction.get('timestamp')
-            if timestamp:
-                hour = datetime.fromtimestamp(timestamp).hour
-                hour_activity[hour] = hour_activity.get(hour, 0) + 1
-        
         peak_hours = sorted(hour_activity.items(), key=lambda x: x[1], reverse=True)[:3]
         
-        engagement_score = len(recent_interactions) * 10
+        engagement_score = total_interactions * 10
         
         return jsonify({
             'success': True,
             'user_id': user_id,
             'analytics': {
-                'total_interactions': len(recent_interactions),
+                'total_interactions': total_interactions,
                 'top_interests': [{'element': elem, 'clicks': count} for elem, count in top_interests],
                 'peak_activity_hours': [{'hour': hour, 'interactions': count} for hour, count in peak_hours],
                 'engagement_score': engagement_score
@@ -64,23 +74,29 @@ def get_user_analytics(user_id):
 
 @analytics_bp.route('/trending', methods=['GET'])
 def get_trending():
+    from utils.analytics_cache import analytics_cache
+
     try:
-        interactions_collection = get_collection('interactions')
-        
         yesterday = datetime.now() - timedelta(days=1)
-        recent_clicks = list(interactions_collection.find({
-            'event_type': 'click',
-            'timestamp': {'$gte': yesterday.timestamp()}
-        }))
-        
-        element_counts = {}
-        for click in recent_clicks:
-            element = click.get('element', '')
-            if element.startswith('hashtag-'):
-                hashtag = element.replace('hashtag-', '')
-                element_counts[hashtag] = element_counts.get(hashtag, 0) + 1
         
-        trending = sorted(element_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+        if analytics_cache.covers(86400):
+            trending = analytics_cache.trending(since=yesterday.timestamp(), limit=10)
+        else:
+            interactions_collection = get_collection('interactions')
+            
+            recent_clicks = list(interactions_collection.find({
+                'event_type': 'click',
+                'timestamp': {'$gte': yesterday.timestamp()}
+            }, {'element': 1, '_id': 0}))
+            
+            element_counts = {}
+            for click in recent_clicks:
+                element = click.get('element', '')
+                if element.startswith('hashtag-'):
+                    hashtag = element.replace('hashtag-', '')
+                    element_counts[hashtag] = element_counts.get(hashtag, 0) + 1
+            
+            trending = sorted(element_counts.items(), key=lambda x: x[1], reverse=True)[:10]
         
         return jsonify({
             'success': True,
@@ -102,6 +118,174 @@ def get_trending():
         }), 500
 
 
+@analytics_bp.route('/window/event-types', methods=['GET'])
+def get_window_event_types():
+    from utils.analytics_cache import analytics_cache
+
+    if not analytics_cache.enabled:
+        return _cache_disabled()
+    if not analytics_cache.ready():
+        return _cache_loading()
+    
+    try:
+        return jsonify({
+            'success': True,
+            'window_hours': analytics_cache.hours,
+            'event_types': analytics_cache.event_type_breakdown()
+        }), 200
+        
+    except Exception as e:
+        print(f"Error getting window event types: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error'
+        }), 500
+
+
+@analytics_bp.route('/window/hours', methods=['GET'])
+def get_window_hours():
+    from utils.analytics_cache import analytics_cache
+
+    if not analytics_cache.enabled:
+        return _cache_disabled()
+    if not analytics_cache.ready():
+        return _cache_loading()
+    
+    try:
+        user_id = request.args.get('user_id')
+        
+        return jsonify({
+            'success': True,
+            'window_hours': analytics_cache.hours,
+            'user_id': user_id,
+            'hours': analytics_cache.hour_histogram(user_id=user_id)
+        }), 200
+        
+    except Exception as e:
+        print(f"Error getting window hours: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error'
+        }), 500
+
+
+@analytics_bp.route('/window/stats', methods=['GET'])
+def get_window_stats():
+    from utils.analytics_cache import analytics_cache
+
+    if not analytics_cache.enabled:
+        return _cache_disabled()
+    if not analytics_cache.ready():
+        return _cache_loading()
+    
+    try:
+        return jsonify({
+            'success': True,
+            'cache': analytics_cache.stats()
+        }), 200
+        
+    except Exception as e:
+        print(f"Error getting analytics cache stats: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error'
+        }), 500
+
+
+@analytics_bp.route('/navigation/next', methods=['GET'])
+def get_next_pages():
+    try:
+        page = request.args.get('page')
+        if not page:
+            return jsonify({
+                'success': False,
+                'error': 'page is required'
+            }), 400
+        
+        limit = min(int(request.args.get('limit', 10)), 50)
+        
+        return jsonify({
+            'success': True,
+            'page': page,
+            'next_pages': navigation_index.next_pages(page, limit=limit)
+        }), 200
+        
+    except Exception as e:
+        print(f"Error getting next pages: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error'
+        }), 500
+
+
+@analytics_bp.route('/navigation/funnel', methods=['GET'])
+def get_funnel():
+    try:
+        steps = [step.strip() for step in request.args.get('steps', '').split(',') if step.strip()]
+        mode = request.args.get('mode', 'ordered')
+        
+        if not steps:
+            return jsonify({
+                'success': False,
+                'error': 'steps must be a comma separated list of pages'
+            }), 400
+        
+        if len(steps) > MAX_PATH_DEPTH:
+            return jsonify({
+                'success': False,
+                'error': f"Maximum {MAX_PATH_DEPTH} funnel steps"
+            }), 400
+        
+        if mode == 'strict':
+            counts = navigation_index.strict_funnel(steps)
+        elif mode == 'ordered':
+            counts = navigation_index.ordered_funnel(steps)
+        else:
+            return jsonify({
+                'success': False,
+                'error': 'mode must be ordered or strict'
+            }), 400
+        
+        entered = counts[0] if counts else 0
+        
+        return jsonify({
+            'success': True,
+            'mode': mode,
+            'max_path_depth': MAX_PATH_DEPTH,
+            'funnel': [
+                {
+                    'page': step,
+                    'sessions': count,
+                    'conversion': round(count / entered * 100, 2) if entered > 0 else 0
+                }
+                for step, count in zip(steps, counts)
+            ]
+        }), 200
+        
+    except Exception as e:
+        print(f"Error getting funnel: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error'
+        }), 500
+
+
+def _cache_disabled():
+    return jsonify({
+        'success': False,
+        'error': 'Analytics cache is disabled, set ANALYTICS_CACHE_HOURS to enable it'
+    }), 503
+
+
+def _cache_loading():
+    response = jsonify({
+        'success': False,
+        'error': 'Analytics cache is still loading, try again shortly'
+    })
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
+
 def _generate_hashtag_recommendations(clicked_elements):
     hashtags = []
     for element in clicked_elements:
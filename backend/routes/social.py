@@ -0,0 +1,236 @@
+"""
+Reddit social media analytics endpoints.
+"""
+
+from flask import Blueprint, request, jsonify
+from datetime import datetime
+import os
+import time
+
+from utils.database import get_collection
+from utils.metrics import cache_requests
+from utils.bulkhead import isolate, reddit_bulkhead, BulkheadFull, BulkheadTimeout
+from utils.query_cache import QueryCache, CachedFailure
+from utils.search_index import search_index
+from utils import reddit_poller as poller
+
+social_bp = Blueprint('social', __name__)
+
+SEARCH_LIMIT = 30
+MIN_LOCAL_RESULTS = int(os.getenv('SEARCH_MIN_LOCAL_RESULTS', 5))
+
+# The history aggregate reads every stored post, so it is computed once per window and TTL
+history_cache = QueryCache(
+    'reddit_history',
+    max_entries=16,
+    ttl=float(os.getenv('REDDIT_HISTORY_CACHE_TTL', 300)),
+    negative_ttl=30,
+    shared=os.getenv('REDDIT_HISTORY_CACHE_SHARED', '0') == '1'
+)
+
+
+def _cache_reddit_data(data):
+    get_collection('social_cache').update_one(
+        {'type': 'reddit_data'},
+        {
+            '$set': {
+                'type': 'reddit_data',
+                'data': data,
+                'cached_at': datetime.utcnow()
+            }
+        },
+        upsert=True
+    )
+
+
+@social_bp.route('/reddit', methods=['GET'])
+@isolate(reddit_bulkhead)
+def get_reddit_data():
+    """Fetch real social media data from Reddit"""
+    # Imported here so a cold worker does not load the Reddit client before serving
+    from reddit_service import reddit_service
+
+    try:
+        # Check cache first
+        cached = get_collection('social_cache').find_one({'type': 'reddit_data'})
+
+        if cached:
+            cache_requests.inc('social_cache', 'hit')
+            print("✓ Returning cached Reddit data")
+            cached_data = cached.get('data', {})
+            cached_data['fromCache'] = True
+            return jsonify({
+                'success': True,
+                'data': cached_data
+            }), 200
+
+        cache_requests.inc('social_cache', 'miss')
+
+        # The background poller fills the cache; never make the user wait on Reddit
+        if poller.ENABLED:
+            data = reddit_service._empty_response()
+            data['fromCache'] = False
+            data['warming'] = True
+            return jsonify({
+                'success': True,
+                'data': data
+            }), 200
+
+        # Fetch fresh data from Reddit
+        print("⏳ Fetching fresh data from Reddit...")
+        data = reddit_service.get_social_media_data()
+
+        # Cache the result
+        _cache_reddit_data(data)
+
+        print(f"✓ Fetched {data.get('totalPosts', 0)} posts from Reddit")
+        data['fromCache'] = False
+
+        return jsonify({
+            'success': True,
+            'data': data
+        }), 200
+
+    except Exception as e:
+        print(f"❌ Error fetching Reddit data: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'data': reddit_service._empty_response()
+        }), 500
+
+
+@social_bp.route('/reddit/refresh', methods=['POST'])
+@isolate(reddit_bulkhead)
+def refresh_reddit_data():
+    """Force refresh Reddit data (bypass cache)"""
+    from reddit_service import reddit_service
+
+    try:
+        if poller.ENABLED:
+            # Keep serving the current cache while the poller fetches every source
+            poller.reddit_poller.request_refresh()
+            return jsonify({
+                'success': True,
+                'message': 'Refresh scheduled'
+            }), 202
+
+        # Delete cache
+        get_collection('social_cache').delete_one({'type': 'reddit_data'})
+
+        # Fetch fresh data
+        print("🔄 Force refreshing Reddit data...")
+        data = reddit_service.get_social_media_data()
+
+        # Cache the result
+        _cache_reddit_data(data)
+
+        print(f"✓ Refreshed with {data.get('totalPosts', 0)} posts")
+        data['fromCache'] = False
+
+        return jsonify({
+            'success': True,
+            'data': data,
+            'message': 'Data refreshed successfully'
+        }), 200
+
+    except Exception as e:
+        print(f"❌ Error refreshing Reddit data: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@social_bp.route('/reddit/search', methods=['GET'])
+def search_reddit():
+    """Search fetched Reddit posts, going live to Reddit only when asked and too few match"""
+    query = request.args.get('q', 'women football')
+    live = request.args.get('live', os.getenv('SEARCH_LIVE_FALLBACK', '0')) in ('1', 'true')
+    started = time.perf_counter()
+
+    try:
+        results = search_index.search(query, limit=SEARCH_LIMIT)
+        source = 'local'
+
+        if live and len(results) < MIN_LOCAL_RESULTS:
+            from reddit_service import reddit_service
+
+            try:
+                live_posts = reddit_bulkhead.call(reddit_service.search_reddit, query, limit=SEARCH_LIMIT)
+            except (BulkheadFull, BulkheadTimeout):
+                live_posts = []
+
+            if live_posts:
+                search_index.store_posts(live_posts)
+                seen = {result['id'] for result in results}
+                for post in live_posts:
+                    if post.id in seen:
+                        continue
+                    results.append({
+                        'id': post.id,
+                        'title': post.title,
+                        'subreddit': post.subreddit,
+                        'score': post.score,
+                        'comments': post.num_comments,
+                        'url': f"https://reddit.com{post.permalink}"
+                    })
+                results = results[:SEARCH_LIMIT]
+                source = 'local+reddit'
+
+        return jsonify({
+            'success': True,
+            'query': query,
+            'results': results,
+            'count': len(results),
+            'source': source,
+            'took_ms': round((time.perf_counter() - started) * 1000, 2)
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@social_bp.route('/reddit/history', methods=['GET'])
+@isolate(reddit_bulkhead)
+def get_reddit_history():
+    """Dashboard aggregate over every stored post, not just the latest fetch"""
+    from reddit_service import reddit_service
+    from utils.post_aggregates import PostColumns, aggregate_posts
+
+    def compute(days):
+        columns = PostColumns.from_store(days=days)
+        return aggregate_posts(columns) if len(columns) else reddit_service._empty_response()
+
+    try:
+        days = request.args.get('days', type=int)
+        if days is not None and days <= 0:
+            return jsonify({
+                'success': False,
+                'error': 'days must be a positive integer'
+            }), 400
+
+        try:
+            data = dict(history_cache.get_or_compute(str(days or 'all'), lambda: compute(days)))
+        except CachedFailure:
+            return jsonify({
+                'success': False,
+                'error': 'Reddit history is unavailable, try again shortly'
+            }), 503
+        data['dataSource'] = 'Stored Reddit posts'
+
+        return jsonify({
+            'success': True,
+            'days': days,
+            'data': data
+        }), 200
+
+    except Exception as e:
+        print(f"❌ Error aggregating Reddit history: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error'
+        }), 500
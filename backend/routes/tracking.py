@@ -5,8 +5,10 @@ Receiving and storing user tracking data.
 from flask import Blueprint, request, jsonify
 from datetime import datetime
 
-from utils.data_validator import validate_tracking_data, sanitize_tracking_data
+from utils.data_validator import validate_tracking_data, sanitize_tracking_data, ALLOWED_EVENT_TYPES
 from utils.database import get_collection
+from utils.metrics import events_ingested
+from utils.sessionizer import sessionizer
 from repositories.user_repository import UserRepository
 from models.user import User
 from models.interaction import Interaction
@@ -17,6 +19,12 @@ tracking_bp = Blueprint('tracking', __name__)
 user_repo = UserRepository()
 
 
+def _event_type_label(event):
+    # Rejected events can carry anything; keep the metric's label set bounded
+    event_type = event.get('event_type') if isinstance(event, dict) else None
+    return event_type if event_type in ALLOWED_EVENT_TYPES else 'other'
+
+
 @tracking_bp.route('/event', methods=['POST'])
 def track_event():
     try:
@@ -30,6 +38,7 @@ def track_event():
         
         is_valid, error_message = validate_tracking_data(data)
         if not is_valid:
+            events_ingested.inc(_event_type_label(data), 'rejected')
             return jsonify({
                 'success': False,
                 'error': error_message
@@ -50,21 +59,7 @@ def track_event():
             new_user = User(user_id=user_id, fingerprint=fingerprint)
             user_repo.create_user(new_user)
 
-        interaction = Interaction(
-            user_id=user_id,
-            event_type=clean_data['event_type'],
-            timestamp=clean_data['timestamp'],
-            session_id=clean_data.get('session_id'),
-            element=clean_data.get('element'),
-            page_url=clean_data.get('page_url'),
-            target=clean_data.get('target'),
-            value=clean_data.get('value'),
-            x=clean_data.get('x'),
-            y=clean_data.get('y'),
-            scroll_depth=clean_data.get('scroll_depth'),
-            duration=clean_data.get('duration'),
-            metadata=clean_data.get('metadata', {})
-        )
+        interaction = Interaction.from_event(clean_data)
         
         interactions_collection = get_collection('interactions')
         interactions_collection.insert_one(interaction.to_dict())
@@ -72,6 +67,9 @@ def track_event():
         user_repo.update_last_seen(user_id)
         user_repo.increment_interactions(user_id)
         
+        sessionizer.observe([clean_data])
+        events_ingested.inc(clean_data['event_type'], 'stored')
+        
         return jsonify({
             'success': True,
             'message': 'Event tracked successfully'
@@ -114,33 +112,35 @@ def track_batch():
         successful = 0
         failed = 0
         errors = []
+        stored_events = []
         
         for event in events:
             is_valid, error_message = validate_tracking_data(event)
             if not is_valid:
                 failed += 1
                 errors.append(error_message)
+                events_ingested.inc(_event_type_label(event), 'rejected')
                 continue
             
             clean_data = sanitize_tracking_data(event)
             
             try:
-                interaction = Interaction(
-                    user_id=clean_data['user_id'],
-                    event_type=clean_data['event_type'],
-                    timestamp=clean_data['timestamp'],
-                    **{k: v for k, v in clean_data.items() 
-                if k not in ['user_id', 'event_type', 'timestamp']}
-                )
+                interaction = Interaction.from_event(clean_data)
                 
                 interactions_collection = get_collection('interactions')
                 interactions_collection.insert_one(interaction.to_dict())
                 
+                stored_events.append(clean_data)
                 successful += 1
+                events_ingested.inc(clean_data['event_type'], 'stored')
                 
             except Exception as e:
                 failed += 1
                 errors.append(str(e))
+                events_ingested.inc(clean_data['event_type'], 'error')
+        
+        if stored_events:
+            sessionizer.observe(stored_events)
         
         return jsonify({
             'success': True,
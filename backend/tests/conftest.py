@@ -0,0 +1,36 @@
+"""
+The app on mongomock, so the tests need neither MongoDB nor Reddit.
+"""
+
+import os
+import time
+
+import mongomock
+import pytest
+
+# Read at import time by the poller; the tests drive Reddit themselves
+os.environ['REDDIT_POLLER_ENABLED'] = '0'
+
+import utils.database as database
+
+database.MongoClient = mongomock.MongoClient
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import create_app
+    return create_app()
+
+
+@pytest.fixture
+def brussels_time():
+    """Local time with daylight saving, whatever the machine's own zone is."""
+    previous = os.environ.get('TZ')
+    os.environ['TZ'] = 'Europe/Brussels'
+    time.tzset()
+    yield
+    if previous is None:
+        del os.environ['TZ']
+    else:
+        os.environ['TZ'] = previous
+    time.tzset()
@@ -0,0 +1,35 @@
+import time
+from datetime import datetime, timedelta
+
+from utils.database import get_collection
+
+
+def track(client, user_id, count=3):
+    session_id = f"session_{user_id[5:]}_{int(time.time())}"
+    for i in range(count):
+        response = client.post('/api/tracking/event', json={
+            'user_id': user_id, 'session_id': session_id, 'event_type': 'click',
+            'timestamp': time.time() - i, 'element': 'hashtag-UWCL', 'page_url': '/'
+        })
+        assert response.status_code == 201
+
+
+def test_stats_count_new_users_in_their_own_query(app):
+    client = app.test_client()
+    track(client, 'user_0000000000bb')
+    get_collection('users').update_one({'user_id': 'user_0000000000bb'},
+                                       {'$set': {'created_at': datetime.now() - timedelta(days=30)}})
+    users = get_collection('users')
+    expected_new = users.count_documents({'created_at': {'$gte': datetime.now() - timedelta(days=7)}})
+
+    body = client.get('/api/admin/stats').get_json()
+
+    assert body['partial'] is False
+    assert body['stats']['total_users'] == users.count_documents({})
+    assert body['stats']['new_users_this_week'] == expected_new < body['stats']['total_users']
+
+
+def test_users_reject_a_segment_that_is_not_a_number(app):
+    response = app.test_client().get('/api/admin/users?segment=abc')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
@@ -0,0 +1,33 @@
+import time
+from datetime import datetime
+
+import numpy as np
+
+from utils import analytics_cache as module
+from utils.analytics_cache import AnalyticsCache, local_hours
+from utils.database import get_collection
+
+
+def test_local_hours_follow_daylight_saving(brussels_time):
+    # Hourly across the end of summer time on 2026-10-25
+    start = datetime(2026, 10, 24, 12).timestamp()
+    timestamps = np.arange(start, start + 48 * 3600, 3600, dtype='f8')
+    assert local_hours(timestamps).tolist() == [datetime.fromtimestamp(t).hour for t in timestamps]
+
+
+def test_window_loads_in_the_background(monkeypatch):
+    monkeypatch.setattr(module, 'LOAD_BATCH', 40)
+    interactions = get_collection('interactions')
+    interactions.drop()
+    now = time.time()
+    interactions.insert_many([
+        {'user_id': f"user_{i % 7:012x}", 'event_type': 'click', 'element': 'hashtag-UWCL', 'timestamp': now - i}
+        for i in range(150)
+    ])
+
+    cache = AnalyticsCache(hours=1)
+    cache.ready()
+    cache._loader.join(timeout=10)
+
+    assert cache.ready()
+    assert cache.trending() == [('UWCL', 150)]
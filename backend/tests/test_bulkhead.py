@@ -0,0 +1,126 @@
+"""
+A hanging Reddit must not slow tracking down.
+
+The app is served the way one gthread worker serves it: a fixed pool of
+request threads shared by every route. A local stub stands in for Reddit
+and holds each request until the test ends. Tracking p99 is measured
+alone, then while other clients keep asking /api/social/reddit for data
+the stub never sends. Without the bulkhead those requests would take
+every request thread; with it at most `max_concurrent` of them wait, up
+to `call_timeout`, and the rest are turned away with a 503.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from benchmarks.common import percentile
+from utils.bulkhead import reddit_bulkhead
+
+REQUEST_THREADS = 4
+TRACKING_CLIENTS = 2
+REDDIT_CLIENTS = 4
+DURATION = 2.0
+CALL_TIMEOUT = 0.5
+
+
+class HangingReddit(BaseHTTPRequestHandler):
+    release = threading.Event()
+
+    def do_GET(self):
+        HangingReddit.release.wait(timeout=60)
+        try:
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def hanging_reddit(monkeypatch):
+    from reddit_service import reddit_service
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), HangingReddit)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    HangingReddit.release.clear()
+
+    monkeypatch.setattr(reddit_service, 'base_url', f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(reddit_bulkhead, 'call_timeout', CALL_TIMEOUT)
+    yield
+    # Let the parked fetches fail fast so the bulkhead threads can finish
+    HangingReddit.release.set()
+    deadline = time.perf_counter() + 30
+    while reddit_bulkhead.stats()['active'] and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    server.shutdown()
+
+
+def run_clients(app, request_threads, reddit_clients):
+    """Tracking latencies and Reddit status codes over DURATION seconds."""
+    latencies, statuses = [], []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + DURATION
+
+    def tracking_client(seed):
+        rng = random.Random(seed)
+        client = app.test_client()
+        user_id = f"user_{seed:012x}"
+        session_id = f"session_{seed:012x}_{int(time.time())}"
+        local = []
+        while time.perf_counter() < stop_at:
+            event = {
+                'user_id': user_id,
+                'session_id': session_id,
+                'event_type': rng.choice(['click', 'scroll', 'hover', 'page_view']),
+                'timestamp': time.time(),
+                'page_url': '/'
+            }
+            started = time.perf_counter()
+            response = request_threads.submit(client.post, '/api/tracking/event', json=event).result()
+            local.append(time.perf_counter() - started)
+            assert response.status_code == 201, response.get_json()
+        with lock:
+            latencies.extend(local)
+
+    def reddit_client():
+        client = app.test_client()
+        while time.perf_counter() < stop_at:
+            response = request_threads.submit(client.get, '/api/social/reddit').result()
+            with lock:
+                statuses.append(response.status_code)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=tracking_client, args=(seed,)) for seed in range(TRACKING_CLIENTS)]
+    threads += [threading.Thread(target=reddit_client) for _ in range(reddit_clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses
+
+
+def test_tracking_p99_holds_while_reddit_hangs(app, hanging_reddit):
+    assert reddit_bulkhead.enabled
+
+    with ThreadPoolExecutor(max_workers=REQUEST_THREADS) as request_threads:
+        baseline, _ = run_clients(app, request_threads, reddit_clients=0)
+        loaded, statuses = run_clients(app, request_threads, reddit_clients=REDDIT_CLIENTS)
+
+    baseline_p99 = percentile(baseline, 99)
+    loaded_p99 = percentile(loaded, 99)
+
+    # Every Reddit request was answered by the bulkhead, not left hanging
+    assert statuses and set(statuses) <= {503, 504}
+    assert 503 in statuses and 504 in statuses
+    # Only the first callers wait for the call timeout, and on at most max_concurrent threads
+    assert len(loaded) > len(baseline) / 4
+    assert loaded_p99 <= max(5 * baseline_p99, baseline_p99 + CALL_TIMEOUT), (baseline_p99, loaded_p99)
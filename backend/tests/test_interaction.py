@@ -0,0 +1,20 @@
+from datetime import datetime, timedelta, timezone
+
+from models.interaction import to_epoch
+
+
+def test_timestamps_in_every_stored_form_become_epoch_seconds():
+    epoch = 1760000000.25
+    assert to_epoch(epoch) == epoch
+    assert to_epoch(int(epoch)) == int(epoch)
+    # Date.now() from the tracker
+    assert to_epoch(1760000000250) == epoch
+    # BSON dates are naive UTC
+    assert to_epoch(datetime(2025, 10, 9, 8, 53, 20, 250000)) == epoch
+    assert to_epoch(datetime(2025, 10, 9, 10, 53, 20, 250000, tzinfo=timezone(timedelta(hours=2)))) == epoch
+
+
+def test_iso_strings_are_utc_unless_they_say_otherwise():
+    assert to_epoch('2025-10-09T08:53:20.250Z') == 1760000000.25
+    assert to_epoch('2025-10-09T08:53:20.250') == 1760000000.25
+    assert to_epoch('2025-10-09T10:53:20.250+02:00') == 1760000000.25
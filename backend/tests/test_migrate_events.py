@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import ANY
+
+import mongomock
+import pytest
+from bson import ObjectId
+
+from jobs.migrate_events import EventsTask, HEARTBEAT_TIMEOUT, Migration, run
+
+
+def test_sessions_are_renamed_to_local_time(brussels_time):
+    db = mongomock.MongoClient()['migration']
+    db['sessions'].insert_many([
+        {'user_id': 'user_000000000001', 'session_id': 'session_000000000001_1',
+         'start_time': datetime(2026, 7, 1, 10), 'end_time': datetime(2026, 7, 1, 11)},
+        {'user_id': 'user_000000000002', 'session_id': 'session_000000000002_1',
+         'start_time': datetime(2026, 12, 1, 10), 'end_time': None}
+    ])
+
+    run(db, only='sessions')
+    run(db, only='sessions', restart=True)
+
+    summer, winter = db['sessions'].find().sort('user_id', 1)
+    assert 'start_time' not in summer and 'end_time' not in summer
+    assert (summer['started_at'], summer['ended_at']) == (datetime(2026, 7, 1, 12), datetime(2026, 7, 1, 13))
+    assert winter['started_at'] == datetime(2026, 12, 1, 11) and 'ended_at' not in winter
+
+
+def legacy_events(user_id, count, start=datetime(2026, 10, 1, 9)):
+    return [
+        {'_id': ObjectId(), 'user_id': user_id, 'event_type': 'click', 'element': 'hashtag-UWCL',
+         'timestamp': start + timedelta(minutes=i), 'legacy_field': i}
+        for i in range(count)
+    ]
+
+
+def totals(db):
+    return {user['user_id']: user['total_interactions'] for user in db['users'].find()}
+
+
+def test_events_are_copied_and_counted_once():
+    db = mongomock.MongoClient()['migration']
+    events = legacy_events('user_00000000000a', 3) + legacy_events('user_00000000000b', 1)
+    db['events'].insert_many(events + [{'_id': ObjectId(), 'user_id': 'user_00000000000a'}])
+
+    assert run(db, only='events')['events'] == {'copied': 4, 'skipped': 1, 'seconds': ANY}
+    copied = db['interactions'].find_one({'_id': events[0]['_id']})
+    assert copied['timestamp'] == events[0]['timestamp'].replace(tzinfo=timezone.utc).timestamp()
+    assert copied['data'] == {'legacy_field': 0}
+    assert totals(db) == {'user_00000000000a': 3, 'user_00000000000b': 1}
+
+    # Replaying everything changes nothing, and a batch that mixes old and new events counts only the new
+    run(db, only='events', restart=True)
+    later = legacy_events('user_00000000000b', 1, start=datetime(2026, 10, 2, 9))
+    db['events'].insert_many(later)
+    EventsTask().write(db, [*events, later[0]])
+    assert db['interactions'].count_documents({}) == 5
+    assert totals(db) == {'user_00000000000a': 3, 'user_00000000000b': 2}
+
+
+class FailingEventsTask(EventsTask):
+    """Fails on the second batch, like a migration killed halfway."""
+
+    def __init__(self):
+        self.batches = 0
+
+    def write(self, db, docs):
+        self.batches += 1
+        if self.batches == 2:
+            raise RuntimeError('connection lost')
+        return super().write(db, docs)
+
+
+def test_events_resume_after_the_last_saved_batch():
+    db = mongomock.MongoClient()['migration']
+    db['events'].insert_many(legacy_events('user_00000000000a', 6))
+
+    with pytest.raises(RuntimeError):
+        Migration(db, FailingEventsTask(), batch=2, max_batch=2).run()
+    assert db['interactions'].count_documents({}) == 2
+
+    assert Migration(db, EventsTask(), batch=2, max_batch=2).run()['copied'] == 4
+    assert db['interactions'].count_documents({}) == 6
+    assert totals(db) == {'user_00000000000a': 6}
+    assert db['migrations'].find_one({'_id': 'events'})['copied'] == 6
+
+
+def test_a_second_runner_is_refused_until_the_heartbeat_is_stale():
+    db = mongomock.MongoClient()['migration']
+    db['events'].insert_many(legacy_events('user_00000000000a', 2))
+    db['migrations'].insert_one({
+        '_id': 'events', 'holder': 'elsewhere:1', 'heartbeat_at': datetime.utcnow(),
+        'last_id': None, 'copied': 0, 'skipped': 0, 'batches': 0
+    })
+
+    with pytest.raises(SystemExit):
+        run(db, only='events')
+    assert db['interactions'].count_documents({}) == 0
+
+    stale = datetime.utcnow() - timedelta(seconds=HEARTBEAT_TIMEOUT + 1)
+    db['migrations'].update_one({'_id': 'events'}, {'$set': {'heartbeat_at': stale}})
+    assert run(db, only='events')['events']['copied'] == 2
@@ -0,0 +1,31 @@
+import random
+
+from utils.database import get_collection
+from utils.navigation import NavigationIndex
+
+
+PAGES = ['/', '/social', '/analytics', '/about', '/admin']
+
+
+def visits_in_order(path, steps):
+    remaining = iter(path)
+    return all(step in remaining for step in steps)
+
+
+def test_funnels_match_the_session_paths():
+    get_collection('path_prefixes').drop()
+
+    rng = random.Random(5)
+    paths = [[rng.choice(PAGES) for _ in range(rng.randint(1, 10))] for _ in range(200)]
+    index = NavigationIndex()
+    for path in paths:
+        index.on_session_closed(path)
+    index.flush()
+
+    for steps in (['/'], ['/', '/social'], ['/social', '/', '/analytics'], ['/admin', '/about', '/admin', '/']):
+        assert index.ordered_funnel(steps) == [
+            sum(visits_in_order(path, steps[:depth]) for path in paths) for depth in range(1, len(steps) + 1)
+        ]
+        assert index.strict_funnel(steps) == [
+            sum(path[:depth] == steps[:depth] for path in paths) for depth in range(1, len(steps) + 1)
+        ]
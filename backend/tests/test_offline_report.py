@@ -0,0 +1,41 @@
+import gzip
+import json
+import time
+
+import bson
+
+from jobs.offline_report import build_report
+
+
+def interactions(count):
+    now = time.time()
+    return [
+        {
+            'user_id': f"user_{i % 13:012x}",
+            'event_type': 'click' if i % 3 else 'scroll',
+            'element': f"hashtag-{['UWCL', 'WSL', 'NWSL'][i % 3]}",
+            'timestamp': now - i * 60
+        }
+        for i in range(count)
+    ]
+
+
+def test_bson_and_gzip_inputs_match_ndjson(tmp_path):
+    docs = interactions(500)
+    ndjson = tmp_path / 'interactions.ndjson'
+    ndjson.write_text(''.join(json.dumps(doc) + '\n' for doc in docs))
+    dump = b''.join(bson.encode(doc) for doc in docs)
+    plain = tmp_path / 'interactions.bson'
+    plain.write_bytes(dump)
+    compressed = tmp_path / 'interactions.bson.gz'
+    compressed.write_bytes(gzip.compress(dump))
+
+    expected, _ = build_report([str(ndjson)], workers=1)
+    # Small chunks so several BSON ranges are streamed and merged
+    chunked, chunk_count = build_report([str(plain)], workers=1, chunk_bytes=4096)
+    gzipped, gzip_chunks = build_report([str(compressed)], workers=1, chunk_bytes=4096)
+
+    assert chunk_count > 1 and gzip_chunks == 1
+    assert chunked == expected
+    assert gzipped == expected
+    assert expected['stats']['total_interactions'] == 500
@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+from utils import reddit_poller as poller_module
+from utils.database import get_collection
+from utils.reddit_poller import RedditPoller
+
+
+class FakeReddit:
+    breakers = {}
+    rate_limit = {}
+
+    def sources(self):
+        return [('subreddit', 'WomensSoccer'), ('subreddit', 'NWSL'), ('search', 'UWCL')]
+
+    def fetch_source(self, kind, name):
+        return [SimpleNamespace(id=f"{name}-{i}") for i in range(2)]
+
+    def build_social_data(self, posts):
+        return {'totalPosts': len(posts)}
+
+
+def cached_posts():
+    cached = get_collection('social_cache').find_one({'type': 'reddit_data'})
+    return cached['data']['totalPosts'] if cached else None
+
+
+def test_new_leader_writes_the_cache_only_after_a_full_round(monkeypatch):
+    monkeypatch.setattr(poller_module.search_index, 'store_posts', lambda posts: len(posts))
+    get_collection('social_cache').drop()
+    poller = RedditPoller(service=FakeReddit())
+    poller._become_leader()
+    first_due = poller._queue[0][0]
+
+    # Only the first sources are due yet
+    assert poller.poll_due(now=first_due + poller_module.STARTUP_STAGGER) == 2
+    assert cached_posts() is None
+
+    assert poller.poll_due(now=first_due + 10) == 1
+    assert cached_posts() == 6
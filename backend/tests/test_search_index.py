@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from utils.database import get_collection
+from utils.search_index import SearchIndex
+
+
+def post(post_id, title, fetched_at):
+    return {
+        '_id': post_id, 'title': title, 'selftext': '', 'subreddit': 'WomensSoccer',
+        'score': 10, 'num_comments': 2, 'permalink': f"/r/WomensSoccer/{post_id}", 'fetched_at': fetched_at
+    }
+
+
+def test_index_loads_in_the_background_and_catches_up_on_one_bulk_write():
+    posts = get_collection('reddit_posts')
+    posts.drop()
+    fetched_at = datetime.utcnow().replace(microsecond=0)
+    posts.insert_many([post('b1', 'Lionesses win the final', fetched_at),
+                       post('b3', 'Lionesses squad announced', fetched_at)])
+
+    index = SearchIndex()
+    index.sync()
+    index._loader.join(timeout=10)
+    assert index.stats()['loaded']
+    assert {result['id'] for result in index.search('lionesses')} == {'b1', 'b3'}
+
+    # The rest of the same bulk write lands after the sync read past its fetched_at
+    posts.insert_one(post('b2', 'Lionesses training camp', fetched_at))
+    index.sync(force=True)
+    assert {result['id'] for result in index.search('lionesses')} == {'b1', 'b2', 'b3'}
+    assert index.stats()['posts'] == 3
@@ -0,0 +1,72 @@
+import time
+from datetime import datetime, timedelta
+
+from repositories.session_repository import SessionRepository
+from utils.database import get_collection
+from utils.sessionizer import Sessionizer
+
+
+def closed_session(user, started_at, duration, pages):
+    return {
+        'session_key': f"{user}:{int(started_at.timestamp() * 1000)}",
+        'user_id': user,
+        'session_id': None,
+        'started_at': started_at,
+        'ended_at': started_at + timedelta(seconds=duration),
+        'duration': duration,
+        'event_count': pages * 3,
+        'page_count': pages,
+        'bounce': pages <= 1,
+        'active': False,
+        'source': 'sessionizer'
+    }
+
+
+def stats(repository, day=None):
+    found = repository.get_stats(day) or {}
+    return {field: found.get(field) for field in ('sessions', 'total_duration', 'total_events', 'bounces')}
+
+
+def test_session_stats_count_each_session_once():
+    for name in ('sessions', 'session_stats'):
+        get_collection(name).drop()
+    repository = SessionRepository()
+    day = datetime(2026, 10, 18, 9)
+    sessions = [closed_session(f"user_{i:012x}", day + timedelta(hours=i), 60.0 * i, i % 3) for i in range(6)]
+    expected = {'sessions': 6, 'total_duration': 900.0, 'total_events': 18, 'bounces': 4}
+
+    repository.save_closed_sessions(sessions[:4])
+    # A replay after a restart closes some of the same sessions again
+    repository.save_closed_sessions(sessions[2:])
+    assert stats(repository) == expected
+    assert stats(repository, '2026-10-18') == expected
+
+    # A crash after the sessions were stored but before they were counted
+    get_collection('session_stats').drop()
+    repository.rebuild_stats(day)
+    assert stats(repository) == expected
+    assert stats(repository, '2026-10-18') == expected
+
+
+def test_inline_sessions_close_without_more_traffic():
+    for name in ('sessions', 'session_stats', 'session_checkpoints'):
+        get_collection(name).drop()
+    sessionizer = Sessionizer(mode='inline', gap=1, sweep_interval=0)
+    now = time.time()
+    events = [
+        {'user_id': 'user_quiet', 'session_id': 'session_quiet_1', 'timestamp': now + offset, 'page_url': page}
+        for offset, page in ((0, '/'), (0.1, '/social'))
+    ]
+
+    # Tracking requests only queue the events
+    sessionizer.observe(events)
+    assert sessionizer.open_session_count() == 0
+    assert get_collection('sessions').count_documents({}) == 0
+
+    sessionizer.start()
+    deadline = time.time() + 10
+    while get_collection('sessions').count_documents({'user_id': 'user_quiet'}) == 0 and time.time() < deadline:
+        time.sleep(0.1)
+
+    session = get_collection('sessions').find_one({'user_id': 'user_quiet'})
+    assert session['event_count'] == 2 and session['page_count'] == 2
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+from utils.database import get_collection
+from utils.timeline import build_timeline
+
+
+USER_ID = 'user_00000000dst1'
+
+
+def record(*local_times):
+    """Clicks at the given local times; fold=1 picks the second of two repeated times."""
+    interactions = get_collection('interactions')
+    interactions.delete_many({'user_id': USER_ID})
+    interactions.insert_many([
+        {'user_id': USER_ID, 'event_type': 'click', 'timestamp': moment.timestamp()}
+        for moment in local_times
+    ])
+
+
+def counts(timeline):
+    return {datetime.fromtimestamp(bucket['start']): bucket['total'] for bucket in timeline['buckets'] if bucket['total']}
+
+
+def test_day_buckets_start_at_local_midnight_across_a_clock_change(brussels_time):
+    # Clocks go back from 03:00 to 02:00 on 25 October 2026, so that day lasts 25 hours
+    record(datetime(2026, 10, 24, 23, 30), datetime(2026, 10, 25, 0, 30), datetime(2026, 10, 25, 23, 30),
+           datetime(2026, 10, 26, 0, 30))
+
+    timeline = build_timeline(USER_ID, datetime(2026, 10, 20).timestamp(), datetime(2026, 11, 10).timestamp(), 30)
+
+    assert timeline['bucket'] == 'day' and timeline['utc_offset'] == 3600
+    starts = [datetime.fromtimestamp(bucket['start']) for bucket in timeline['buckets']]
+    assert starts == [datetime(2026, 10, day) for day in range(20, 32)] + [datetime(2026, 11, day) for day in range(1, 10)]
+    assert counts(timeline) == {
+        datetime(2026, 10, 24): 1,
+        datetime(2026, 10, 25): 2,
+        datetime(2026, 10, 26): 1
+    }
+
+
+def test_hour_buckets_follow_the_local_clock(brussels_time):
+    # The repeated hour from 02:00 to 03:00 shares one bucket
+    record(datetime(2026, 10, 25, 2, 30), datetime(2026, 10, 25, 2, 30, fold=1), datetime(2026, 10, 25, 3, 30))
+
+    timeline = build_timeline(USER_ID, datetime(2026, 10, 25).timestamp(), datetime(2026, 10, 26).timestamp(), 100)
+
+    assert timeline['bucket'] == 'hour'
+    assert len(timeline['buckets']) == 24
+    assert counts(timeline) == {datetime(2026, 10, 25, 2): 2, datetime(2026, 10, 25, 3): 1}
+
+    # In spring the hour from 02:00 to 03:00 does not exist
+    record(datetime(2026, 3, 29, 1, 30), datetime(2026, 3, 29, 3, 30))
+    timeline = build_timeline(USER_ID, datetime(2026, 3, 29).timestamp(), datetime(2026, 3, 30).timestamp(), 100)
+    assert len(timeline['buckets']) == 23
+    assert counts(timeline) == {datetime(2026, 3, 29, 1): 1, datetime(2026, 3, 29, 3): 1}
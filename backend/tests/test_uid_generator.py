@@ -0,0 +1,17 @@
+from utils.uid_generator import generate_session_id, generate_uid, is_valid_session_id, is_valid_uid
+
+
+def test_user_ids_from_the_server_and_the_tracker_are_valid():
+    assert is_valid_uid(generate_uid())
+    assert is_valid_uid('user_k3j9x0a1b2c3')
+    for uid in ('user_', 'user_ABC123', 'user_abc-123', 'user_' + 'a' * 33, 'visitor_abc123', ' user_abc123', 123, None):
+        assert not is_valid_uid(uid)
+
+
+def test_session_ids_take_seconds_or_milliseconds():
+    assert is_valid_session_id(generate_session_id())
+    assert is_valid_session_id('session_k3j9x0a1b2c3_1760000000')
+    assert is_valid_session_id('session_k3j9x0a1b2c3_1760000000123')
+    for session_id in ('session_k3j9x0a1b2c3', 'session_k3j9x0a1b2c3_', 'session__1760000000',
+                       'session_abc_1760000000.5', 'session_abc_-1', 'session_abc_17600\n', None):
+        assert not is_valid_session_id(session_id)
@@ -0,0 +1,330 @@
+"""
+Columnar in-memory cache of recent interactions.
+
+Keeps the last ANALYTICS_CACHE_HOURS of interactions in a NumPy structured
+array with dictionary-encoded strings, refreshed by tailing new inserts on
+_id. Disabled unless ANALYTICS_CACHE_HOURS is set.
+
+The window is loaded by a background thread, LOAD_BATCH documents at a
+time, on first use; until it is complete ready() is False and callers
+answer from MongoDB or with a 503. Later refreshes read at most
+REFRESH_LIMIT new documents each, so a burst of inserts never turns one
+request into a long scan.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from utils.tailer import CollectionTailer
+
+
+CACHE_HOURS = float(os.getenv('ANALYTICS_CACHE_HOURS', 0))
+REFRESH_INTERVAL = float(os.getenv('ANALYTICS_CACHE_REFRESH_INTERVAL', 5))
+REFRESH_LIMIT = int(os.getenv('ANALYTICS_CACHE_REFRESH_LIMIT', 50000))
+LOAD_BATCH = 50000
+
+INITIAL_CAPACITY = 1 << 16
+MISSING = -1
+
+EVENT_DTYPE = np.dtype([
+    ('user', 'i4'),
+    ('event_type', 'i2'),
+    ('element', 'i4'),
+    ('page', 'i4'),
+    ('timestamp', 'f8'),
+    ('x', 'f4'),
+    ('y', 'f4'),
+    ('scroll_depth', 'f4'),
+    ('duration', 'f4')
+])
+
+PROJECTION = {
+    'user_id': 1, 'event_type': 1, 'element': 1, 'page_url': 1, 'timestamp': 1,
+    'x': 1, 'y': 1, 'scroll_depth': 1, 'duration': 1, 'metadata.page_url': 1
+}
+
+
+class Dictionary:
+    def __init__(self, values=None):
+        self.values = []
+        self.codes = {}
+        for value in values or []:
+            self.encode(value)
+
+    def encode(self, value):
+        if value is None:
+            return MISSING
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, value):
+        return self.codes.get(value, MISSING)
+
+    def memory_bytes(self):
+        return sum(len(v) + 100 for v in self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) else np.nan
+
+
+def local_hours(timestamps):
+    """Local hour of day of each timestamp, with the UTC offset in force at that time."""
+    if len(timestamps) == 0:
+        return np.zeros(0, dtype=np.int64)
+    # Offsets only change on quarter hours, so look each one up once per quarter in range
+    quarters = (timestamps // 900).astype(np.int64)
+    first = int(quarters.min())
+    offsets = np.array([
+        datetime.fromtimestamp(quarter * 900).astimezone().utcoffset().total_seconds()
+        for quarter in range(first, int(quarters.max()) + 1)
+    ])
+    return ((timestamps + offsets[quarters - first]) // 3600 % 24).astype(np.int64)
+
+
+class AnalyticsCache:
+    def __init__(self, hours=CACHE_HOURS, refresh_interval=REFRESH_INTERVAL):
+        self.hours = hours
+        self.refresh_interval = refresh_interval
+
+        self.users = Dictionary()
+        self.event_types = Dictionary()
+        self.elements = Dictionary()
+        self.pages = Dictionary()
+
+        self._data = np.zeros(INITIAL_CAPACITY, dtype=EVENT_DTYPE)
+        self._size = 0
+        self._tailer = CollectionTailer('interactions', PROJECTION)
+        self._last_refresh = 0
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._loader = None
+
+    @property
+    def enabled(self):
+        return self.hours > 0
+
+    def ready(self):
+        """True once the whole window is loaded; starts loading it on the first call."""
+        if not self.enabled:
+            return False
+        if not self._loaded:
+            self._start_loading()
+        return self._loaded
+
+    def _start_loading(self):
+        with self._lock:
+            # A forked worker inherits the half-loaded buffer but not the thread
+            if self._loaded or (self._loader is not None and self._loader.is_alive()):
+                return
+            self._loader = threading.Thread(target=self._load, name='analytics-cache-load', daemon=True)
+            self._loader.start()
+
+    def _load(self):
+        started = time.time()
+        try:
+            while True:
+                with self._lock:
+                    if self._tailer.tail_time is None:
+                        self._tailer.start_at(self.window_start(started))
+                    added = self.append_documents(self._tailer.poll(limit=LOAD_BATCH))
+                    if added < LOAD_BATCH:
+                        self._evict(time.time())
+                        self._last_refresh = time.time()
+                        self._loaded = True
+                        break
+        except Exception as e:
+            print(f"⚠ Warning: analytics cache load failed: {e}")
+            return
+        print(f"✓ Analytics cache loaded {self._size:,} events in {time.time() - started:.1f}s")
+
+    def window_start(self, now=None):
+        return (now or time.time()) - self.hours * 3600
+
+    def append_documents(self, documents):
+        rows = []
+        for doc in documents:
+            page = doc.get('page_url')
+            if not page and isinstance(doc.get('metadata'), dict):
+                page = doc['metadata'].get('page_url')
+            rows.append((
+                self.users.encode(doc.get('user_id')),
+                self.event_types.encode(doc.get('event_type')),
+                self.elements.encode(doc.get('element')),
+                self.pages.encode(page),
+                _number(doc.get('timestamp')),
+                _number(doc.get('x')),
+                _number(doc.get('y')),
+                _number(doc.get('scroll_depth')),
+                _number(doc.get('duration'))
+            ))
+
+        if not rows:
+            return 0
+
+        required = self._size + len(rows)
+        if required > len(self._data):
+            capacity = len(self._data)
+            while capacity < required:
+                capacity *= 2
+            grown = np.zeros(capacity, dtype=EVENT_DTYPE)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+
+        self._data[self._size:required] = np.array(rows, dtype=EVENT_DTYPE)
+        self._size = required
+        return len(rows)
+
+    def refresh(self, force=False):
+        now = time.time()
+        if not force and now - self._last_refresh < self.refresh_interval:
+            return 0
+
+        if not self._loaded:
+            self._start_loading()
+            return 0
+
+        with self._lock:
+            if not force and now - self._last_refresh < self.refresh_interval:
+                return 0
+
+            added = self.append_documents(self._tailer.poll(limit=REFRESH_LIMIT))
+            self._evict(now)
+            self._last_refresh = now
+            return added
+
+    def _evict(self, now):
+        data = self._data[:self._size]
+        start = self.window_start(now)
+        # Only compact once a meaningful share of the buffer has aged out
+        if self._size == 0 or np.count_nonzero(data['timestamp'] < start) < self._size // 4:
+            return
+
+        kept = data[data['timestamp'] >= start].copy()
+        for field, name in (('user', 'users'), ('event_type', 'event_types'),
+                            ('element', 'elements'), ('page', 'pages')):
+            kept[field], dictionary = self._recode(kept[field], getattr(self, name))
+            setattr(self, name, dictionary)
+
+        capacity = max(INITIAL_CAPACITY, len(kept) * 2)
+        self._data = np.zeros(capacity, dtype=EVENT_DTYPE)
+        self._data[:len(kept)] = kept
+        self._size = len(kept)
+
+    @staticmethod
+    def _recode(codes, dictionary):
+        present = codes != MISSING
+        used, remapped = np.unique(codes[present], return_inverse=True)
+        recoded = np.full(len(codes), MISSING, dtype=codes.dtype)
+        recoded[present] = remapped
+        return recoded, Dictionary(dictionary.values[code] for code in used)
+
+    def snapshot(self):
+        self.refresh()
+        with self._lock:
+            return self._data[:self._size], self.users, self.event_types, self.elements, self.pages
+
+    def _window(self, since=None):
+        """Return the buffer and a mask of the rows inside the window.
+
+        Predicates are combined on the mask first so only the columns a
+        query needs are ever copied out of the structured array.
+        """
+        data, users, event_types, elements, pages = self.snapshot()
+        start = max(since or 0, self.window_start())
+        return data, data['timestamp'] >= start, users, event_types, elements, pages
+
+    def covers(self, seconds):
+        return self.enabled and self.hours * 3600 >= seconds and self.ready()
+
+    def event_type_breakdown(self, since=None):
+        data, mask, _, event_types, _, _ = self._window(since)
+        mask &= data['event_type'] != MISSING
+        counts = np.bincount(data['event_type'][mask], minlength=len(event_types))
+        order = np.argsort(counts)[::-1]
+        return [
+            {'type': event_types.values[code], 'count': int(counts[code])}
+            for code in order if counts[code] > 0
+        ]
+
+    def hour_histogram(self, since=None, user_id=None):
+        data, mask, users, _, _, _ = self._window(since)
+        if user_id is not None:
+            mask &= data['user'] == users.lookup(user_id)
+        counts = np.bincount(local_hours(data['timestamp'][mask]), minlength=24)
+        return [{'hour': hour, 'interactions': int(count)} for hour, count in enumerate(counts)]
+
+    def trending(self, since=None, limit=10):
+        data, mask, _, event_types, elements, _ = self._window(since)
+        if len(elements) == 0:
+            return []
+
+        mask &= (data['event_type'] == event_types.lookup('click')) & (data['element'] != MISSING)
+        clicks = data['element'][mask]
+
+        is_hashtag = np.fromiter(
+            (value.startswith('hashtag-') for value in elements.values[:len(elements)]),
+            dtype=bool, count=len(elements)
+        )
+        counts = np.bincount(clicks[is_hashtag[clicks]], minlength=len(elements))
+
+        top = np.flatnonzero(counts)
+        if len(top) > limit:
+            top = top[np.argpartition(counts[top], -limit)[-limit:]]
+        top = top[np.argsort(-counts[top], kind='stable')]
+
+        return [(elements.values[code].replace('hashtag-', ''), int(counts[code])) for code in top]
+
+    def user_activity(self, user_id, limit=100):
+        data, mask, users, event_types, elements, _ = self._window()
+        code = users.lookup(user_id)
+        if code == MISSING:
+            return 0, {}, {}
+
+        rows = data[mask & (data['user'] == code)]
+        if len(rows) > limit:
+            rows = rows[np.argpartition(rows['timestamp'], -limit)[-limit:]]
+
+        clicks = rows['element'][(rows['event_type'] == event_types.lookup('click')) &
+                                 (rows['element'] != MISSING)]
+        click_counts = np.bincount(clicks, minlength=len(elements))
+        clicked_elements = {
+            elements.values[code]: int(click_counts[code]) for code in np.flatnonzero(click_counts)
+        }
+
+        hour_counts = np.bincount(local_hours(rows['timestamp']), minlength=24)
+        hour_activity = {int(hour): int(hour_counts[hour]) for hour in np.flatnonzero(hour_counts)}
+
+        return len(rows), clicked_elements, hour_activity
+
+    def stats(self):
+        data, users, event_types, elements, pages = self.snapshot()
+        dictionary_bytes = sum(d.memory_bytes() for d in (users, event_types, elements, pages))
+        array_bytes = self._data.nbytes
+        return {
+            'enabled': self.enabled,
+            'window_hours': self.hours,
+            'events': int(len(data)),
+            'capacity': int(len(self._data)),
+            'array_bytes': int(array_bytes),
+            'dictionary_bytes': int(dictionary_bytes),
+            'bytes_per_event': EVENT_DTYPE.itemsize,
+            'mb_per_million_events': round(EVENT_DTYPE.itemsize * 1e6 / 2**20, 2),
+            'distinct_users': len(users),
+            'distinct_elements': len(elements),
+            'distinct_pages': len(pages)
+        }
+
+
+analytics_cache = AnalyticsCache()
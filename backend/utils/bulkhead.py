@@ -0,0 +1,176 @@
+"""
+Bulkheads: bounded thread pools per route class.
+
+Routes that wait on external services run their work in a pool of their
+own instead of directly on the server's request threads. A bulkhead admits
+at most `max_concurrent` calls and lets up to `max_waiting` more queue for
+`queue_timeout`; everyone else is rejected at once. Callers whose work
+overruns `call_timeout` are released while the work finishes in the
+background.
+Either way only a bounded number of request threads can ever be parked on
+a slow dependency, leaving the rest of the worker for ingestion.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import wraps
+
+from flask import copy_current_request_context, jsonify
+
+
+class BulkheadFull(Exception):
+    pass
+
+
+class BulkheadTimeout(Exception):
+    pass
+
+
+class Bulkhead:
+    def __init__(self, name, max_concurrent, max_waiting=0, queue_timeout=0.5, call_timeout=30):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.queue_timeout = queue_timeout
+        self.call_timeout = call_timeout
+
+        self._slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent > 0 else None
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+        self.active = 0
+        self.waiting = 0
+        self.peak_active = 0
+        self.admitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+
+    @property
+    def enabled(self):
+        return self._slots is not None
+
+    def _pool(self):
+        # Thread pools do not survive a fork, so each worker builds its own
+        if self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor_pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_concurrent, thread_name_prefix=f"bulkhead-{self.name}"
+                    )
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def call(self, fn, *args, **kwargs):
+        if not self.enabled:
+            return fn(*args, **kwargs)
+
+        started = time.perf_counter()
+        acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            # Waiters also hold a request thread, so the queue is bounded too
+            with self._lock:
+                may_wait = self.waiting < self.max_waiting
+                if may_wait:
+                    self.waiting += 1
+            if may_wait:
+                acquired = self._slots.acquire(timeout=self.queue_timeout)
+                with self._lock:
+                    self.waiting -= 1
+
+        with self._lock:
+            self.total_wait += time.perf_counter() - started
+            if not acquired:
+                self.rejected += 1
+            else:
+                self.admitted += 1
+                self.active += 1
+                self.peak_active = max(self.peak_active, self.active)
+
+        if not acquired:
+            raise BulkheadFull(f"{self.name} bulkhead is saturated")
+
+        try:
+            future = self._pool().submit(fn, *args, **kwargs)
+        except Exception:
+            self._release(failed=True)
+            raise
+        # The slot is freed when the work really finishes, not when the
+        # caller gives up on it, so hung calls keep counting against the limit
+        future.add_done_callback(lambda f: self._release(failed=f.exception() is not None))
+
+        try:
+            return future.result(timeout=self.call_timeout)
+        except FutureTimeout:
+            with self._lock:
+                self.timed_out += 1
+            raise BulkheadTimeout(f"{self.name} call exceeded {self.call_timeout}s")
+
+    def _release(self, failed=False):
+        with self._lock:
+            self.active -= 1
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                'enabled': self.enabled,
+                'max_concurrent': self.max_concurrent,
+                'max_waiting': self.max_waiting,
+                'queue_timeout': self.queue_timeout,
+                'call_timeout': self.call_timeout,
+                'active': self.active,
+                'waiting': self.waiting,
+                'peak_active': self.peak_active,
+                'saturation': round(self.active / self.max_concurrent, 2) if self.enabled else None,
+                'admitted': self.admitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'avg_wait_ms': round(self.total_wait / max(1, self.admitted + self.rejected) * 1000, 2)
+            }
+
+
+def isolate(bulkhead):
+    """Run a Flask view inside a bulkhead, answering 503 when it is full or slow."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                return bulkhead.call(copy_current_request_context(view), *args, **kwargs)
+            except BulkheadFull:
+                response = jsonify({
+                    'success': False,
+                    'error': 'Service busy, try again shortly'
+                })
+                response.headers['Retry-After'] = '1'
+                return response, 503
+            except BulkheadTimeout:
+                return jsonify({
+                    'success': False,
+                    'error': 'Upstream request timed out'
+                }), 504
+        return wrapper
+    return decorator
+
+
+reddit_bulkhead = Bulkhead(
+    'reddit',
+    max_concurrent=int(os.getenv('REDDIT_BULKHEAD_CONCURRENCY', 2)),
+    max_waiting=int(os.getenv('REDDIT_BULKHEAD_MAX_WAITING', 0)),
+    queue_timeout=float(os.getenv('REDDIT_BULKHEAD_QUEUE_TIMEOUT', 0.5)),
+    call_timeout=float(os.getenv('REDDIT_BULKHEAD_CALL_TIMEOUT', 30))
+)
+
+BULKHEADS = [reddit_bulkhead]
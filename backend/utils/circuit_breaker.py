@@ -0,0 +1,103 @@
+"""
+Circuit breaker for calls to external services.
+
+CLOSED lets calls through and counts consecutive failures. After
+`failure_threshold` failures the breaker goes OPEN and rejects calls
+outright for `reset_timeout` seconds. It then lets a single probe through
+(HALF_OPEN): success closes it again, failure reopens it.
+"""
+
+import threading
+import time
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=3, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self.open_until = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+        self.successes = 0
+        self.total_failures = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    def allow(self):
+        """Whether a call may go out now. In HALF_OPEN only one probe is allowed."""
+        with self._lock:
+            if self.state == OPEN and time.time() >= self.open_until:
+                self.state = HALF_OPEN
+                self._probing = False
+
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.successes += 1
+            self.failures = 0
+            self.state = CLOSED
+            self._probing = False
+
+    def record_failure(self, retry_after=None):
+        """Count a failure; `retry_after` opens the breaker for at least that long."""
+        with self._lock:
+            self.total_failures += 1
+            self.failures += 1
+            self._probing = False
+
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold or retry_after:
+                self._open(max(self.reset_timeout, retry_after or 0))
+
+    def _open(self, seconds):
+        if self.state != OPEN:
+            self.times_opened += 1
+        self.state = OPEN
+        self.opened_at = time.time()
+        self.open_until = self.opened_at + seconds
+
+    def call(self, fn, *args, **kwargs):
+        if not self.allow():
+            raise CircuitOpen(f"{self.name} circuit is open")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'open_for_seconds': round(max(0, self.open_until - time.time()), 1) if self.state == OPEN else 0,
+                'successes': self.successes,
+                'failures': self.total_failures,
+                'rejected': self.rejected,
+                'times_opened': self.times_opened
+            }
@@ -0,0 +1,143 @@
+"""
+Comment enrichment for Reddit sentiment.
+
+Link posts have little text of their own, so their sentiment is mostly
+"neutral". For the top posts by engagement the first comments are fetched
+and scored along with the post. All fetches for a refresh run at once on a
+bounded pool and are waited for up to a single deadline, so a refresh
+takes at most as long as the slowest comment fetch. Whatever has not
+arrived by then is left out and picked up from the cache next time.
+
+Comment texts are cached per post and revalidated when the post's
+num_comments changes; until the new copy arrives the old one is used.
+"""
+
+import heapq
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from utils.query_cache import QueryCache, CachedFailure
+
+
+ENABLED = os.getenv('REDDIT_COMMENTS_ENABLED', '0') == '1'
+TOP_POSTS = int(os.getenv('REDDIT_COMMENTS_TOP_POSTS', 10))
+MAX_COMMENTS = int(os.getenv('REDDIT_COMMENTS_MAX', 20))
+MAX_DEPTH = int(os.getenv('REDDIT_COMMENTS_DEPTH', 1))
+# One slot per post by default, so every fetch of a refresh runs in the same wave
+CONCURRENCY = int(os.getenv('REDDIT_COMMENTS_CONCURRENCY', TOP_POSTS))
+DEADLINE = float(os.getenv('REDDIT_COMMENTS_DEADLINE', os.getenv('REDDIT_TIMEOUT', 10)))
+
+
+def _engagement(post):
+    return post.score + post.num_comments * 2
+
+
+class CommentFetcher:
+    def __init__(self, service, enabled=ENABLED, top_posts=TOP_POSTS, concurrency=CONCURRENCY, deadline=DEADLINE):
+        self.service = service
+        self.enabled = enabled
+        self.top_posts = top_posts
+        self.concurrency = concurrency
+        self.deadline = deadline
+        self.cache = QueryCache(
+            'reddit_comments',
+            max_entries=int(os.getenv('REDDIT_COMMENTS_CACHE_SIZE', 500)),
+            ttl=float(os.getenv('REDDIT_COMMENTS_CACHE_TTL', 6 * 3600)),
+            negative_ttl=float(os.getenv('REDDIT_COMMENTS_CACHE_NEGATIVE_TTL', 300)),
+            shared=os.getenv('REDDIT_COMMENTS_CACHE_SHARED', '0') == '1'
+        )
+
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.counts = {'rounds': 0, 'fresh': 0, 'fetched': 0, 'stale': 0, 'late': 0, 'failed': 0}
+        self.last_round_ms = None
+
+    def comment_texts(self, posts):
+        """{post id: [comment bodies]} for the top posts by engagement."""
+        if not self.enabled or not posts:
+            return {}
+
+        texts = {}
+        stale = {}
+        futures = {}
+        for post in heapq.nlargest(self.top_posts, posts, key=_engagement):
+            if not post.id or not post.num_comments:
+                continue
+            try:
+                cached = self.cache.peek(post.id)
+            except CachedFailure:
+                continue  # Failed recently, try again once the negative entry expires
+            if cached is not None:
+                if cached['num_comments'] == post.num_comments:
+                    texts[post.id] = cached['texts']
+                    self._count('fresh')
+                    continue
+                stale[post.id] = cached['texts']
+            futures[self._executor().submit(self._refresh, post.id, post.num_comments)] = post.id
+
+        if futures:
+            started = time.perf_counter()
+            done, pending = wait(futures, timeout=self.deadline)
+            for future in done:
+                post_id = futures[future]
+                try:
+                    texts[post_id] = future.result()['texts']
+                    self._count('fetched')
+                except Exception:
+                    self._count('failed')
+                    if post_id in stale:
+                        texts[post_id] = stale[post_id]
+                        self._count('stale')
+            for future in pending:
+                # Still running; its result lands in the cache for the next refresh
+                post_id = futures[future]
+                self._count('late')
+                if post_id in stale:
+                    texts[post_id] = stale[post_id]
+                    self._count('stale')
+            self.last_round_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        self._count('rounds')
+        return texts
+
+    def cached_texts(self, post_id):
+        """Comment texts this process already holds for a post, without fetching."""
+        try:
+            cached = self.cache.peek(post_id)
+        except CachedFailure:
+            return None
+        return cached['texts'] if cached is not None else None
+
+    def _refresh(self, post_id, num_comments):
+        return self.cache.get_or_compute(
+            post_id,
+            lambda: {'num_comments': num_comments, 'texts': self.service.fetch_comments(post_id)},
+            refresh=True
+        )
+
+    def _executor(self):
+        # Threads do not survive a fork, so each worker process builds its own pool
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ThreadPoolExecutor(max_workers=self.concurrency,
+                                                thread_name_prefix='reddit-comments')
+                self._pid = os.getpid()
+            return self._pool
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'top_posts': self.top_posts,
+            'concurrency': self.concurrency,
+            'deadline_seconds': self.deadline,
+            'last_round_ms': self.last_round_ms,
+            **self.counts,
+            'cache': self.cache.stats()
+        }
@@ -16,7 +16,9 @@ ALLOWED_EVENT_TYPES = [
     'element_focus',
     'mouse_move',
     'key_press',
-    'form_submit'
+    'form_submit',
+    'copy',
+    'paste'
 ]
 
 MAX_STRING_LENGTH = 500
@@ -0,0 +1,64 @@
+"""
+Concurrent fan-out of independent database reads.
+
+A view that needs several unrelated queries pays their sum when it runs
+them one after another. A FanOut starts them all at once on a small
+per-process pool and waits up to a single deadline, so the view pays
+roughly the slowest of them. A query that fails or overruns is reported
+by name and the others are still returned. Give each query a maxTimeMS
+no longer than the deadline so MongoDB stops working on it as well.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from pymongo.errors import ExecutionTimeout
+
+from utils.metrics import fanout_queries
+
+
+class FanOut:
+    def __init__(self, name, max_workers):
+        self.name = name
+        self.max_workers = max_workers
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        # Threads do not survive a fork, so each worker process builds its own pool
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix=f"fanout-{self.name}")
+                self._pid = os.getpid()
+            return self._pool
+
+    def run(self, queries, timeout):
+        """
+        Run {name: callable} concurrently for at most `timeout` seconds.
+        Returns ({name: result}, {name: 'timeout' or 'error'}).
+        """
+        pool = self._executor()
+        futures = {name: pool.submit(query) for name, query in queries.items()}
+        wait(futures.values(), timeout=timeout)
+
+        results, missing = {}, {}
+        for name, future in futures.items():
+            if not future.done():
+                # Still queued or running; a running query ends at its maxTimeMS
+                future.cancel()
+                missing[name] = 'timeout'
+                continue
+            try:
+                results[name] = future.result()
+            except ExecutionTimeout:
+                missing[name] = 'timeout'
+            except Exception as e:
+                print(f"⚠ Warning: {self.name} query '{name}' failed: {e}")
+                missing[name] = 'error'
+
+        for name in futures:
+            fanout_queries.inc(self.name, name, missing.get(name, 'ok'))
+        return results, missing
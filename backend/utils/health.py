@@ -0,0 +1,74 @@
+"""
+Cached MongoDB health, refreshed by a background prober.
+
+/health and /ready read the last probe instead of pinging MongoDB on every
+request, so container healthchecks cost nothing and a slow or unreachable
+database never makes the probes themselves hang.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+
+PROBE_INTERVAL = float(os.getenv('HEALTH_PROBE_INTERVAL', 5))
+
+
+class HealthProber:
+    def __init__(self, interval=PROBE_INTERVAL):
+        self.interval = interval
+        self.connected = None  # Unknown until the first probe
+        self.latency_ms = None
+        self.error = None
+        self.checked_at = None
+        self.started_at = time.time()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start probing. Call once per worker process, after fork."""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name='health-prober', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self.probe()
+            time.sleep(self.interval)
+
+    def probe(self):
+        from utils.database import get_db
+
+        started = time.perf_counter()
+        try:
+            get_db().client.admin.command('ping')
+        except Exception as e:
+            if self.connected is not False:
+                print(f"✗ MongoDB health probe failed: {e}")
+            self.connected = False
+            self.error = str(e)
+        else:
+            if not self.connected:
+                print(f"✓ Successfully connected to MongoDB: {get_db().name}")
+            self.connected = True
+            self.error = None
+        self.latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.checked_at = datetime.utcnow()
+
+    def status(self):
+        return {
+            'database': {None: 'unknown', True: 'connected', False: 'disconnected'}[self.connected],
+            'latency_ms': self.latency_ms,
+            'error': self.error,
+            'checked_at': self.checked_at.isoformat() if self.checked_at else None,
+            'uptime_seconds': round(time.time() - self.started_at, 1)
+        }
+
+
+health_prober = HealthProber()
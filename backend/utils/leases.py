@@ -0,0 +1,56 @@
+"""
+Mongo-backed leases so that only one worker process runs a singleton task.
+"""
+
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from utils.database import get_collection
+
+
+class Lease:
+    def __init__(self, name, ttl=30):
+        self.name = name
+        self.ttl = ttl
+        self.holder = f"{socket.gethostname()}:{os.getpid()}"
+        self.expires_at = 0
+
+    def acquire(self):
+        """Take or renew the lease. Returns True while this process holds it."""
+        now = datetime.utcnow()
+        try:
+            lease = get_collection('leases').find_one_and_update(
+                {
+                    '_id': self.name,
+                    '$or': [{'holder': self.holder}, {'expires_at': {'$lt': now}}]
+                },
+                {'$set': {'holder': self.holder, 'expires_at': now + timedelta(seconds=self.ttl)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            held = lease is not None and lease['holder'] == self.holder
+        except DuplicateKeyError:
+            # Another holder's unexpired lease exists, so the upsert collided with it
+            held = False
+        except Exception as e:
+            print(f"Error acquiring lease {self.name}: {e}")
+            held = False
+
+        self.expires_at = time.time() + self.ttl if held else 0
+        return held
+
+    @property
+    def held(self):
+        return time.time() < self.expires_at
+
+    def release(self):
+        try:
+            get_collection('leases').delete_one({'_id': self.name, 'holder': self.holder})
+        except Exception as e:
+            print(f"Error releasing lease {self.name}: {e}")
+        self.expires_at = 0
@@ -0,0 +1,307 @@
+"""
+Prometheus-compatible metrics, served in the text exposition format at /metrics.
+
+Counters and histograms keep one shard per thread, so recording a value on
+the request path takes no lock: a thread only ever writes its own dict and
+a scrape sums the shards. Each worker process also writes its totals to the
+worker_metrics collection every few seconds, and /metrics adds those of the
+other live workers, so a scrape sees the whole server whichever worker
+answers it.
+"""
+
+import bisect
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import Response, request
+from pymongo import monitoring
+
+
+ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 10))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+UPSTREAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Connection handshakes and authentication are not application queries
+IGNORED_COMMANDS = {'hello', 'ismaster', 'isMaster', 'saslStart', 'saslContinue', 'authenticate'}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format(name, label_names, labels, value, extra=''):
+    pairs = [f'{label}="{_escape(v)}"' for label, v in zip(label_names, labels)]
+    if extra:
+        pairs.append(extra)
+    return f"{name}{{{','.join(pairs)}}} {value}" if pairs else f"{name} {value}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._shards.append(values)
+            return values
+
+    def values(self):
+        """{label values: value} summed over every thread of this process."""
+        with self._lock:
+            shards = list(self._shards)
+        merged = {}
+        for shard in shards:
+            # dict.copy() runs under the GIL, so the owning thread cannot change it midway
+            for labels, value in shard.copy().items():
+                self.merge(merged, labels, value)
+        return merged
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        values = self._shard()
+        values[labels] = values.get(labels, 0) + amount
+
+    @staticmethod
+    def merge(merged, labels, value):
+        merged[labels] = merged.get(labels, 0) + value
+
+    def lines(self, values):
+        for labels, value in sorted(values.items()):
+            yield _format(self.name, self.labels, labels, value)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        values = self._shard()
+        counts = values.get(labels)
+        if counts is None:
+            # One slot per bucket, one for +Inf, then the running sum
+            counts = values[labels] = [0] * (len(self.buckets) + 2)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    @staticmethod
+    def merge(merged, labels, value):
+        current = merged.get(labels)
+        merged[labels] = list(value) if current is None else [a + b for a, b in zip(current, value)]
+
+    def lines(self, values):
+        bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+        for labels, counts in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                yield _format(f"{self.name}_bucket", self.labels, labels, cumulative, f'le="{bound}"')
+            yield _format(f"{self.name}_sum", self.labels, labels, round(counts[-1], 6))
+            yield _format(f"{self.name}_count", self.labels, labels, cumulative)
+
+
+class Gauge:
+    """Value derived at scrape time from the merged values of other metrics."""
+    kind = 'gauge'
+
+    def __init__(self, name, help, labels, compute):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        # compute(snapshot) -> {label values: value}
+        self.compute = compute
+
+    def lines(self, values):
+        for labels, value in sorted(values.items()):
+            yield _format(self.name, self.labels, labels, value)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.gauges = []
+        self.worker_id = None
+        self._thread = None
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name, help, labels, compute):
+        self.gauges.append(Gauge(name, help, labels, compute))
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def snapshot(self):
+        return {metric.name: metric.values() for metric in self.metrics}
+
+    def install(self, app):
+        """Time every request of app and serve /metrics. Call once per app."""
+        if not ENABLED:
+            return
+
+        @app.before_request
+        def _start_timer():
+            request.environ['metrics.started'] = time.perf_counter()
+
+        @app.after_request
+        def _observe_request(response):
+            started = request.environ.get('metrics.started')
+            if started is not None:
+                route = request.url_rule.rule if request.url_rule else 'unmatched'
+                http_request_seconds.observe(time.perf_counter() - started, route, request.method,
+                                             str(response.status_code))
+            return response
+
+        app.add_url_rule('/metrics', 'metrics', self.serve, methods=['GET'])
+
+    def serve(self):
+        return Response(self.render(), content_type=CONTENT_TYPE)
+
+    def render(self):
+        snapshot = self.snapshot()
+        for other in self._other_workers():
+            for metric in self.metrics:
+                for labels, value in other.get(metric.name, []):
+                    metric.merge(snapshot[metric.name], tuple(labels), value)
+
+        lines = []
+        for metric in self.metrics:
+            lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.kind}"]
+            lines += metric.lines(snapshot[metric.name])
+        for gauge in self.gauges:
+            lines += [f"# HELP {gauge.name} {gauge.help}", f"# TYPE {gauge.name} gauge"]
+            lines += gauge.lines(gauge.compute(snapshot))
+        return '\n'.join(lines) + '\n'
+
+    def start(self):
+        """Start publishing this worker's totals. Call once per worker process, after fork."""
+        if not ENABLED or self._thread is not None:
+            return
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._thread = threading.Thread(target=self._run, name='metrics-flush', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error publishing metrics: {e}")
+
+    def flush(self):
+        from utils.database import get_collection
+
+        encoded = {
+            name: [[list(labels), value] for labels, value in values.items()]
+            for name, values in self.snapshot().items()
+        }
+        get_collection('worker_metrics').replace_one(
+            {'_id': self.worker_id},
+            {'snapshot': encoded, 'updated_at': datetime.utcnow()},
+            upsert=True
+        )
+
+    def _other_workers(self):
+        if self.worker_id is None:
+            return []
+        from utils.database import get_collection
+
+        # Workers that stopped publishing have exited or been recycled
+        live_since = datetime.utcnow() - timedelta(seconds=FLUSH_INTERVAL * 3)
+        try:
+            docs = get_collection('worker_metrics').find(
+                {'_id': {'$ne': self.worker_id}, 'updated_at': {'$gte': live_since}}
+            )
+            return [doc.get('snapshot', {}) for doc in docs]
+        except Exception as e:
+            print(f"Error reading worker metrics: {e}")
+            return []
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every MongoDB command by collection and command name."""
+
+    def __init__(self):
+        # Only the started event carries the command; keep its collection until it ends
+        self._collections = {}
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        target = event.command.get('collection' if event.command_name == 'getMore' else event.command_name)
+        self._collections[(event.connection_id, event.request_id)] = target if isinstance(target, str) else ''
+
+    def succeeded(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), None)
+        if collection is not None:
+            mongo_command_seconds.observe(event.duration_micros / 1e6, collection, event.command_name)
+
+    def failed(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), None)
+        if collection is not None:
+            mongo_command_seconds.observe(event.duration_micros / 1e6, collection, event.command_name)
+            mongo_command_failures.inc(collection, event.command_name)
+
+
+def _hit_ratios(snapshot):
+    totals, hits = {}, {}
+    for (cache, result), count in snapshot['cache_requests_total'].items():
+        totals[(cache,)] = totals.get((cache,), 0) + count
+        if result != 'miss':
+            hits[(cache,)] = hits.get((cache,), 0) + count
+    return {cache: round(hits.get(cache, 0) / total, 4) for cache, total in totals.items() if total}
+
+
+metrics = Registry()
+
+http_request_seconds = metrics.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route, method and status.',
+    ('route', 'method', 'status'))
+mongo_command_seconds = metrics.histogram(
+    'mongodb_command_duration_seconds', 'MongoDB command latency by collection and command.',
+    ('collection', 'command'))
+mongo_command_failures = metrics.counter(
+    'mongodb_command_failures_total', 'MongoDB commands that failed.', ('collection', 'command'))
+events_ingested = metrics.counter(
+    'tracking_events_total', 'Tracking events received, by event type and outcome.', ('event_type', 'outcome'))
+reddit_fetch_seconds = metrics.histogram(
+    'reddit_fetch_duration_seconds', 'Reddit fetch and parse time by source and outcome.',
+    ('source', 'outcome'), buckets=UPSTREAM_BUCKETS)
+reddit_fetches_skipped = metrics.counter(
+    'reddit_fetches_skipped_total', 'Reddit fetches not sent, by source and reason.', ('source', 'reason'))
+cache_requests = metrics.counter(
+    'cache_requests_total', 'Cache lookups by cache and result.', ('cache', 'result'))
+fanout_queries = metrics.counter(
+    'fanout_queries_total', 'Concurrent dashboard queries by fan-out, query and outcome.', ('fanout', 'query', 'outcome'))
+metrics.gauge('cache_hit_ratio', 'Share of cache lookups answered without computing.', ('cache',), _hit_ratios)
+
+mongo_listener = MongoCommandMetrics()
@@ -0,0 +1,162 @@
+"""
+Navigation analytics: page transition counts and session path prefixes.
+
+Transitions are counted as events stream through the sessionizer and are
+flushed as batched $inc upserts into a sparse from/to matrix. When a
+session closes, every prefix of its page path is counted as well, so a
+strict funnel is a single keyed lookup per step. The prefix documents
+that end a session (terminal > 0) double as the distinct complete paths,
+and ordered funnels walk the ones that contain the first step, found
+through the multikey index on path. Neither touches interactions.
+
+Only the first MAX_PATH_DEPTH pages of a session are kept: longer
+sessions count as ending there, and funnels take at most that many steps.
+"""
+
+import os
+import threading
+import time
+
+from pymongo import UpdateOne
+from utils.database import get_collection
+
+
+FLUSH_INTERVAL = float(os.getenv('NAVIGATION_FLUSH_INTERVAL', 10))
+MAX_PATH_DEPTH = int(os.getenv('NAVIGATION_MAX_PATH_DEPTH', 10))
+
+ENTRANCE = '(entrance)'
+EXIT = '(exit)'
+PATH_SEPARATOR = '\x1f'
+
+
+def path_key(pages):
+    return PATH_SEPARATOR.join(pages)
+
+
+def steps_reached(path, steps):
+    """How many of the steps the path visits in order, gaps allowed."""
+    reached = 0
+    for page in path:
+        if reached < len(steps) and page == steps[reached]:
+            reached += 1
+    return reached
+
+
+class NavigationIndex:
+    def __init__(self, flush_interval=FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+
+        self._transitions = {}
+        self._prefixes = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.time()
+
+    def on_page_transition(self, source, target):
+        with self._lock:
+            key = (source, target)
+            self._transitions[key] = self._transitions.get(key, 0) + 1
+
+    def on_session_closed(self, path, last_page=None):
+        if last_page:
+            self.on_page_transition(last_page, EXIT)
+
+        path = path[:MAX_PATH_DEPTH]
+        with self._lock:
+            for depth in range(1, len(path) + 1):
+                key = path_key(path[:depth])
+                counts = self._prefixes.setdefault(key, {'path': path[:depth], 'count': 0, 'terminal': 0})
+                counts['count'] += 1
+                if depth == len(path):
+                    counts['terminal'] += 1
+
+    def maintain(self, now=None):
+        now = now or time.time()
+        if now - self._last_flush >= self.flush_interval:
+            self.flush(now)
+
+    def flush(self, now=None):
+        with self._lock:
+            transitions, self._transitions = self._transitions, {}
+            prefixes, self._prefixes = self._prefixes, {}
+            self._last_flush = now or time.time()
+
+        try:
+            if transitions:
+                get_collection('page_transitions').bulk_write([
+                    UpdateOne(
+                        {'from': source, 'to': target},
+                        {'$inc': {'count': count}},
+                        upsert=True
+                    )
+                    for (source, target), count in transitions.items()
+                ], ordered=False)
+
+            if prefixes:
+                get_collection('path_prefixes').bulk_write([
+                    UpdateOne(
+                        {'_id': key},
+                        {
+                            '$setOnInsert': {'path': counts['path'], 'depth': len(counts['path'])},
+                            '$inc': {'count': counts['count'], 'terminal': counts['terminal']}
+                        },
+                        upsert=True
+                    )
+                    for key, counts in prefixes.items()
+                ], ordered=False)
+        except Exception as e:
+            print(f"Error flushing navigation counts: {e}")
+            # Put the counts back so they are retried on the next flush
+            with self._lock:
+                for key, count in transitions.items():
+                    self._transitions[key] = self._transitions.get(key, 0) + count
+                for key, counts in prefixes.items():
+                    pending = self._prefixes.setdefault(key, {'path': counts['path'], 'count': 0, 'terminal': 0})
+                    pending['count'] += counts['count']
+                    pending['terminal'] += counts['terminal']
+
+    def next_pages(self, page, limit=10):
+        transitions = get_collection('page_transitions')
+        results = list(transitions.find(
+            {'from': page},
+            {'_id': 0, 'to': 1, 'count': 1}
+        ).sort('count', -1).limit(limit))
+
+        total = sum(r['count'] for r in results)
+        return [
+            {
+                'page': r['to'],
+                'count': r['count'],
+                'share': round(r['count'] / total * 100, 2) if total > 0 else 0
+            }
+            for r in results
+        ]
+
+    def strict_funnel(self, steps):
+        """Sessions whose path starts with the steps, in order and without detours."""
+        steps = steps[:MAX_PATH_DEPTH]
+        keys = [path_key(steps[:depth]) for depth in range(1, len(steps) + 1)]
+
+        counts = {
+            doc['_id']: doc['count']
+            for doc in get_collection('path_prefixes').find({'_id': {'$in': keys}}, {'count': 1})
+        }
+        return [counts.get(key, 0) for key in keys]
+
+    def ordered_funnel(self, steps):
+        """Sessions that visit the steps in order, with any pages in between."""
+        steps = steps[:MAX_PATH_DEPTH]
+        counts = [0] * len(steps)
+        if not steps:
+            return counts
+
+        paths = get_collection('path_prefixes').find(
+            {'path': steps[0], 'terminal': {'$gt': 0}},
+            {'_id': 0, 'path': 1, 'terminal': 1}
+        )
+        for doc in paths:
+            for depth in range(steps_reached(doc['path'], steps)):
+                counts[depth] += doc['terminal']
+        return counts
+
+
+navigation_index = NavigationIndex()
@@ -0,0 +1,232 @@
+"""
+Columnar aggregation of Reddit posts for the social dashboard.
+
+Posts are turned into NumPy columns once: engagement, hour of day,
+dictionary-encoded subreddit and sentiment. Totals, hourly engagement and
+the top-post selections are then array operations. Dashboard entries are
+only materialised for the handful of posts that are actually shown.
+Columns can be built from fetched RedditPosts or straight from the
+reddit_posts store, which scales the same aggregation to the whole post
+history.
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import chain
+
+import numpy as np
+
+from models.reddit_post import RedditPost
+from utils.database import get_collection
+
+
+SENTIMENTS = ['positive', 'neutral', 'negative']
+SENTIMENT_CODES = {name: code for code, name in enumerate(SENTIMENTS)}
+
+TOP_POSTS = 20
+VIRAL_POSTS = 5
+OPTIMAL_HOURS = 8
+TOP_PLATFORMS = 6
+TOP_HASHTAGS = 10
+
+DEFAULT_HASHTAGS = ['WomensFootball', 'WSL', 'NWSL', 'UWCL', 'Lionesses',
+                    'WomensSoccer', 'WomenInSports', 'GirlsFootball']
+
+DEFAULT_OPTIMAL_TIMES = [
+    {'hour': 18, 'avgEngagement': 500, 'postCount': 15},
+    {'hour': 19, 'avgEngagement': 450, 'postCount': 12},
+    {'hour': 20, 'avgEngagement': 420, 'postCount': 14},
+    {'hour': 12, 'avgEngagement': 380, 'postCount': 10},
+    {'hour': 17, 'avgEngagement': 350, 'postCount': 11},
+    {'hour': 21, 'avgEngagement': 320, 'postCount': 9},
+]
+
+STORE_PROJECTION = {
+    'score': 1, 'num_comments': 1, 'num_crossposts': 1, 'created_utc': 1,
+    'subreddit': 1, 'sentiment': 1, 'hashtags': 1
+}
+
+
+class PostColumns:
+    def __init__(self, ids, score, comments, crossposts, created, subreddits, sentiment, hashtags, load_posts):
+        self.ids = ids
+        self.score = score
+        self.comments = comments
+        self.crossposts = crossposts
+        self.created = created
+        self.subreddits = subreddits
+        self.sentiment = sentiment
+        self.hashtags = hashtags
+        # load_posts(indices) -> RedditPosts for the rows that get displayed
+        self.load_posts = load_posts
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def from_posts(posts, analyzer, comments=None):
+        """Columns for fetched posts; analyzer supplies hashtags and sentiment.
+
+        comments maps post ids to comment texts that are scored with the post.
+        """
+        comments = comments or {}
+        hashtags = []
+        sentiment = np.empty(len(posts), dtype=np.int8)
+        for i, post in enumerate(posts):
+            full_text = f"{post.title} {post.selftext}"
+            hashtags.append(analyzer.extract_hashtags(full_text))
+            if post.id in comments:
+                full_text = ' '.join([full_text, *comments[post.id]])
+            sentiment[i] = SENTIMENT_CODES[analyzer.analyze_sentiment(full_text, post.score, post.num_comments)]
+
+        return PostColumns(
+            ids=[post.id for post in posts],
+            score=np.fromiter((post.score for post in posts), dtype=np.int64, count=len(posts)),
+            comments=np.fromiter((post.num_comments for post in posts), dtype=np.int64, count=len(posts)),
+            crossposts=np.fromiter((post.num_crossposts for post in posts), dtype=np.int64, count=len(posts)),
+            created=np.fromiter((post.created_utc for post in posts), dtype=np.float64, count=len(posts)),
+            subreddits=[post.subreddit or post.source_subreddit or 'unknown' for post in posts],
+            sentiment=sentiment,
+            hashtags=hashtags,
+            load_posts=lambda indices: [posts[i] for i in indices]
+        )
+
+    @staticmethod
+    def from_store(days=None, batch_size=5000):
+        """Columns for every stored post, optionally only those created in the last `days`."""
+        query = {}
+        if days:
+            query['created_utc'] = {'$gte': (datetime.utcnow() - timedelta(days=days)).timestamp()}
+
+        ids, score, comments, crossposts, created, subreddits, sentiment, hashtags = ([] for _ in range(8))
+        cursor = get_collection('reddit_posts').find(query, STORE_PROJECTION).sort('_id', 1).batch_size(batch_size)
+        for doc in cursor:
+            ids.append(doc['_id'])
+            score.append(doc.get('score', 0))
+            comments.append(doc.get('num_comments', 0))
+            crossposts.append(doc.get('num_crossposts', 0))
+            created.append(doc.get('created_utc', 0))
+            subreddits.append(doc.get('subreddit') or 'unknown')
+            sentiment.append(SENTIMENT_CODES.get(doc.get('sentiment'), SENTIMENT_CODES['neutral']))
+            hashtags.append(doc.get('hashtags') or [])
+
+        def load_posts(indices):
+            wanted = [ids[i] for i in indices]
+            docs = {doc['_id']: doc for doc in get_collection('reddit_posts').find({'_id': {'$in': wanted}})}
+            return [RedditPost.from_dict(dict(docs.get(post_id, {}), id=post_id)) for post_id in wanted]
+
+        return PostColumns(
+            ids=ids,
+            score=np.asarray(score, dtype=np.int64),
+            comments=np.asarray(comments, dtype=np.int64),
+            crossposts=np.asarray(crossposts, dtype=np.int64),
+            created=np.asarray(created, dtype=np.float64),
+            subreddits=subreddits,
+            sentiment=np.asarray(sentiment, dtype=np.int8),
+            hashtags=hashtags,
+            load_posts=load_posts
+        )
+
+
+def top_k(values, k):
+    """Indices of the k largest values, largest first, ties in original order."""
+    if len(values) <= k:
+        return np.argsort(-values, kind='stable')
+    threshold = np.partition(values, len(values) - k)[len(values) - k]
+    candidates = np.flatnonzero(values >= threshold)
+    return candidates[np.argsort(-values[candidates], kind='stable')][:k]
+
+
+def _ranked_counts(labels, limit):
+    """(label, count) pairs by count, ties in order of first appearance, like Counter.most_common."""
+    uniques, first, counts = np.unique(np.asarray(labels, dtype=object), return_index=True, return_counts=True)
+    order = np.lexsort((first, -counts))[:limit]
+    return [(uniques[i], int(counts[i])) for i in order]
+
+
+def _dashboard_post(post, engagement, sentiment):
+    title = post.title
+    full_text = f"{title} {post.selftext}"
+    subreddit = post.subreddit or post.source_subreddit or 'unknown'
+    return {
+        'id': post.id,
+        'text': title[:200] + ('...' if len(title) > 200 else ''),
+        'fullText': full_text[:500],
+        'platform': f"Reddit (r/{subreddit})",
+        'author': f"u/{post.author}",
+        'likes': post.score,
+        'comments': post.num_comments,
+        'shares': post.num_crossposts,
+        'engagement': int(engagement),
+        'sentiment': SENTIMENTS[sentiment],
+        'timestamp': datetime.utcfromtimestamp(post.created_utc).isoformat() if post.created_utc else None,
+        'url': f"https://reddit.com{post.permalink}"
+    }
+
+
+def aggregate_posts(columns):
+    """Dashboard aggregate for the posts in columns (assumed non-empty and de-duplicated)."""
+    n = len(columns)
+    engagement = columns.score + columns.comments * 2  # Comments weighted more
+    avg_engagement = float(engagement.mean())
+
+    # Hour of day for posts with a creation time
+    dated = columns.created > 0
+    hours = (columns.created[dated] // 3600 % 24).astype(np.int64)
+    hour_engagement = np.bincount(hours, weights=engagement[dated], minlength=24)
+    hour_posts = np.bincount(hours, minlength=24)
+    active_hours = np.flatnonzero(hour_posts)
+    best_hours = active_hours[np.argsort(-hour_engagement[active_hours], kind='stable')][:OPTIMAL_HOURS]
+    optimal_times = [
+        {
+            'hour': int(hour),
+            'avgEngagement': int(hour_engagement[hour] // hour_posts[hour]),
+            'postCount': int(hour_posts[hour])
+        }
+        for hour in best_hours
+    ] or DEFAULT_OPTIMAL_TIMES
+
+    sentiment_counts = np.bincount(columns.sentiment, minlength=len(SENTIMENTS))
+    sentiment_data = {
+        name: round(int(sentiment_counts[code]) / n * 100) for code, name in enumerate(SENTIMENTS)
+    }
+
+    hashtag_counts = Counter(chain.from_iterable(columns.hashtags))
+    trending_hashtags = [
+        {'hashtag': tag, 'engagement': count * 100, 'posts': count}
+        for tag, count in hashtag_counts.most_common(TOP_HASHTAGS)
+    ]
+    if len(trending_hashtags) < 5:
+        for tag in DEFAULT_HASHTAGS:
+            if not any(h['hashtag'].lower() == tag.lower() for h in trending_hashtags):
+                trending_hashtags.append({'hashtag': tag, 'engagement': n * 50, 'posts': n // 2})
+            if len(trending_hashtags) >= TOP_HASHTAGS:
+                break
+
+    platform_distribution = [
+        {'platform': f"r/{subreddit}", 'count': count}
+        for subreddit, count in _ranked_counts(columns.subreddits, TOP_PLATFORMS)
+    ]
+
+    top = top_k(engagement, TOP_POSTS)
+    top_posts = [
+        _dashboard_post(post, engagement[i], columns.sentiment[i])
+        for i, post in zip(top, columns.load_posts(top))
+    ]
+    viral_posts = [post for post in top_posts[:VIRAL_POSTS] if post['engagement'] > avg_engagement * 2]
+
+    return {
+        'totalPosts': n,
+        'totalLikes': int(columns.score.sum()),
+        'totalComments': int(columns.comments.sum()),
+        'totalShares': int(columns.crossposts.sum()),
+        'avgEngagement': round(avg_engagement),
+        'sentiment': sentiment_data,
+        'trendingHashtags': trending_hashtags,
+        'viralPosts': viral_posts,
+        'recentPosts': top_posts,
+        'optimalTimes': optimal_times,
+        'platformDistribution': platform_distribution,
+        'dataSource': 'Reddit API',
+        'lastUpdated': datetime.utcnow().isoformat()
+    }
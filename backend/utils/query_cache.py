@@ -0,0 +1,206 @@
+"""
+Bounded LRU + TTL cache for results of slow lookups.
+
+Concurrent misses for the same key are coalesced, so only one caller
+computes the value while the others wait for it (single flight). Failures
+are cached too, for a shorter time, so a broken upstream is not hammered
+with the same request over and over. An optional second tier in MongoDB
+lets all worker processes share results.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from utils.database import get_collection
+from utils.metrics import cache_requests
+
+
+class CachedFailure(Exception):
+    """Raised on a hit for a key whose last computation failed."""
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class QueryCache:
+    def __init__(self, name, max_entries=256, ttl=300, negative_ttl=30, shared=False,
+                 encode=None, decode=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.shared = shared
+        # Conversions to and from BSON-friendly values for the shared tier
+        self.encode = encode or (lambda value: value)
+        self.decode = decode or (lambda value: value)
+
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute, refresh=False):
+        """Return the cached value for key, computing it at most once at a time.
+
+        With refresh=True the cached value is ignored but the new one is stored.
+        Raises CachedFailure while a recent failure for key is cached, and the
+        original exception to the caller whose computation failed.
+        """
+        with self._lock:
+            if not refresh:
+                entry = self._lookup(key)
+                if entry is not None:
+                    return self._unwrap(entry)
+
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                cache_requests.inc(self.name, 'coalesced')
+                leader = False
+            else:
+                flight = self._flights[key] = _Flight()
+                leader = True
+                self.misses += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise CachedFailure(str(flight.error))
+            return flight.value
+
+        try:
+            if not refresh:
+                entry = self._shared_lookup(key)
+                if entry is not None:
+                    cache_requests.inc(self.name, 'shared_hit')
+                    with self._lock:
+                        self.shared_hits += 1
+                        self._store(key, entry)
+                    flight.value = entry[1]
+                    if entry[2]:
+                        flight.error = CachedFailure('cached failure')
+                    return self._unwrap(entry)
+
+            cache_requests.inc(self.name, 'miss')
+            try:
+                flight.value = compute()
+            except Exception as e:
+                flight.error = e
+                self.put(key, None, negative=True)
+                raise
+            self.put(key, flight.value)
+            return flight.value
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def peek(self, key):
+        """This process's cached value for key, or None; never computes or reads the shared tier."""
+        with self._lock:
+            entry = self._lookup(key, count=False)
+        return self._unwrap(entry) if entry is not None else None
+
+    def put(self, key, value, negative=False):
+        entry = (time.time() + (self.negative_ttl if negative else self.ttl), value, negative)
+        with self._lock:
+            self._store(key, entry)
+        self._shared_store(key, entry)
+
+    def _lookup(self, key, count=True):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        if not count:
+            return entry
+        if entry[2]:
+            self.negative_hits += 1
+            cache_requests.inc(self.name, 'negative_hit')
+        else:
+            self.hits += 1
+            cache_requests.inc(self.name, 'hit')
+        return entry
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    @staticmethod
+    def _unwrap(entry):
+        if entry[2]:
+            raise CachedFailure('cached failure')
+        return entry[1]
+
+    def _shared_lookup(self, key):
+        if not self.shared:
+            return None
+        try:
+            doc = get_collection('query_cache').find_one({'_id': f"{self.name}:{key}"})
+        except Exception as e:
+            print(f"Error reading shared query cache: {e}")
+            return None
+        if not doc or doc['expires_at'] <= datetime.utcnow():
+            return None
+        remaining = (doc['expires_at'] - datetime.utcnow()).total_seconds()
+        value = doc.get('value')
+        return (time.time() + remaining, self.decode(value) if value is not None else None,
+                doc.get('negative', False))
+
+    def _shared_store(self, key, entry):
+        if not self.shared:
+            return
+        expires_at = datetime.utcnow() + timedelta(seconds=max(0, entry[0] - time.time()))
+        try:
+            get_collection('query_cache').replace_one(
+                {'_id': f"{self.name}:{key}"},
+                {
+                    'value': self.encode(entry[1]) if entry[1] is not None else None,
+                    'negative': entry[2],
+                    'expires_at': expires_at
+                },
+                upsert=True
+            )
+        except Exception as e:
+            print(f"Error writing shared query cache: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                'name': self.name,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'negative_ttl': self.negative_ttl,
+                'shared': self.shared,
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'hit_rate': round((self.hits + self.negative_hits) / lookups * 100, 2) if lookups else 0
+            }
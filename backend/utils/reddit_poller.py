@@ -0,0 +1,266 @@
+"""
+Background poller that keeps the Reddit dashboard cache warm.
+
+Every subreddit and search term in RedditService is polled on its own
+schedule. A source that keeps producing new posts is polled more often and
+a quiet one less often, and no source is polled faster than the remaining
+X-Ratelimit budget allows until it resets. After each round the dashboard
+aggregate is rebuilt into social_cache, so dashboard requests only ever
+read from Mongo. A worker that has just taken the lease leaves the cache
+alone until it has polled every source once, so it never replaces a full
+aggregate with one built from the first few sources.
+
+Only the worker holding the poller lease talks to Reddit. The others read
+the shared cache and can ask for an early refresh through it.
+"""
+
+import heapq
+import os
+import threading
+import time
+from datetime import datetime
+
+from utils.circuit_breaker import OPEN
+from utils.database import get_collection
+from utils.leases import Lease
+from utils.search_index import search_index
+
+
+ENABLED = os.getenv('REDDIT_POLLER_ENABLED', '1') == '1'
+BASE_INTERVAL = float(os.getenv('REDDIT_POLL_INTERVAL', 300))
+MIN_INTERVAL = float(os.getenv('REDDIT_POLL_MIN_INTERVAL', 60))
+MAX_INTERVAL = float(os.getenv('REDDIT_POLL_MAX_INTERVAL', 1800))
+
+# The cached aggregate expires after 5 minutes (TTL index), so it is
+# rewritten well before that even when no source has changed
+CACHE_REWRITE_INTERVAL = 120
+LOOP_INTERVAL = 5
+STARTUP_STAGGER = 0.5
+
+REFRESH_REQUEST = 'reddit_refresh_request'
+
+
+class SourceSchedule:
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.interval = BASE_INTERVAL
+        self.next_due = 0
+        self.seen_ids = set()
+        self.posts = []
+
+        self.polls = 0
+        self.last_polled = None
+        self.last_new_posts = 0
+
+    def record(self, posts):
+        """Store a poll result and adapt the interval to how many posts were new."""
+        ids = {post.id for post in posts if post.id}
+        new_posts = len(ids - self.seen_ids) if self.polls else 0
+
+        if self.polls:
+            if new_posts:
+                # Busy source: poll sooner, more so the more it produced
+                self.interval *= 0.5 if new_posts >= 5 else 0.75
+            else:
+                self.interval *= 1.5
+            self.interval = min(MAX_INTERVAL, max(MIN_INTERVAL, self.interval))
+
+        # An empty answer is usually a fallback during an outage; keep the old posts
+        if posts:
+            self.posts = posts
+            self.seen_ids = ids
+        self.polls += 1
+        self.last_polled = time.time()
+        self.last_new_posts = new_posts
+        return new_posts
+
+    def state(self):
+        return {
+            'kind': self.kind,
+            'name': self.name,
+            'interval_seconds': round(self.interval),
+            'next_poll_in_seconds': round(max(0, self.next_due - time.time())),
+            'polls': self.polls,
+            'posts': len(self.posts),
+            'last_new_posts': self.last_new_posts,
+            'last_polled': datetime.utcfromtimestamp(self.last_polled).isoformat() if self.last_polled else None
+        }
+
+
+class RedditPoller:
+    def __init__(self, service=None):
+        self._service = service
+        self._sources = None
+
+        self._queue = []
+        self._lease = None
+        self._thread = None
+        self._leader = False
+        self._last_cache_write = 0
+        self._last_refresh_request = None
+        self._unpolled = set()
+
+    @property
+    def service(self):
+        # Bound on first use, so importing the poller does not load the Reddit client
+        if self._service is None:
+            from reddit_service import reddit_service
+            self._service = reddit_service
+        return self._service
+
+    @property
+    def sources(self):
+        if self._sources is None:
+            self._sources = [SourceSchedule(kind, name) for kind, name in self.service.sources()]
+        return self._sources
+
+    def start(self):
+        """Start the polling thread. Call once per worker process, after fork."""
+        if not ENABLED or self._thread is not None:
+            return
+
+        self._lease = Lease('reddit_poller', ttl=60)
+        self._thread = threading.Thread(target=self._run, name='reddit-poller', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                if self._lease.acquire():
+                    if not self._leader:
+                        self._become_leader()
+                    self._check_refresh_request()
+                    self.poll_due()
+                elif self._leader:
+                    self._leader = False
+                    print("⚠ Reddit poller lease lost")
+            except Exception as e:
+                print(f"Error in Reddit poller loop: {e}")
+
+            time.sleep(self._sleep_time())
+
+    def _become_leader(self):
+        self._leader = True
+        request = get_collection('social_cache').find_one({'type': REFRESH_REQUEST})
+        self._last_refresh_request = request['cached_at'] if request else None
+
+        # Pre-warm: every source is due straight away, lightly staggered
+        now = time.time()
+        self._queue = []
+        self._unpolled = set(range(len(self.sources)))
+        for index, source in enumerate(self.sources):
+            source.next_due = now + index * STARTUP_STAGGER
+            heapq.heappush(self._queue, (source.next_due, index))
+        print(f"✓ Reddit poller lease acquired, polling {len(self.sources)} sources")
+
+    def _sleep_time(self):
+        if not self._leader or not self._queue:
+            return LOOP_INTERVAL
+        return min(LOOP_INTERVAL, max(0.1, self._queue[0][0] - time.time()))
+
+    def poll_due(self, now=None):
+        """Poll every source whose turn has come, then refresh the cached aggregate."""
+        now = now or time.time()
+        polled = 0
+        changed = False
+
+        while self._queue and self._queue[0][0] <= now:
+            # A round over many slow sources can outlast the lease, so renew as we go
+            if self._lease is not None and not self._lease.acquire():
+                break
+            _, index = heapq.heappop(self._queue)
+            source = self.sources[index]
+            posts = self.service.fetch_source(source.kind, source.name)
+            new_posts = source.record(posts)
+            search_index.store_posts(posts)
+            changed = changed or new_posts > 0 or index in self._unpolled
+            self._unpolled.discard(index)
+            polled += 1
+
+            source.next_due = time.time() + self._next_interval(source)
+            heapq.heappush(self._queue, (source.next_due, index))
+
+        if self._unpolled:
+            # Keep serving the previous leader's aggregate until this round has every source
+            return polled
+        if changed or time.time() - self._last_cache_write > CACHE_REWRITE_INTERVAL:
+            self.write_cache()
+        return polled
+
+    def _next_interval(self, source):
+        from reddit_service import RATE_LIMIT_RESERVE
+
+        interval = source.interval
+
+        breaker = self.service.breakers.get(
+            f"r/{source.name}" if source.kind == 'subreddit' else 'search'
+        )
+        if breaker is not None and breaker.state == OPEN:
+            interval = max(interval, breaker.open_until - time.time())
+
+        remaining = self.service.rate_limit.get('remaining')
+        reset_at = self.service.rate_limit.get('reset_at')
+        if remaining is not None and reset_at and reset_at > time.time():
+            until_reset = reset_at - time.time()
+            spendable = remaining - RATE_LIMIT_RESERVE
+            if spendable < 1:
+                interval = max(interval, until_reset)
+            else:
+                # Spread what is left of the budget over all sources until the reset
+                interval = max(interval, until_reset * len(self.sources) / spendable)
+
+        return interval
+
+    def write_cache(self):
+        posts = [post for source in self.sources for post in source.posts]
+        if not posts:
+            return
+        data = self.service.build_social_data(posts)
+        data['sources'] = len([s for s in self.sources if s.posts])
+        get_collection('social_cache').update_one(
+            {'type': 'reddit_data'},
+            {
+                '$set': {
+                    'type': 'reddit_data',
+                    'data': data,
+                    'cached_at': datetime.utcnow()
+                }
+            },
+            upsert=True
+        )
+        self._last_cache_write = time.time()
+        print(f"✓ Reddit cache refreshed with {data.get('totalPosts', 0)} posts")
+
+    def request_refresh(self):
+        """Ask whichever worker is polling to poll every source now."""
+        get_collection('social_cache').update_one(
+            {'type': REFRESH_REQUEST},
+            {'$set': {'type': REFRESH_REQUEST, 'cached_at': datetime.utcnow()}},
+            upsert=True
+        )
+
+    def _check_refresh_request(self):
+        request = get_collection('social_cache').find_one({'type': REFRESH_REQUEST})
+        if not request or request['cached_at'] == self._last_refresh_request:
+            return
+        self._last_refresh_request = request['cached_at']
+
+        now = time.time()
+        self._queue = []
+        for index, source in enumerate(self.sources):
+            source.next_due = min(source.next_due, now + index * STARTUP_STAGGER)
+            heapq.heappush(self._queue, (source.next_due, index))
+        print("🔄 Reddit refresh requested, polling all sources")
+
+    def state(self):
+        return {
+            'enabled': ENABLED,
+            'leader': self._leader,
+            'last_cache_write': datetime.utcfromtimestamp(self._last_cache_write).isoformat()
+            if self._last_cache_write else None,
+            'sources': [source.state() for source in self.sources]
+        }
+
+
+reddit_poller = RedditPoller()
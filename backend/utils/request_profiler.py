@@ -0,0 +1,223 @@
+"""
+On-demand profiling of single requests.
+
+A request is profiled when it carries the admin token (X-Profile header or
+__profile query parameter equal to PROFILE_TOKEN), or when it falls in the
+PROFILE_SAMPLE_RATE share of traffic. While it runs, a sampling thread
+records the handler thread's stack every PROFILE_INTERVAL_MS, MongoDB
+command time and JSON encoding time are added up, and the response gets a
+Server-Timing header:
+
+    Server-Timing: db;dur=12.1, serialize;dur=3.4, handler;dur=20.2, total;dur=35.7
+
+The stack samples are written as a collapsed-stack file (one
+"frame;frame;frame count" line per stack, as read by flamegraph.pl and
+speedscope) into PROFILE_DIR, which keeps only the newest
+PROFILE_MAX_FILES. With no token and no sample rate nothing is installed.
+"""
+
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from pymongo import monitoring
+
+
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')
+SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+INTERVAL = float(os.getenv('PROFILE_INTERVAL_MS', 2)) / 1000
+PROFILE_DIR = os.getenv('PROFILE_DIR', '/tmp/wmd-profiles')
+MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 50))
+ENABLED = bool(PROFILE_TOKEN) or SAMPLE_RATE > 0
+
+_local = threading.local()
+
+# A busy thread only hands over the GIL every switch interval (5 ms by
+# default), which would starve the sampler; it is shortened while any
+# profile is running
+_active_profiles = 0
+_saved_switch_interval = None
+_switch_lock = threading.Lock()
+
+
+class _RequestProfile:
+    def __init__(self, thread_id):
+        self.started = time.perf_counter()
+        self.db = 0.0
+        self.serialize = 0.0
+        self.sampler = _StackSampler(thread_id)
+
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's stack at a fixed interval until stopped."""
+
+    _labels = {}
+
+    def __init__(self, thread_id):
+        super().__init__(name='request-profiler', daemon=True)
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def start(self):
+        global _active_profiles, _saved_switch_interval
+        with _switch_lock:
+            if _active_profiles == 0:
+                _saved_switch_interval = sys.getswitchinterval()
+                sys.setswitchinterval(min(_saved_switch_interval, INTERVAL / 2))
+            _active_profiles += 1
+        super().start()
+
+    def run(self):
+        while not self._stopped.wait(INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    @classmethod
+    def _label(cls, code):
+        label = cls._labels.get(code)
+        if label is None:
+            label = cls._labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def stop(self):
+        global _active_profiles
+        self._stopped.set()
+        self.join()
+        with _switch_lock:
+            _active_profiles -= 1
+            if _active_profiles == 0:
+                sys.setswitchinterval(_saved_switch_interval)
+        return self.stacks
+
+
+class MongoTimer(monitoring.CommandListener):
+    """Adds MongoDB command time to the profile of the request running on this thread."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        profile = getattr(_local, 'profile', None)
+        if profile is not None:
+            profile.db += event.duration_micros / 1e6
+
+    def failed(self, event):
+        self.succeeded(event)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        profile = getattr(_local, 'profile', None)
+        if profile is None:
+            return super().dumps(obj, **kwargs)
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            profile.serialize += time.perf_counter() - started
+
+
+def _wants_profile():
+    if PROFILE_TOKEN:
+        supplied = request.headers.get('X-Profile') or request.args.get('__profile')
+        if supplied and hmac.compare_digest(supplied, PROFILE_TOKEN):
+            return True
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+def _start_profile():
+    if not _wants_profile():
+        return
+    profile = _RequestProfile(threading.get_ident())
+    profile.sampler.start()
+    _local.profile = profile
+
+
+def _finish_profile(response):
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        return response
+    _local.profile = None
+
+    stacks = profile.sampler.stop()
+    total = time.perf_counter() - profile.started
+    handler = max(0.0, total - profile.db - profile.serialize)
+    response.headers['Server-Timing'] = ', '.join(
+        f"{name};dur={seconds * 1000:.1f}" for name, seconds in
+        (('db', profile.db), ('serialize', profile.serialize), ('handler', handler), ('total', total))
+    )
+
+    try:
+        filename = write_profile(stacks, request.method, request.url_rule.rule if request.url_rule else 'unmatched')
+        if filename:
+            response.headers['X-Profile-File'] = filename
+    except OSError as e:
+        print(f"Error writing request profile: {e}")
+    return response
+
+
+def _discard_profile(error=None):
+    # Requests that end in an unhandled exception never reach after_request
+    profile = getattr(_local, 'profile', None)
+    if profile is not None:
+        _local.profile = None
+        profile.sampler.stop()
+
+
+def write_profile(stacks, method, route):
+    if not stacks:
+        return None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+    filename = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}_{method}_{slug}_{os.getpid()}.folded"
+    with open(os.path.join(PROFILE_DIR, filename), 'w') as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+    # Keep the ring bounded: the oldest files go first
+    profiles = list_profiles()
+    for old in profiles[MAX_FILES:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, old['name']))
+        except OSError:
+            pass
+    return filename
+
+
+def list_profiles():
+    """Profile files, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        if name.endswith('.folded'):
+            path = os.path.join(PROFILE_DIR, name)
+            profiles.append({'name': name, 'bytes': os.path.getsize(path), 'modified': os.path.getmtime(path)})
+    return sorted(profiles, key=lambda profile: profile['name'], reverse=True)
+
+
+def install(app):
+    """Profile requests of app on demand. Does nothing unless profiling is configured."""
+    if not ENABLED:
+        return
+    app.json = TimedJSONProvider(app)
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.teardown_request(_discard_profile)
+
+
+mongo_timer = MongoTimer()
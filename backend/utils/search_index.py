@@ -0,0 +1,322 @@
+"""
+In-process full-text index over the Reddit posts we have fetched.
+
+Posts are persisted in the reddit_posts collection as they arrive and each
+worker keeps an inverted index over their titles and selftext. The index
+is loaded from Mongo by a background thread on first use, so searches
+made meanwhile see the posts loaded so far. After that it is caught up by
+fetched_at, re-reading SYNC_OVERLAP seconds each time: a bulk write
+stamps all its posts with one fetched_at and may land after a sync has
+read past it. A post already indexed with the same fetched_at is skipped,
+so the re-read costs no re-indexing. The index survives restarts and
+stays in step with the worker that does the polling.
+
+Ranking is BM25 with titles counted twice. Every query term also matches
+indexed terms that start with it, at a small discount, so partial words
+typed into a search box still find posts.
+"""
+
+import bisect
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from pymongo import UpdateOne
+
+from utils.database import get_collection
+
+
+SYNC_INTERVAL = 10
+SYNC_OVERLAP = 30
+LOAD_BATCH = 1000
+MAX_AGE_DAYS = int(os.getenv('SEARCH_INDEX_MAX_AGE_DAYS', 30))
+MAX_SELFTEXT = 2000
+
+K1 = 1.2
+B = 0.75
+TITLE_WEIGHT = 2
+PREFIX_WEIGHT = 0.8
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_EXPANSIONS = 50
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'he',
+    'in', 'is', 'it', 'its', 'of', 'on', 'or', 'that', 'the', 'to', 'was', 'were',
+    'will', 'with', 's', 't'
+}
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall((text or '').lower()) if token not in STOPWORDS]
+
+
+class SearchIndex:
+    def __init__(self, collection_name='reddit_posts'):
+        self.collection_name = collection_name
+
+        self.docs = {}
+        self.lengths = {}
+        self.postings = {}
+        self.total_length = 0
+        self._terms = []
+        self._terms_dirty = False
+
+        self._loaded = False
+        self._loader = None
+        self._synced_until = None
+        self._last_sync = 0
+        self._lock = threading.RLock()
+
+    @property
+    def collection(self):
+        return get_collection(self.collection_name)
+
+    # -- writing -----------------------------------------------------------
+
+    def store_posts(self, posts):
+        """Persist freshly fetched RedditPosts and index them here."""
+        from reddit_service import reddit_service
+
+        now = datetime.utcnow()
+        documents = []
+        for post in posts:
+            if not post.id:
+                continue
+            full_text = f"{post.title} {post.selftext}"
+            comments = reddit_service.comments.cached_texts(post.id)
+            documents.append({
+                '_id': post.id,
+                'title': post.title,
+                'selftext': post.selftext[:MAX_SELFTEXT],
+                'subreddit': post.subreddit or post.source_subreddit or 'unknown',
+                'score': post.score,
+                'num_comments': post.num_comments,
+                'permalink': post.permalink,
+                'created_utc': post.created_utc,
+                'author': post.author,
+                'num_crossposts': post.num_crossposts,
+                # Text features are derived once here so history aggregates stay columnar
+                'hashtags': reddit_service.extract_hashtags(full_text),
+                'sentiment': reddit_service.analyze_sentiment(
+                    ' '.join([full_text, *comments]) if comments else full_text, post.score, post.num_comments
+                ),
+                'fetched_at': now
+            })
+        if not documents:
+            return 0
+
+        try:
+            self.collection.bulk_write(
+                [UpdateOne({'_id': doc['_id']}, {'$set': doc}, upsert=True) for doc in documents],
+                ordered=False
+            )
+        except Exception as e:
+            print(f"Error storing Reddit posts: {e}")
+
+        with self._lock:
+            for doc in documents:
+                self._add(doc)
+        return len(documents)
+
+    def _add(self, doc):
+        post_id = doc['_id']
+        if post_id in self.docs:
+            indexed_at = self.docs[post_id]['fetched_at']
+            if indexed_at and doc.get('fetched_at') and indexed_at >= doc['fetched_at']:
+                # Already indexed from this write or a newer one
+                return False
+            self._remove(post_id)
+
+        terms = Counter(tokenize(doc.get('title')) * TITLE_WEIGHT + tokenize(doc.get('selftext')))
+        for term, tf in terms.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                self._terms_dirty = True
+            postings[post_id] = tf
+
+        length = sum(terms.values())
+        self.docs[post_id] = {
+            'title': doc.get('title', ''),
+            'subreddit': doc.get('subreddit'),
+            'score': doc.get('score', 0),
+            'num_comments': doc.get('num_comments', 0),
+            'permalink': doc.get('permalink', ''),
+            'fetched_at': doc.get('fetched_at'),
+            'terms': list(terms),
+            'length': length
+        }
+        self.lengths[post_id] = length
+        self.total_length += length
+        return True
+
+    def _remove(self, post_id):
+        doc = self.docs.pop(post_id)
+        del self.lengths[post_id]
+        for term in doc['terms']:
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(post_id, None)
+            if not postings:
+                del self.postings[term]
+                self._terms_dirty = True
+        self.total_length -= doc['length']
+
+    # -- syncing -----------------------------------------------------------
+
+    def sync(self, force=False):
+        """Start loading the index on first use, then pull posts stored since the last sync."""
+        if not self._loaded:
+            self._start_loading()
+            return
+        if not force and time.time() - self._last_sync < SYNC_INTERVAL:
+            return
+        with self._lock:
+            if not force and time.time() - self._last_sync < SYNC_INTERVAL:
+                return
+            self._last_sync = time.time()
+
+            cutoff = datetime.utcnow() - timedelta(days=MAX_AGE_DAYS)
+            since = self._synced_until - timedelta(seconds=SYNC_OVERLAP) if self._synced_until else cutoff
+            try:
+                self._pull(since)
+            except Exception as e:
+                print(f"Error syncing search index: {e}")
+                return
+
+            expired = [post_id for post_id, doc in self.docs.items()
+                       if doc['fetched_at'] and doc['fetched_at'] < cutoff]
+            for post_id in expired:
+                self._remove(post_id)
+
+    def _start_loading(self):
+        with self._lock:
+            # A forked worker inherits the half-built index but not the thread
+            if self._loaded or (self._loader is not None and self._loader.is_alive()):
+                return
+            self._loader = threading.Thread(target=self._load, name='search-index-load', daemon=True)
+            self._loader.start()
+
+    def _load(self):
+        started = time.time()
+        since = datetime.utcnow() - timedelta(days=MAX_AGE_DAYS)
+        if self._synced_until is not None:
+            # Carry on from where a load interrupted by a fork got to
+            since = self._synced_until - timedelta(seconds=SYNC_OVERLAP)
+        try:
+            loaded = self._pull(since, batch=LOAD_BATCH)
+        except Exception as e:
+            print(f"Error loading search index: {e}")
+            return
+        with self._lock:
+            self._loaded = True
+            self._last_sync = time.time()
+        print(f"✓ Search index loaded with {loaded} posts in {time.time() - started:.1f}s")
+
+    def _pull(self, since, batch=None):
+        """Index posts fetched at or after `since`; the lock is held a batch at a time."""
+        cursor = self.collection.find({'fetched_at': {'$gte': since}}).sort('fetched_at', 1)
+        if batch:
+            cursor = cursor.batch_size(batch)
+        added = 0
+        docs = []
+        for doc in cursor:
+            docs.append(doc)
+            if batch and len(docs) >= batch:
+                added += self._add_batch(docs)
+                docs = []
+        return added + self._add_batch(docs)
+
+    def _add_batch(self, docs):
+        if not docs:
+            return 0
+        with self._lock:
+            added = sum(1 for doc in docs if self._add(doc))
+            if self._synced_until is None or docs[-1]['fetched_at'] > self._synced_until:
+                self._synced_until = docs[-1]['fetched_at']
+        return added
+
+    # -- searching ---------------------------------------------------------
+
+    def _expand(self, token):
+        """Indexed terms the query token matches, with their weight."""
+        matches = {}
+        if token in self.postings:
+            matches[token] = 1.0
+        if len(token) >= MIN_PREFIX_LENGTH:
+            if self._terms_dirty:
+                self._terms = sorted(self.postings)
+                self._terms_dirty = False
+            start = bisect.bisect_left(self._terms, token)
+            for term in self._terms[start:start + MAX_PREFIX_EXPANSIONS + 1]:
+                if not term.startswith(token):
+                    break
+                matches.setdefault(term, PREFIX_WEIGHT)
+        return matches
+
+    def search(self, query, limit=30):
+        self.sync()
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        with self._lock:
+            n_docs = len(self.docs)
+            if not n_docs:
+                return []
+            base = K1 * (1 - B)
+            per_length = K1 * B * n_docs / self.total_length if self.total_length else 0
+            lengths = self.lengths
+
+            scores = Counter()
+            for token in tokens:
+                # A post scores once per query token, through its best matching term
+                best = None
+                for term, weight in self._expand(token).items():
+                    postings = self.postings[term]
+                    boost = weight * (K1 + 1) * math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                    term_scores = {
+                        post_id: boost * tf / (tf + base + per_length * lengths[post_id])
+                        for post_id, tf in postings.items()
+                    }
+                    if best is None:
+                        best = term_scores
+                    else:
+                        for post_id, score in term_scores.items():
+                            if score > best.get(post_id, 0):
+                                best[post_id] = score
+                if best:
+                    scores.update(best)
+
+            results = []
+            for post_id, score in scores.most_common(limit):
+                doc = self.docs[post_id]
+                results.append({
+                    'id': post_id,
+                    'title': doc['title'],
+                    'subreddit': doc['subreddit'],
+                    'score': doc['score'],
+                    'comments': doc['num_comments'],
+                    'url': f"https://reddit.com{doc['permalink']}",
+                    'relevance': round(score, 3)
+                })
+            return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                'posts': len(self.docs),
+                'terms': len(self.postings),
+                'avg_length': round(self.total_length / len(self.docs), 1) if self.docs else 0,
+                'loaded': self._loaded,
+                'synced_until': self._synced_until.isoformat() if self._synced_until else None
+            }
+
+
+search_index = SearchIndex()
@@ -0,0 +1,307 @@
+"""
+Derives sessions from the interaction stream using an inactivity gap.
+
+Only open sessions are kept in memory. Closed sessions are written to the
+sessions collection together with rolled-up counters, so session metrics
+are a single document read instead of a scan over interactions.
+
+In "inline" mode (single process) the tracking routes queue events in
+memory and a background thread applies them. In "tail" mode, used with
+several worker processes, the worker holding the sessionizer lease tails
+the interactions collection instead, so all events of a user are seen by
+the same process. Either way the thread also sweeps out stale sessions,
+writes checkpoints and flushes the listeners, so none of that happens
+inside a request and it keeps happening when traffic stops.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from repositories.session_repository import SessionRepository
+from utils.leases import Lease
+from utils.navigation import navigation_index, ENTRANCE, MAX_PATH_DEPTH
+from utils.tailer import CollectionTailer
+
+
+INACTIVITY_GAP = float(os.getenv('SESSION_INACTIVITY_GAP', 1800))
+CHECKPOINT_INTERVAL = float(os.getenv('SESSION_CHECKPOINT_INTERVAL', 60))
+SWEEP_INTERVAL = float(os.getenv('SESSION_SWEEP_INTERVAL', 30))
+MODE = os.getenv('SESSIONIZER_MODE', 'inline')
+MAX_TRACKED_PAGES = 200
+
+LOOP_INTERVAL = 1.0
+BATCH_SIZE = 5000
+TAIL_PROJECTION = {'user_id': 1, 'session_id': 1, 'timestamp': 1, 'page_url': 1, 'metadata.page_url': 1}
+
+
+def get_page(event):
+    page = event.get('page_url')
+    if not page and isinstance(event.get('metadata'), dict):
+        page = event['metadata'].get('page_url')
+    return page
+
+
+class Sessionizer:
+    def __init__(self, repository=None, listeners=None, mode=MODE, gap=INACTIVITY_GAP,
+                 checkpoint_interval=CHECKPOINT_INTERVAL, sweep_interval=SWEEP_INTERVAL):
+        self.repository = repository or SessionRepository()
+        self.listeners = listeners or []
+        self.mode = mode
+        self.gap = gap
+        self.checkpoint_interval = checkpoint_interval
+        self.sweep_interval = sweep_interval
+
+        self._queue = deque()
+        self._open = {}
+        self._dirty = set()
+        self._removed = set()
+        self._lock = threading.Lock()
+        self._restored = False
+        self._last_checkpoint = time.time()
+        self._last_sweep = time.time()
+
+        self._tailer = None
+        self._lease = None
+        self._thread = None
+
+    def observe(self, events):
+        """Entry point for the tracking routes: queues the events in memory; a no-op while tailing."""
+        if self.mode == 'inline':
+            self._queue.extend(events)
+
+    def process_events(self, events):
+        self._ensure_restored()
+
+        closed = []
+        with self._lock:
+            for event in events:
+                closed.extend(self._apply(event))
+
+        if closed:
+            self.repository.save_closed_sessions(closed)
+            if self._tailer is not None:
+                # Persist the cursor past these events so a restart cannot close them twice
+                self.checkpoint()
+
+        self.maintain()
+
+    def _apply(self, event):
+        user_id = event.get('user_id')
+        timestamp = event.get('timestamp')
+        if not user_id or not isinstance(timestamp, (int, float)):
+            return []
+
+        closed = []
+        state = self._open.get(user_id)
+
+        if state is not None:
+            if timestamp - state['last_event_at'] > self.gap:
+                closed.append(self._close(state))
+                state = None
+            elif state['last_event_at'] - timestamp > self.gap:
+                # Late event from a session that has already been closed
+                return closed
+
+        if state is None:
+            state = {
+                'user_id': user_id,
+                'session_id': event.get('session_id'),
+                'started_at': timestamp,
+                'last_event_at': timestamp,
+                'event_count': 0,
+                'pages': [],
+                'path': [],
+                'last_page': None
+            }
+            self._open[user_id] = state
+            self._removed.discard(user_id)
+
+        state['started_at'] = min(state['started_at'], timestamp)
+        state['last_event_at'] = max(state['last_event_at'], timestamp)
+        state['event_count'] += 1
+        if not state['session_id']:
+            state['session_id'] = event.get('session_id')
+
+        page = get_page(event)
+        if page and page not in state['pages'] and len(state['pages']) < MAX_TRACKED_PAGES:
+            state['pages'].append(page)
+
+        last_page = state.get('last_page')
+        if page and page != last_page:
+            for listener in self.listeners:
+                listener.on_page_transition(last_page or ENTRANCE, page)
+            state['last_page'] = page
+            path = state.setdefault('path', [])
+            if len(path) < MAX_PATH_DEPTH:
+                path.append(page)
+
+        self._dirty.add(user_id)
+        return closed
+
+    def _close(self, state):
+        user_id = state['user_id']
+        self._open.pop(user_id, None)
+        self._dirty.discard(user_id)
+        self._removed.add(user_id)
+
+        for listener in self.listeners:
+            listener.on_session_closed(state.get('path', []), state.get('last_page'))
+
+        page_count = len(state['pages'])
+        return {
+            'session_key': f"{user_id}:{int(state['started_at'] * 1000)}",
+            'user_id': user_id,
+            'session_id': state['session_id'],
+            'started_at': datetime.fromtimestamp(state['started_at']),
+            'ended_at': datetime.fromtimestamp(state['last_event_at']),
+            'duration': round(state['last_event_at'] - state['started_at'], 3),
+            'event_count': state['event_count'],
+            'page_count': page_count,
+            'bounce': page_count <= 1,
+            'active': False,
+            'source': 'sessionizer'
+        }
+
+    def sweep(self, now=None):
+        now = now or time.time()
+        cutoff = now - self.gap
+
+        with self._lock:
+            stale = [state for state in self._open.values() if state['last_event_at'] < cutoff]
+            closed = [self._close(state) for state in stale]
+            self._last_sweep = now
+
+        if closed:
+            self.repository.save_closed_sessions(closed)
+        return len(closed)
+
+    def checkpoint(self, now=None):
+        with self._lock:
+            open_sessions = [dict(self._open[user_id], _id=user_id) for user_id in self._dirty]
+            removed = set(self._removed)
+            self._dirty.clear()
+            self._removed.clear()
+            self._last_checkpoint = now or time.time()
+            cursor = self._tailer.state() if self._tailer is not None else None
+
+        if not self.repository.save_checkpoint(open_sessions, removed, cursor):
+            # Keep the changes around so the next checkpoint retries them
+            with self._lock:
+                self._dirty.update(s['user_id'] for s in open_sessions if s['user_id'] in self._open)
+                self._removed.update(removed)
+
+    def maintain(self, now=None):
+        now = now or time.time()
+        if now - self._last_sweep >= self.sweep_interval:
+            self.sweep(now)
+        if now - self._last_checkpoint >= self.checkpoint_interval:
+            self.checkpoint(now)
+        for listener in self.listeners:
+            listener.maintain(now)
+
+    def _ensure_restored(self):
+        if self._restored:
+            return
+
+        with self._lock:
+            if self._restored:
+                return
+            self._restored = True
+            states, cursor = self.repository.load_checkpoint()
+            for state in states:
+                state.pop('_id', None)
+                if state.get('user_id') not in self._open:
+                    self._open[state['user_id']] = state
+            replay_from = None
+            if self._tailer is not None:
+                if cursor and cursor.get('tail_time'):
+                    self._tailer.restore(cursor)
+                    starts = [state['started_at'] for state in self._open.values()]
+                    replay_from = min([cursor['tail_time'], *starts]) - self.gap
+                else:
+                    self._tailer.start_at(time.time())
+
+        if self._open:
+            print(f"✓ Restored {len(self._open)} open sessions from checkpoint")
+        if replay_from is not None:
+            # The previous leader may have stored sessions it never counted; recount the days it could have touched
+            self.repository.rebuild_stats(datetime.fromtimestamp(replay_from))
+
+    def open_session_count(self):
+        with self._lock:
+            return len(self._open)
+
+    def start(self):
+        """Start the background thread. Call once per worker process, after fork."""
+        # A forked worker inherits the thread object but not the thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        if self.mode == 'tail':
+            self._lease = Lease('sessionizer')
+            target = self._run_tail
+        else:
+            target = self._run_inline
+        self._thread = threading.Thread(target=target, name='sessionizer', daemon=True)
+        self._thread.start()
+
+    def _run_inline(self):
+        while True:
+            try:
+                events = [self._queue.popleft() for _ in range(min(len(self._queue), BATCH_SIZE))]
+                if events:
+                    self.process_events(events)
+                else:
+                    self._ensure_restored()
+                    self.maintain()
+            except Exception as e:
+                print(f"Error in sessionizer loop: {e}")
+
+            if len(self._queue) < BATCH_SIZE:
+                time.sleep(LOOP_INTERVAL)
+
+    def _run_tail(self):
+        while True:
+            full_batch = False
+            try:
+                if self._lease.acquire():
+                    if self._tailer is None:
+                        self._become_leader()
+                    events = self._tailer.poll(limit=BATCH_SIZE)
+                    if events:
+                        self.process_events(events)
+                    else:
+                        self.maintain()
+                    full_batch = len(events) >= BATCH_SIZE
+                elif self._tailer is not None:
+                    self._step_down()
+            except Exception as e:
+                print(f"Error in sessionizer tail loop: {e}")
+
+            if not full_batch:
+                time.sleep(LOOP_INTERVAL)
+
+    def _become_leader(self):
+        with self._lock:
+            self._open.clear()
+            self._dirty.clear()
+            self._removed.clear()
+            self._restored = False
+            self._tailer = CollectionTailer('interactions', TAIL_PROJECTION)
+        self._ensure_restored()
+        print("✓ Sessionizer lease acquired, tailing interactions")
+
+    def _step_down(self):
+        # Another worker took over and will resume from the last checkpoint
+        with self._lock:
+            self._open.clear()
+            self._dirty.clear()
+            self._removed.clear()
+            self._tailer = None
+        print("⚠ Sessionizer lease lost")
+
+
+sessionizer = Sessionizer(listeners=[navigation_index])
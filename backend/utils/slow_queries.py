@@ -0,0 +1,305 @@
+"""
+Slow-query capture on top of pymongo command monitoring.
+
+Every command slower than SLOW_QUERY_MS is recorded with its shape (the
+command with literal values replaced by "?"), its duration and how many
+documents it returned. The first time a read shape turns up slow, and at
+most every EXPLAIN_INTERVAL after that, it is re-run with
+explain('executionStats') so the record also carries the winning plan and
+the documents and keys examined. Recording and explaining happen on a
+background thread; the listener itself only queues. Records go to the
+capped slow_queries collection, which /api/admin/slow-queries ranks by
+total time per shape.
+"""
+
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+from pymongo import monitoring
+from pymongo.errors import CollectionInvalid
+
+
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 100))
+ENABLED = SLOW_QUERY_MS > 0
+EXPLAIN_INTERVAL = float(os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL', 600))
+CAPPED_BYTES = int(os.getenv('SLOW_QUERIES_CAPPED_BYTES', 16 * 1024 * 1024))
+QUEUE_SIZE = 200
+
+COLLECTION = 'slow_queries'
+EXPLAINABLE = {'find', 'aggregate', 'count', 'distinct'}
+IGNORED_COMMANDS = {'hello', 'ismaster', 'isMaster', 'saslStart', 'saslContinue', 'authenticate',
+                    'explain', 'getMore', 'killCursors', 'endSessions', 'ping'}
+
+# Driver bookkeeping that is neither part of the query nor accepted by explain
+META_FIELDS = {'$db', 'lsid', '$clusterTime', 'txnNumber', '$readPreference', 'readConcern',
+               'writeConcern', 'autocommit', 'startTransaction', 'apiVersion'}
+
+# Values under these keys describe the query itself, not its parameters
+STRUCTURAL_KEYS = {'sort', 'projection', 'hint', 'key', '$sort', '$project', '$group', '$unwind',
+                   '$lookup', '$replaceRoot', '$addFields', '$set', '$facet', '$bucket', '$count'}
+
+
+def query_shape(value, structural=False):
+    """The command with literal values replaced by "?", keeping keys, operators and field paths."""
+    if isinstance(value, dict):
+        return {key: query_shape(item, structural or key in STRUCTURAL_KEYS) for key, item in value.items()
+                if key not in META_FIELDS}
+    if isinstance(value, (list, tuple)):
+        if not structural and not any(isinstance(item, dict) for item in value):
+            return '?'  # e.g. the values of an $in
+        # Bulk writes repeat the same statement; keep each distinct shape once
+        shapes = []
+        for item in value:
+            shape = query_shape(item, structural)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    if structural or (isinstance(value, str) and value.startswith('$')):
+        return value if isinstance(value, (str, int, float, bool)) or value is None else '?'
+    return '?'
+
+
+def _docs_returned(command_name, reply):
+    if not isinstance(reply, dict):
+        return None
+    cursor = reply.get('cursor')
+    if isinstance(cursor, dict):
+        return len(cursor.get('firstBatch', []))
+    if command_name == 'distinct':
+        return len(reply.get('values', []))
+    return reply.get('n')
+
+
+def _find_key(document, key):
+    """First value for key anywhere in a nested explain document."""
+    if isinstance(document, dict):
+        if key in document:
+            return document[key]
+        children = document.values()
+    elif isinstance(document, list):
+        children = document
+    else:
+        return None
+    for child in children:
+        found = _find_key(child, key)
+        if found is not None:
+            return found
+    return None
+
+
+def _plan_stages(plan):
+    """Winning plan as 'LEAF > ... > ROOT', with the index name on index scans."""
+    stages = []
+    while isinstance(plan, dict):
+        stage = plan.get('stage', '?')
+        if plan.get('indexName'):
+            stage = f"{stage}({plan['indexName']})"
+        stages.append(stage)
+        plan = plan.get('inputStage') or (plan.get('inputStages') or [None])[0] or plan.get('queryPlan')
+    return ' > '.join(reversed(stages))
+
+
+def summarize_explain(explain):
+    winning = _find_key(explain, 'winningPlan') or {}
+    stats = _find_key(explain, 'executionStats') or {}
+    stages = _plan_stages(winning.get('queryPlan', winning))
+    return {
+        'stages': stages,
+        'collscan': 'COLLSCAN' in stages,
+        'docs_examined': stats.get('totalDocsExamined'),
+        'keys_examined': stats.get('totalKeysExamined'),
+        'n_returned': stats.get('nReturned'),
+        'execution_ms': stats.get('executionTimeMillis')
+    }
+
+
+class SlowQueryLog(monitoring.CommandListener):
+    def __init__(self, threshold_ms=SLOW_QUERY_MS, explain_interval=EXPLAIN_INTERVAL):
+        self.threshold_ms = threshold_ms
+        self.explain_interval = explain_interval
+        # Only the started event carries the command; keep it until the command ends
+        self._commands = {}
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._explained = {}
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.explained = 0
+        self.dropped = 0
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        if event.command.get(event.command_name) == COLLECTION:
+            return  # Our own writes and reads
+        self._commands[(event.connection_id, event.request_id)] = (event.command, event.database_name)
+
+    def succeeded(self, event):
+        pending = self._commands.pop((event.connection_id, event.request_id), None)
+        if pending is None or event.duration_micros < self.threshold_ms * 1000:
+            return
+        command, database = pending
+        self._enqueue({
+            'command_name': event.command_name,
+            'command': command,
+            'database': database,
+            'duration_ms': round(event.duration_micros / 1000, 2),
+            'docs_returned': _docs_returned(event.command_name, event.reply),
+            'at': datetime.utcnow()
+        })
+
+    def failed(self, event):
+        self._commands.pop((event.connection_id, event.request_id), None)
+
+    def _enqueue(self, item):
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_thread(self):
+        # Threads do not survive a fork, so each worker process starts its own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='slow-queries', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        from utils.database import get_db
+
+        try:
+            get_db().create_collection(COLLECTION, capped=True, size=CAPPED_BYTES)
+        except CollectionInvalid:
+            pass  # Already there
+        except Exception as e:
+            print(f"⚠ Warning: Could not create {COLLECTION}: {e}")
+
+        while True:
+            item = self._queue.get()
+            try:
+                get_db()[COLLECTION].insert_one(self._record(item))
+                self.recorded += 1
+            except Exception as e:
+                print(f"Error recording slow query: {e}")
+
+    def _record(self, item):
+        command = item['command']
+        target = command.get(item['command_name'])
+        shape = query_shape(command)
+        shape[item['command_name']] = target if isinstance(target, str) else '?'
+        shape_json = json.dumps(shape, default=str)
+        shape_id = hashlib.sha1(shape_json.encode()).hexdigest()[:16]
+        record = {
+            'shape_id': shape_id,
+            # Stored as text: shapes keep operator keys like $gte, which BSON documents cannot hold
+            'shape': shape_json,
+            'collection': target if isinstance(target, str) else '',
+            'command': item['command_name'],
+            'duration_ms': item['duration_ms'],
+            'docs_returned': item['docs_returned'],
+            'at': item['at']
+        }
+        if self._should_explain(shape_id, item):
+            plan = self._explain(item)
+            if plan is not None:
+                record['plan'] = plan
+        return record
+
+    def _should_explain(self, shape_id, item):
+        if item['command_name'] not in EXPLAINABLE:
+            return False
+        if item['command_name'] == 'aggregate' and any(
+                '$out' in stage or '$merge' in stage for stage in item['command'].get('pipeline', [])):
+            return False
+        now = time.time()
+        if now - self._explained.get(shape_id, 0) < self.explain_interval:
+            return False
+        self._explained[shape_id] = now
+        return True
+
+    def _explain(self, item):
+        from utils.database import get_db
+
+        command = {key: value for key, value in item['command'].items() if key not in META_FIELDS}
+        try:
+            explain = get_db().client[item['database']].command(
+                {'explain': command, 'verbosity': 'executionStats'}
+            )
+        except Exception as e:
+            print(f"Error explaining slow {item['command_name']}: {e}")
+            return None
+        self.explained += 1
+        return summarize_explain(explain)
+
+    def stats(self):
+        return {
+            'enabled': ENABLED,
+            'threshold_ms': self.threshold_ms,
+            'explain_interval_seconds': self.explain_interval,
+            'recorded': self.recorded,
+            'explained': self.explained,
+            'dropped': self.dropped,
+            'queued': self._queue.qsize()
+        }
+
+
+def ranked_shapes(hours=24, limit=20):
+    """Slow query shapes of the last `hours`, by total time, each with its latest plan."""
+    from utils.database import get_collection
+
+    collection = get_collection(COLLECTION)
+    since = datetime.utcnow() - timedelta(hours=hours)
+    shapes = list(collection.aggregate([
+        {'$match': {'at': {'$gte': since}}},
+        {'$group': {
+            '_id': '$shape_id',
+            'collection': {'$first': '$collection'},
+            'command': {'$first': '$command'},
+            'shape': {'$first': '$shape'},
+            'count': {'$sum': 1},
+            'total_ms': {'$sum': '$duration_ms'},
+            'max_ms': {'$max': '$duration_ms'},
+            'avg_docs_returned': {'$avg': '$docs_returned'},
+            'last_seen': {'$max': '$at'}
+        }},
+        {'$sort': {'total_ms': -1}},
+        {'$limit': limit}
+    ]))
+
+    plans = {}
+    # Capped collections keep insertion order, so the first plan in reverse is the latest
+    for doc in collection.find(
+            {'shape_id': {'$in': [shape['_id'] for shape in shapes]}, 'plan': {'$exists': True}},
+            {'shape_id': 1, 'plan': 1, 'at': 1}
+    ).sort('$natural', -1):
+        plans.setdefault(doc['shape_id'], dict(doc['plan'], explained_at=doc['at'].isoformat()))
+
+    return [
+        {
+            'shape_id': shape['_id'],
+            'collection': shape['collection'],
+            'command': shape['command'],
+            'shape': json.loads(shape['shape']),
+            'count': shape['count'],
+            'total_ms': round(shape['total_ms'], 1),
+            'avg_ms': round(shape['total_ms'] / shape['count'], 1),
+            'max_ms': shape['max_ms'],
+            'avg_docs_returned': round(shape['avg_docs_returned'], 1) if shape['avg_docs_returned'] is not None else None,
+            'last_seen': shape['last_seen'].isoformat(),
+            'plan': plans.get(shape['_id'])
+        }
+        for shape in shapes
+    ]
+
+
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,74 @@
+"""
+Incremental reader over newly inserted documents, ordered by _id.
+
+ObjectIds from several writers are only roughly ordered, so every poll
+re-reads a short overlap window and skips the ids it has already seen.
+"""
+
+from datetime import datetime
+
+from bson import ObjectId
+
+from utils.database import get_collection
+
+
+OVERLAP_SECONDS = 5
+
+
+class CollectionTailer:
+    def __init__(self, collection_name, projection=None, overlap=OVERLAP_SECONDS):
+        self.collection_name = collection_name
+        self.projection = projection
+        self.overlap = overlap
+
+        self.tail_time = None
+        self.recent_ids = set()
+
+    def start_at(self, timestamp):
+        self.tail_time = timestamp
+        self.recent_ids = set()
+
+    def poll(self, limit=0):
+        if self.tail_time is None:
+            raise RuntimeError("Tailer position not set. Call start_at() first.")
+
+        since = datetime.utcfromtimestamp(max(0, self.tail_time - self.overlap))
+        cursor = get_collection(self.collection_name).find(
+            {'_id': {'$gte': ObjectId.from_datetime(since)}},
+            self.projection
+        ).sort('_id', 1).batch_size(10000)
+        if limit:
+            # Ids already seen in the overlap are skipped, so read that many more
+            cursor = cursor.limit(limit + len(self.recent_ids))
+
+        documents = []
+        seen = []
+        tail_time = self.tail_time
+
+        for doc in cursor:
+            if doc['_id'] in self.recent_ids:
+                continue
+            generated = doc['_id'].generation_time.timestamp()
+            tail_time = max(tail_time, generated)
+            documents.append(doc)
+            seen.append((doc['_id'], generated))
+            if limit and len(documents) >= limit:
+                break
+
+        if seen:
+            overlap_start = tail_time - self.overlap
+            self.recent_ids = {
+                doc_id for doc_id in self.recent_ids
+                if doc_id.generation_time.timestamp() >= overlap_start
+            }
+            self.recent_ids.update(doc_id for doc_id, generated in seen if generated >= overlap_start)
+            self.tail_time = tail_time
+
+        return documents
+
+    def state(self):
+        return {'tail_time': self.tail_time, 'recent_ids': list(self.recent_ids)}
+
+    def restore(self, state):
+        self.tail_time = state.get('tail_time')
+        self.recent_ids = set(state.get('recent_ids', []))
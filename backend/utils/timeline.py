@@ -0,0 +1,195 @@
+"""
+Downsampled per-user activity timelines.
+
+A user's events between two epoch timestamps are counted per bucket and
+event type by a single aggregation on the (user_id, timestamp) index. The
+bucket is the narrowest of a minute, an hour, a day or a whole number of
+days that keeps the range within the requested number of points, so a
+year of history and the last ten minutes both come back as a chart-sized
+series, and no range ever yields more than `points` buckets. Raw events
+are only read once the range is narrow enough for minute buckets.
+
+Buckets are aligned to local time, like the rest of the admin views: each
+event is shifted by the UTC offset in force when it happened, so day
+buckets start at local midnight on both sides of a daylight saving change
+(the hour repeated in autumn shares one bucket). The offsets are looked up
+in Python for the span of the user's history and handed to the
+aggregation as a $switch over the moments they change. Empty buckets are
+filled with zeros, and bucket starts are returned as epoch seconds.
+"""
+
+import math
+import os
+from datetime import datetime
+
+from utils.database import get_collection
+
+
+BUCKETS = (('minute', 60), ('hour', 3600), ('day', 86400))
+DEFAULT_POINTS = int(os.getenv('TIMELINE_POINTS', 200))
+MAX_POINTS = 1000
+# Local times must stay within what datetime can represent
+MAX_TIMESTAMP = 253402128000  # 9999-12-30
+RAW_EVENT_LIMIT = int(os.getenv('TIMELINE_RAW_EVENT_LIMIT', 1000))
+
+RAW_EVENT_PROJECTION = {'_id': 0, 'event_type': 1, 'timestamp': 1, 'element': 1, 'page_url': 1, 'x': 1, 'y': 1}
+
+
+def utc_offset(timestamp):
+    """Seconds the local clock was ahead of UTC at the timestamp."""
+    return datetime.fromtimestamp(timestamp).astimezone().utcoffset().total_seconds()
+
+
+def local_epoch(timestamp):
+    """The timestamp as the local wall-clock time, counted in seconds from the epoch."""
+    return timestamp + utc_offset(timestamp)
+
+
+def from_local_epoch(local):
+    # A naive datetime is taken as local time, with the offset in force at that time
+    return datetime.utcfromtimestamp(local).timestamp()
+
+
+def offset_changes(start, end):
+    """[(since, offset)] of the local UTC offsets in force over [start, end]."""
+    changes = [(start, utc_offset(start))]
+    # Offsets change at most a few times a year, so checking once a day finds every change
+    step = max(86400, (end - start) / 10000)
+    sample = start
+    while sample < end:
+        following = min(sample + step, end)
+        if utc_offset(following) != changes[-1][1]:
+            # Changes happen on whole seconds; narrow down to the first one with the new offset
+            low, high = math.floor(sample), math.ceil(following)
+            while high - low > 1:
+                middle = (low + high) // 2
+                if utc_offset(middle) == changes[-1][1]:
+                    low = middle
+                else:
+                    high = middle
+            changes.append((high, utc_offset(high)))
+        sample = following
+    return changes
+
+
+def offset_expression(changes):
+    """Aggregation expression for the UTC offset in force at $timestamp."""
+    if len(changes) == 1:
+        return changes[0][1]
+    return {'$switch': {
+        'branches': [
+            {'case': {'$lt': ['$timestamp', until]}, 'then': offset}
+            for (_, offset), (until, _) in zip(changes, changes[1:])
+        ],
+        'default': changes[-1][1]
+    }}
+
+
+def bucket_count(start, end, seconds):
+    """Buckets of `seconds`, aligned to the epoch, that [start, end) touches."""
+    return max(1, math.ceil((end - (start - start % seconds)) / seconds))
+
+
+def choose_bucket(start, end, points):
+    """(name, seconds) of the narrowest bucket that fits [start, end) in `points`; both in local epoch seconds."""
+    for name, seconds in BUCKETS:
+        if bucket_count(start, end, seconds) <= points:
+            return name, seconds
+    # Longer ranges get buckets of several days
+    day = BUCKETS[-1][1]
+    days = max(2, math.ceil((end - start) / day / points))
+    while bucket_count(start, end, days * day) > points:
+        days += 1
+    return 'days', days * day
+
+
+def history_bounds(user_id):
+    """[first event, last event] timestamps of a user, or None; two index lookups."""
+    interactions = get_collection('interactions')
+    bounds = []
+    for direction in (1, -1):
+        event = interactions.find_one({'user_id': user_id}, {'_id': 0, 'timestamp': 1},
+                                      sort=[('timestamp', direction)])
+        if event is None:
+            return None
+        bounds.append(event['timestamp'])
+    return bounds
+
+
+def bucket_counts(user_id, start, end, seconds):
+    """Event counts per event type and local bucket, keyed by the bucket's local epoch start."""
+    bounds = history_bounds(user_id)
+    if bounds is None:
+        return []
+    # Only the offsets of the span that holds events matter
+    changes = offset_changes(max(start, bounds[0]), min(end, bounds[1] + 1))
+    local = {'$add': ['$timestamp', offset_expression(changes)]}
+    pipeline = [
+        {'$match': {'user_id': user_id, 'timestamp': {'$gte': start, '$lt': end}}},
+        {'$group': {
+            '_id': {
+                'bucket': {'$subtract': [local, {'$mod': [local, seconds]}]},
+                'event_type': '$event_type'
+            },
+            'count': {'$sum': 1}
+        }}
+    ]
+    return list(get_collection('interactions').aggregate(pipeline))
+
+
+def raw_events(user_id, start, end, limit=RAW_EVENT_LIMIT):
+    cursor = get_collection('interactions').find(
+        {'user_id': user_id, 'timestamp': {'$gte': start, '$lt': end}}, RAW_EVENT_PROJECTION
+    ).sort('timestamp', 1).limit(limit + 1)
+    events = [
+        {
+            'event_type': event['event_type'],
+            'timestamp': datetime.fromtimestamp(event['timestamp']).isoformat(),
+            'element': event.get('element'),
+            'page_url': event.get('page_url'),
+            'x': event.get('x'),
+            'y': event.get('y')
+        }
+        for event in cursor
+    ]
+    return events[:limit], len(events) > limit
+
+
+def build_timeline(user_id, start, end, points=DEFAULT_POINTS):
+    local_start, local_end = local_epoch(start), local_epoch(end)
+    name, seconds = choose_bucket(local_start, local_end, points)
+    first = local_start - local_start % seconds
+
+    buckets = {}
+    event_types = set()
+    for row in bucket_counts(user_id, start, end, seconds):
+        event_type = row['_id']['event_type']
+        event_types.add(event_type)
+        counts = buckets.setdefault(row['_id']['bucket'], {})
+        counts[event_type] = counts.get(event_type, 0) + row['count']
+
+    series = []
+    bucket_start = first
+    while bucket_start < local_end:
+        counts = buckets.get(bucket_start, {})
+        epoch = from_local_epoch(bucket_start)
+        # Skip the hour that does not exist when the clocks go forward
+        if counts or seconds >= 86400 or local_epoch(epoch) == bucket_start:
+            series.append({'start': epoch, 'total': sum(counts.values()), 'counts': counts})
+        bucket_start += seconds
+
+    timeline = {
+        'start': start,
+        'end': end,
+        'bucket': name,
+        'bucket_seconds': seconds,
+        'utc_offset': utc_offset(end),
+        'event_types': sorted(event_types, key=str),
+        'total': sum(bucket['total'] for bucket in series),
+        'buckets': series,
+        'events': None,
+        'events_truncated': False
+    }
+    if name == BUCKETS[0][0]:
+        timeline['events'], timeline['events_truncated'] = raw_events(user_id, start, end)
+    return timeline
@@ -2,57 +2,31 @@
 Unique user identifiers for tracking purposes
 """
 
+import re
 import uuid
 from datetime import datetime
 
 
-def generate_uid():
-    unique_id = uuid.uuid4().hex[:12]
+_UID_PATTERN = re.compile(r'user_[0-9a-z]{1,32}')
+# The timestamp is in seconds (server) or milliseconds (tracker)
+_SESSION_ID_PATTERN = re.compile(r'session_[0-9a-z]{1,32}_[0-9]+')
+
+
+def generate_uid(unique_id=None):
+    unique_id = unique_id or uuid.uuid4().hex[:12]
     return f"user_{unique_id}"
 
 
-def generate_session_id():
-    unique_id = uuid.uuid4().hex[:12]
-    timestamp = int(datetime.now().timestamp())
+def generate_session_id(unique_id=None, timestamp=None):
+    unique_id = unique_id or uuid.uuid4().hex[:12]
+    timestamp = int(timestamp if timestamp is not None else datetime.now().timestamp())
     return f"session_{unique_id}_{timestamp}"
 
 
 def is_valid_uid(uid):
-    if not uid or not isinstance(uid, str):
-        return False
-    
-    if not uid.startswith('user_'):
-        return False
-    
-    uid_part = uid.replace('user_', '')
-    
-    if len(uid_part) != 12:
-        return False
-    
-    try:
-        int(uid_part, 16) 
-        return True
-    except ValueError:
-        return False
+    # The server issues 12 hex digits; the browser tracker up to 12 base-36 characters
+    return isinstance(uid, str) and _UID_PATTERN.fullmatch(uid) is not None
 
 
 def is_valid_session_id(session_id):
-    if not session_id or not isinstance(session_id, str):
-        return False
-    
-    if not session_id.startswith('session_'):
-        return False
-    
-    parts = session_id.split('_')
-    if len(parts) != 3:
-        return False
-    try:
-        int(parts[1], 16)
-    except ValueError:
-        return False
-    
-    try:
-        int(parts[2])
-        return True
-    except ValueError:
-        return False
+    return isinstance(session_id, str) and _SESSION_ID_PATTERN.fullmatch(session_id) is not None
@@ -20,9 +20,9 @@ export const startSession = async (sessionData) => {
 	}
 };
 
-export const endSession = async (sessionId) => {
+export const endSession = async (userId, sessionId) => {
 	try {
-		const response = await api.post("/tracking/session/end", { session_id: sessionId });
+		const response = await api.post("/tracking/session/end", { user_id: userId, session_id: sessionId });
 		return response.data;
 	} catch (error) {
 		console.error("Error ending session:", error);
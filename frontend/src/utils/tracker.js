@@ -1,4 +1,4 @@
-import apiService from "../services/apiService";
+import * as apiService from "../services/apiService";
 
 class UserTracker {
 	constructor() {
@@ -24,7 +24,7 @@ class UserTracker {
 
 		const fingerprint = this._collectFingerprint();
 
-		await apiService.startSession(this.userId, this.sessionId, fingerprint);
+		await apiService.startSession({ user_id: this.userId, session_id: this.sessionId, fingerprint });
 
 		this._startTracking();
 
@@ -427,7 +427,7 @@ class UserTracker {
 		this.eventQueue = [];
 
 		try {
-			await apiService.sendBatchEvents(eventsToSend);
+			await apiService.trackBatchEvents(eventsToSend);
 		} catch (error) {
 			console.error("Failed to send tracking batch:", error);
 			this.eventQueue.unshift(...eventsToSend);